@@ -1,27 +1,64 @@
 from __future__ import annotations
 import bpy
 import shutil
-import glob
 import subprocess
 import time
 import sys
 import os
 from contextlib import suppress
 
-from .utilitis import TexPath, readFtpFileContents, checkFilename
+from .utilitis import TexPath, farmProps, getRenderScenes
+from .assetChecks import (
+    MISSING,
+    NOT_A_FILE,
+    BAD_FILENAME,
+    CLOTH,
+    PARTICLES,
+    HAIR,
+    FLUID,
+    MANTAFLOW,
+    FLUID_SIMULATION,
+    OCEAN,
+    POINT_CACHE,
+    NOT_BAKED,
+    NO_DISK_CACHE,
+    cacheNotice,
+    fileProblem,
+    isScript,
+    isUnsupportedFormat,
+    meshCacheProblem,
+    notBakedMessage,
+    pointCacheProblems,
+    udimTilePaths,
+)
 from .validator import Validator, TestResult, ResultHelper
-
-from typing import TYPE_CHECKING, Callable, cast
+from .assetManifest import AssetManifest
+from .assetSources import AssetCollector, AssetSource, CacheSource, FileSource, MantaflowSource, SequenceSource, VolumeSource
+from .fingerprints import cachedHashes
+from .cacheIndex import CachePruning, formatFrames, mantaflowFolders, mantaflowFrameFolder
+from .sequences import (
+    SequenceUser,
+    imageSequenceNumbers,
+    volumeSequenceNumbers,
+)
+
+from typing import TYPE_CHECKING, cast
 
 if TYPE_CHECKING:
-    from typing import List, Set, Any
+    from typing import Dict, Iterable, List, Optional, Set, Tuple, Any
     from bpy.types import Operator  # pylint: disable = no-name-in-module, import-error
     from .renderConfiguration import Config
+    from .cacheIndex import CacheDirIndex, CacheFile
 
-    from .typAliases import ResetFilepath, FileInfo
+    from .typAliases import ResetFilepath, FileInfo, Remap
 
 BLENDER_VERSION = bpy.app.version
 
+# fixit error types of the point cache kinds, for caches that were not baked
+# and for caches without disk cache
+NOT_BAKED_ERROR_TYPES = {CLOTH: 6, FLUID: 10, HAIR: 14, PARTICLES: 8}
+NO_DISK_CACHE_ERROR_TYPES = {CLOTH: 6, FLUID: 10}
+
 class FakePointCache:
     """A fake point cache class that has the same attributes as a blender 
     pointCache object to be used with blender versions where point cache objects
@@ -62,21 +99,15 @@ class SKY_FixMeTex(bpy.types.Operator):
         layout.label(text="Do you want to replace missing textures with a dummy?")
 
 
-class Asset():
-    def __init__(self, path, pathlocal):
-        self.path = path
-        self.pathlocal = pathlocal
-        self.filesize = os.stat(self.pathlocal).st_size
-        self.mod_timestamp = int(os.path.getmtime(self.pathlocal)*1000)
-
 class ValTexture(Validator):
 
     REPLACE_MISSING_TEXT = 1
     managerPath = ""
+    cachePruning = None  # type: Optional[CachePruning]
 
     def getPointCaches(self) -> List[FileInfo]:
         files: List[FileInfo] = []
-        for o in bpy.data.objects:
+        for o in filter(self.isUsed, bpy.data.objects):
             for m in o.modifiers:
                 pointCaches = []
                 if (
@@ -168,7 +199,7 @@ class ValTexture(Validator):
                         }
                     )
 
-        for volume in bpy.data.volumes:
+        for volume in filter(self.isUsed, bpy.data.volumes):
             vol_fake_pc = FakePointCache()
             files.append(
                 {
@@ -201,6 +232,7 @@ class ValTexture(Validator):
             file_
             for files in [data.images, data.movieclips, data.fonts, data.sounds]
             for file_ in filter(is_file, files)
+            if self.isUsed(file_)
         ]
 
         shadowPath=os.path.join(self.mainDialog.m_defaultPath,"shadows.txt") 
@@ -213,17 +245,24 @@ class ValTexture(Validator):
         else: 
             results.info(f'Farm Desk Is Running')
 
+        inventory = self.mainDialog.getRemoteInventory()
+        stat_cache = self.statCache
+        point_caches = self.getPointCaches()
+        self.prefetchProbes(temp_files, point_caches, texpath)
+
+        def exportedByOtherProject(f: str, fRealPath: str, name: str) -> None:
+            results.error(
+                f'Texture "{os.path.basename(f)}" {fRealPath} exported and used by other project. Please rename this texture. {f} (texture: {name} )'
+            )
+
+        # same-sized namesakes in tex/, compared by content after the loop in one batch
+        same_size: List[Tuple[str, str, str, str]] = []
+
         for file_ in temp_files:
             # udims special treatment
             if file_.source == 'TILED':
-                base_path = file_.filepath.split('.')[0]
-                ext = file_.filepath.split('.')[-1]
-
-                for tile in file_.tiles:
-                    udim_path = f"{base_path}.{tile.number}.{ext}"
-                    udim_path_abs = bpy.path.abspath(udim_path)
-
-                    if not os.path.exists(udim_path_abs):
+                for udim_path_abs in self.udimTilePaths(file_):
+                    if not stat_cache.exists(udim_path_abs):
                         results.error(
                             f"File not found: {udim_path_abs} (texture: {file_.name} )", type_= self.REPLACE_MISSING_TEXT,
                             info_1= file_.name
@@ -233,144 +272,274 @@ class ValTexture(Validator):
             fRealPath = bpy.path.abspath(file_.filepath, library= file_.library)
             texFilePath = os.path.join(texpath, os.path.basename(fRealPath))
 
-            if os.path.splitext(fRealPath)[1].lower() == ".py":
+            problem = fileProblem(fRealPath, stat_cache)
+            if isScript(fRealPath):
                 pass
-            elif not os.path.exists(fRealPath):
+            elif problem == MISSING:
                 results.error(
                     f"File not found: {f} (texture: {file_.name} )", type_= self.REPLACE_MISSING_TEXT,
                     info_1= file_.name
                 )
-            elif not os.path.isfile(fRealPath):
+            elif problem == NOT_A_FILE:
                 results.error(f"Invalid file name for texture: {file_.name} (file name: {f} )")
-            elif not checkFilename(os.path.basename(fRealPath)):
+            elif problem == BAD_FILENAME:
                 results.error(f"Filename has unsupported characters: {f}")
-            elif os.path.exists(texFilePath):
-                if os.path.getsize(texFilePath) != os.path.getsize(fRealPath):
+            elif self.isContentAddressed(file_):
+                # stored by content hash, same-named files can't collide
+                pass
+            elif stat_cache.exists(texFilePath):
+                if stat_cache.size(texFilePath) != stat_cache.size(fRealPath):
+                    exportedByOtherProject(f, fRealPath, file_.name)
+                else:
+                    same_size.append((texFilePath, fRealPath, f, file_.name))
+            else:
+                remote = inventory.lookup(os.path.basename(fRealPath))
+                if remote is not None and stat_cache.size(fRealPath) != remote.size:
                     results.error(
-                        f'Texture "{os.path.basename(f)}" {fRealPath} exported and used by other project. Please rename this texture. {f} (texture: {file_.name} )'
+                        f'Texture "{os.path.basename(f)}" exported and used by other project. Please rename this texture'
                     )
-            else:
-                if os.path.basename(f).lower() in ftpContentsFiles:
-                    pos = ftpContentsFiles.index(os.path.basename(f).lower())
-                    if pos >= 0:
-                        if os.path.getsize(f) != ftpContentsSizes[pos]:
-                            results.error(
-                                f'Texture "{os.path.basename(f)}" exported and used by other project. Please rename this texture'
-                            )
-
-            if f.endswith(".psd"):
+
+            if isUnsupportedFormat(f):
                 results.error(f"Filetype (psd) not supported: {f}")
 
-        for f in self.getPointCaches():
+        hashes = self.contentHashes(path for pair in same_size for path in pair[:2])
+        for texFilePath, fRealPath, f, name in same_size:
+            if texFilePath not in hashes or hashes[texFilePath] != hashes.get(fRealPath):
+                exportedByOtherProject(f, fRealPath, name)
+
+        for f in point_caches:
             print(f["mod"].name)
             folder = bpy.path.abspath(f["path"])
             file_ = f["name"]
-            # fobj= f['obj']
             fmod = f["mod"]
             fpc = f["pc"]
-            blender_scene_path = bpy.context.blend_data.filepath
-            cache_folder = os.path.join(os.path.dirname(blender_scene_path), folder.strip("/"))
-            obj_notice = f"object: \"{f['obj'].name}\" modifier: \"{f['mod'].name}\""
+            ob_name, mod_name = f["obj"].name, fmod.name
 
             if fpc == "OCEAN":
                 if not fmod.is_cached:
-                    results.error(f"Ocean Modifier: Was not baked. {obj_notice}", type_= 3, info_1= f['obj'].name, info_2= f['mod'].name)
+                    results.error(notBakedMessage(OCEAN, ob_name, mod_name), type_= 3, info_1= ob_name, info_2= mod_name)
 
             elif fpc == "MESH_CACHE":
-                if not os.path.exists(folder):
-                    results.error(f"MeshCache: File not found. {folder} {obj_notice}", type_= 4, info_1= f['obj'].name, info_2= f['mod'].name)
+                problem = meshCacheProblem(folder, ob_name, mod_name, stat_cache)
+                if problem is not None:
+                    results.error(problem, type_= 4, info_1= ob_name, info_2= mod_name)
 
             elif fpc == "FLUID_SIMULATION":
-                if not os.path.exists(folder) or len(glob.glob(os.path.join(folder, "*"))) < 1:
-                    results.error(f"Fluid Modifier: Was not baked. {obj_notice}", type_= 5, info_1= f['obj'].name, info_2= f['mod'].name)
+                if self.cacheIndex.get(folder).isEmpty:
+                    results.error(
+                        notBakedMessage(FLUID_SIMULATION, ob_name, mod_name), type_= 5, info_1= ob_name, info_2= mod_name
+                    )
 
             elif fpc == "MantaFlow":
+                index = self.cacheIndex.get(self.mantaflowCacheFolder(f))
                 # if no cache dir or no files in cache dir
-                if not os.path.exists(cache_folder) or all(
-                    len(filenames) == 0 for _dirpath, _dirnames, filenames in os.walk(cache_folder)
-                ):
-                    results.error(f"Fluid Modifier: Was not baked. {obj_notice}", type_= 10, info_1= f['obj'].name)
+                if index.isEmpty:
+                    results.error(notBakedMessage(MANTAFLOW, ob_name, mod_name), type_= 10, info_1= ob_name)
+                else:
+                    domain = fmod.domain_settings
+                    self.warnMissingFrames(
+                        results, index, index.filesIn(mantaflowFrameFolder(domain)),
+                        domain.cache_frame_start, domain.cache_frame_end,
+                        f"Fluid Modifier: Cache is missing frames {{}}. {cacheNotice(ob_name, mod_name)}"
+                    )
 
             elif fpc == "VOLUME":
                 # do nothing
                 # print("It's a volume")
                 pass
 
-            elif not fpc.is_baked and not fpc.use_external:
-                if not hasattr(fmod, "particle_system"):
-                    if fmod.name == "Cloth":
-                        results.error(
-                            f"Cloth Modifier: Cloth Cache Was never baked. Bake or use external files. {obj_notice}", type_= 6, info_1= f['obj'].name, info_2= f['mod'].name
-                        )
-                    elif fmod.type == 'FLUID' and not fmod.domain_settings.has_cache_baked_mesh:
-                        results.error(message= f"Fluid Simulation was not baked. {obj_notice}", type_= 10, info_1= f['obj'].name)
-                    else:
-                        results.error(
-                            f"Modifier: Point Cache Was never baked. Bake or use external files. {obj_notice}"
-                        )
-                elif fmod.particle_system.settings.type == "HAIR":
-                    if fmod.particle_system.use_hair_dynamics == True:
-                        results.error(
-                            f"Hair dynamics: PointCache Was not baked. Bake or use external. {obj_notice}",
-                            type_= 14, info_1= f['obj'].name
-                        )
-                else:
-                    results.error(f"PointCache: Was not baked. Bake or use external. {obj_notice}", type_= 8, info_1= f['obj'].name)
             else:
-                if not fpc.use_disk_cache and not fpc.use_external:
-                    ob = bpy.data.objects.get(f['obj'].name)
-                    mod = ob.modifiers.get(f['mod'].name)
-
-                    # these conditions are to avoid raising errors for baked already caches
-                    if mod.type == 'CLOTH':
-                        error_type = 6
-                    elif mod.type == 'FLUID':
-                        error_type = 10
+                kind = self.pointCacheKind(fmod)
+                if kind is None:
+                    continue
+                use_disk_cache = getattr(fpc, "use_disk_cache", False)
+                for problem in pointCacheProblems(
+                    kind, ob_name, mod_name, file_, folder,
+                    baked=fpc.is_baked,
+                    external=fpc.use_external,
+                    disk_cache=use_disk_cache,
+                    outdated=getattr(fpc, "is_outdated", False),
+                    blendcache_folder=self.blendcacheFolder(),
+                    stat_cache=stat_cache,
+                ):
+                    if problem.problem == NOT_BAKED:
+                        error_type = NOT_BAKED_ERROR_TYPES.get(kind)
+                    elif problem.problem == NO_DISK_CACHE:
+                        error_type = NO_DISK_CACHE_ERROR_TYPES.get(kind, 8)
                     else:
-                        # particles modifier
-                        error_type = 8
-
-                    results.error(
-                        f"PointCache: Disk Cache not activated, activate Disk Cache or use external. {obj_notice}", type_= error_type,
-                        info_1= f['obj'].name, info_2= f['mod'].name
-                    )
-
-                if fpc.use_external:
-                    if folder == "":
-                        results.error(f"PointCache: External path empty. {obj_notice}")
-                    elif not os.path.exists(folder):
-                        results.error(f"PointCache: Folder not found. {folder} {obj_notice}")
-                elif fpc.is_outdated:
-                    results.error(
-                        f"PointCache: Cache outdated. Free bake and rebake. {obj_notice}"
+                        error_type = None
+                    if error_type is None:
+                        results.error(problem.message)
+                    else:
+                        results.error(problem.message, type_= error_type, info_1= ob_name, info_2= mod_name)
+
+                if (fpc.is_baked or fpc.use_external) and file_ != "" and (fpc.use_external or use_disk_cache):
+                    index = self.cacheIndex.get(folder if fpc.use_external else self.blendcacheFolder())
+                    self.warnMissingFrames(
+                        results, index, [cf for cf in index.filesIn() if cf.name == file_],
+                        getattr(fpc, "frame_start", 1), getattr(fpc, "frame_end", 250),
+                        f"PointCache: Cache is missing frames {{}}. {cacheNotice(ob_name, mod_name)}"
                     )
 
-                if file_ == "":
-                    results.error(
-                        f"Please enter a name for the Point Cache of \"{f['mod'].name}\", object \"{f['obj'].name}\"."
-                    )
+    def pointCacheKind(self, mod: Any) -> Optional[str]:
+        """The assetChecks kind of a modifier's point cache, None for hair without dynamics, which has no cache"""
+        if hasattr(mod, "particle_system"):
+            if mod.particle_system.settings.type != "HAIR":
+                return PARTICLES
+            return HAIR if mod.particle_system.use_hair_dynamics else None
+        if mod.type == 'CLOTH':
+            return CLOTH
+        if mod.type == 'FLUID' and not mod.domain_settings.has_cache_baked_mesh:
+            return FLUID
+        return POINT_CACHE
+
+    def udimTilePaths(self, file_: Any) -> List[str]:
+        return [bpy.path.abspath(path) for path in udimTilePaths(file_.filepath, (tile.number for tile in file_.tiles))]
+
+    def blendcacheFolder(self) -> str:
+        """The implicit point cache folder next to the .blend"""
+        dir_ = os.path.dirname(bpy.context.blend_data.filepath)
+        fn = os.path.splitext(os.path.basename(bpy.context.blend_data.filepath))[0]
+        return os.path.join(dir_, f"blendcache_{fn}")
+
+    def prefetchProbes(self, temp_files: List[Any], point_caches: List[FileInfo], texpath: str) -> None:
+        """
+        Probes every texture, UDIM tile and cache folder the checks below need concurrently,
+        so the serial checks are answered from the stat cache instead of one network round trip each.
+        """
+        paths: List[str] = []
+        cache_roots: List[str] = []
+        for file_ in temp_files:
+            if file_.source == 'TILED':
+                paths.extend(self.udimTilePaths(file_))
+            fRealPath = bpy.path.abspath(file_.filepath, library= file_.library)
+            paths.append(fRealPath)
+            paths.append(os.path.join(texpath, os.path.basename(fRealPath)))
+
+        for f in point_caches:
+            if f["pc"] == "MantaFlow":
+                cache_roots.append(self.mantaflowCacheFolder(f))
+            elif isinstance(f["pc"], str) or f["pc"].use_external:
+                folder = bpy.path.abspath(f["path"])
+                paths.append(folder)
+                if f["pc"] != "MESH_CACHE":
+                    cache_roots.append(folder)
+        if point_caches:
+            paths.append(self.blendcacheFolder())
+            cache_roots.append(self.blendcacheFolder())
+
+        start = time.perf_counter()
+        cached = self.statCache.prefetch(paths)
+        scanned = self.cacheIndex.prefetch(cache_roots)
+        print(f"texture: probed {cached} paths and {scanned} cache folders in {time.perf_counter() - start:.2f}s")
+
+    def renderFrames(self) -> List[int]:
+        """Every scene frame the job renders"""
+        frames: Set[int] = set()
+        for scene in getRenderScenes():
+            frames.update(range(scene.frame_start, scene.frame_end + 1, max(1, scene.frame_step)))
+        return sorted(frames)
+
+    def imageSequenceUsers(self) -> Dict[Any, List[SequenceUser]]:
+        """Frame settings of everything that shows an image sequence, keyed by the image"""
+        users: Dict[Any, List[SequenceUser]] = {}
+
+        def add_user(image: Any, user: Any) -> None:
+            if image is None or image.source != "SEQUENCE" or not hasattr(user, "frame_duration"):
+                return
+            users.setdefault(image, []).append(
+                SequenceUser(user.frame_start, user.frame_duration, user.frame_offset, user.use_cyclic)
+            )
 
-                if not fpc.use_external and fpc.use_disk_cache:
-                    dir = os.path.dirname(bpy.context.blend_data.filepath)
-                    fn = os.path.splitext(os.path.basename(bpy.context.blend_data.filepath))[0]
-                    cacheFolder = os.path.join(dir, f"blendcache_{fn}")
-                    if not os.path.exists(cacheFolder):
-                        results.error(f"PointCache: implicit folder not found. {cacheFolder}")
+        data = bpy.data
+        node_trees = [data.node_groups] + [
+            [id_.node_tree for id_ in ids if getattr(id_, "node_tree", None) is not None]
+            for ids in [data.materials, data.worlds, data.lights, data.textures, data.scenes]
+        ]
+        for trees in node_trees:
+            for tree in trees:
+                for node in tree.nodes:
+                    if getattr(node, "image", None) is not None:
+                        # compositor image nodes carry the frame settings themselves
+                        add_user(node.image, getattr(node, "image_user", node))
+
+        for tex in data.textures:
+            if tex.type == "IMAGE":
+                add_user(tex.image, tex.image_user)
+
+        for ob in data.objects:
+            if ob.type == "EMPTY" and isinstance(ob.data, bpy.types.Image):
+                add_user(ob.data, ob.image_user)
+
+        for cam in data.cameras:
+            for bg in cam.background_images:
+                if bg.source == "IMAGE":
+                    add_user(bg.image, bg.image_user)
+        return users
+
+    def mantaflowCacheFolder(self, f: FileInfo) -> str:
+        return os.path.normpath(bpy.path.abspath(f["mod"].domain_settings.cache_directory))
+
+    def warnMissingFrames(
+        self, results: ResultHelper, index: CacheDirIndex, files: List[CacheFile], start: int, end: int, message: str
+    ) -> None:
+        """Warns about frames of the rendered range that are in the cache range but have no cache file"""
+        scene = bpy.context.scene
+        missing = index.missingFrames(max(start, scene.frame_start), min(end, scene.frame_end), files)
+        if missing:
+            results.warn(message.format(formatFrames(missing)))
+
+    def isContentAddressed(self, file_: Any) -> bool:
+        """Single-file assets are stored by content hash when deduplication is enabled"""
+        if not farmProps().use_content_addressing:
+            return False
+        return getattr(file_, "source", "FILE") in {"FILE", "MOVIE"} and not getattr(file_, "is_sequence", False)
+
+    def contentHashes(self, paths: Iterable[str]) -> Dict[str, str]:
+        """Content hashes of `paths` in one store transaction and one pool. Unchanged files come from the fingerprint store."""
+        paths = list(paths)
+        if not paths:
+            return {}
+        return cachedHashes(self.mainDialog.getFingerprints(), paths)
 
     def furtherAction(self, op: Operator, result: TestResult) -> None:
         if result.type == self.REPLACE_MISSING_TEXT:
             bpy.ops.farm.fix_me_tex("INVOKE_DEFAULT")
         op.report(type= {'ERROR'}, message= result.message)
 
-    def prepareSave(self, export_folder: str, assets: List[str], scene_settings: "Config") -> None:
+    def prepareSave(self, export_folder: str, assets: AssetManifest, scene_settings: "Config") -> None:
         texpath = os.path.join(export_folder, "tex")
         os.makedirs(texpath, exist_ok=True)
 
         self.postsaveResetFilepath: List[ResetFilepath] = []
         serverpath = TexPath(self.mainDialog.m_userName)
 
-        self.save_point_caches(export_folder, texpath, serverpath, assets)
-        self.save_regular_assets(texpath, serverpath, assets)
+        self.cachePruning = self.createCachePruning()
+        self.save_assets(export_folder, serverpath, assets)
+
+        if self.cachePruning is not None:
+            scene_settings["cachepruning"] = self.cachePruning.toSection()
+            print(
+                f"cache pruning: skipped {self.cachePruning.skippedFiles} files, {self.cachePruning.skippedBytes} bytes"
+            )
+
+    def createCachePruning(self) -> Optional[CachePruning]:
+        """Frame ranges of the rendered scenes, widened by the preroll, if cache pruning is enabled"""
+        props = farmProps()
+        if not props.is_prune_caches:
+            return None
+
+        ranges = []
+        for scene in getRenderScenes():
+            frame_start = scene.frame_start - props.cache_preroll
+            frame_end = scene.frame_end
+            if scene.render.use_motion_blur:
+                # the shutter is centred on the frame, so the first frame reads the cache
+                # of the frame before it and the last one the cache of the frame after
+                frame_start -= 1
+                frame_end += 1
+            ranges.append((frame_start, frame_end))
+        return CachePruning(ranges)
 
     def postSave(self) -> None:
         for stuff in self.postsaveResetFilepath:
@@ -380,200 +549,120 @@ class ValTexture(Validator):
             else:
                 stuff["o"].cache_directory = stuff["value"]
 
-    def add_asset(
-        self,
-        assets: List[str],
-        serverpath: str,
-        texpath: str,
-        file_: Any,
-        take_absolute_path: bool = False,
-        is_preupload: bool = False
-    ) -> None:
+    def save_assets(self, export_folder: str, serverpath: str, assets: AssetManifest) -> None:
+        """Collects the assets of the export and points their datablocks to the farm until postSave()"""
+        sources = self.point_cache_sources(serverpath) + self.regular_sources(serverpath)
+        collector = AssetCollector(
+            assets, self.statCache, self.cacheIndex, self.cachePruning, self.mainDialog.getFingerprints(), export_folder
+        )
+        found = collector.collectAll([source for source, _remap in sources])
+        for (source, remap), ok in zip(sources, found):
+            if ok and remap is not None:
+                remap(source)
+
+    def remap_path(self, o: Any, attribute: str, value: str) -> Remap:
+        """Sets `o.attribute` to `value` until postSave()"""
+        def remap(_source: AssetSource) -> None:
+            self.postsaveResetFilepath.append({"o": o, "value": getattr(o, attribute)})
+            setattr(o, attribute, value)
+        return remap
+
+    def file_source(self, serverpath: str, file_: Any, take_absolute_path: bool = False) -> Tuple[AssetSource, Remap]:
         oriPath: str = file_.filepath
         filename = os.path.basename(oriPath)
-        outFile = os.path.join(texpath, filename)
         fRealPath = bpy.path.abspath(oriPath) if take_absolute_path else oriPath
+        source = FileSource(f"tex/{filename}", fRealPath, self.isContentAddressed(file_))
 
-        if os.path.isfile(fRealPath):
-            vFile = f"tex/{filename}"
-            asset = Asset(vFile, fRealPath)
-
-            if asset.path not in [a.path for a in assets if hasattr(a, 'path')]:
-            # if vFile not in assets:
-                assets.append(asset)
-                # shutil.copy(fRealPath, outFile)
-
-            if not is_preupload:
-                file_.filepath = os.path.join(serverpath, filename)
-                self.postsaveResetFilepath.append({"o": file_, "value": oriPath})
-
-    def save_point_caches(
-        self, export_folder: str, texpath: str, serverpath: str, assets: List[str],
-        is_preupload: bool = False
-    ) -> None:
-        def add_pointcache_assets(
-            folder: str, f: Any, save_asset: Callable[[Any], None], subfolder: str = ""
-        ) -> None:
-
-            if not os.path.exists(folder):
-                return
-
-            if subfolder != "":
-                os.makedirs(os.path.join(texpath, subfolder), exist_ok=True)
-
-            valid_file = lambda entry: not entry.name.startswith(".") and entry.is_file()
-
-            for entry in filter(valid_file, os.scandir(folder)):
-                filename = entry.name
-                # if subfolder is empty, it is ignored in path.join()
-                outFile = os.path.join(texpath, subfolder, filename)
-                vFile = os.path.join("tex", subfolder, filename).replace("\\", "/")
-                asset = Asset(vFile, entry.path)
-                if asset.path not in [a.path for a in assets if hasattr(a, 'path')]:
-                # if vFile not in assets:
-                    assets.append(asset)
-                    # shutil.copy(entry.path, outFile)
+        def remap(source: FileSource) -> None:
+            if source.content_addressed and source.asset.checksum:
+                # tex/cas/... -> <serverpath>\cas\...
+                serverFile = f"{serverpath}\\{source.asset.path[4:]}".replace("/", "\\")
+            else:
+                serverFile = os.path.join(serverpath, filename)
+            self.postsaveResetFilepath.append({"o": file_, "value": oriPath})
+            file_.filepath = serverFile
 
-            save_asset(f)
+        return source, remap
 
+    def point_cache_sources(self, serverpath: str) -> List[Tuple[AssetSource, Optional[Remap]]]:
+        """Where the point caches, fluid caches and volumes are, read from bpy only"""
+        sources: List[Tuple[AssetSource, Optional[Remap]]] = []
         for icp, f in enumerate(self.getPointCaches()):
-            # obj = f['obj']
-            folder = f["path"]
+            folder = bpy.path.abspath(f["path"])
             fpc = f["pc"]
             if fpc == "OCEAN":
                 uniqueCachePath = f"cache_{icp}"
-
-                def save_asset(f: Any) -> None:
-                    self.postsaveResetFilepath.append({"o": f["mod"], "value": f["mod"].filepath})
-                    f["mod"].filepath = f"{serverpath}\\{uniqueCachePath}\\"
-
-                add_pointcache_assets(folder, f, save_asset, uniqueCachePath)
+                sources.append((
+                    CacheSource(folder, f"tex/{uniqueCachePath}"),
+                    self.remap_path(f["mod"], "filepath", f"{serverpath}\\{uniqueCachePath}\\"),
+                ))
 
             elif fpc == "MESH_CACHE":
-                self.add_asset(assets, serverpath, texpath, f["mod"], take_absolute_path=True)
+                sources.append(self.file_source(serverpath, f["mod"], take_absolute_path=True))
 
             elif fpc == "FLUID_SIMULATION":
-
-                def save_asset(f: Any) -> None:
-                    self.postsaveResetFilepath.append(
-                        {"o": f["mod"].settings, "value": f["mod"].settings.filepath}
-                    )
-                    f["mod"].settings.filepath = serverpath
-
-                add_pointcache_assets(folder, f, save_asset)
+                sources.append((CacheSource(folder), self.remap_path(f["mod"].settings, "filepath", serverpath)))
 
             elif fpc == "MantaFlow":
+                domain = f["mod"].domain_settings
+                base_subfolder = os.path.basename(os.path.dirname(domain.cache_directory))
+                vfolder = os.path.join("tex", base_subfolder).replace("\\", "/").rstrip("/")
+                sources.append((
+                    MantaflowSource(self.mantaflowCacheFolder(f), vfolder, frozenset(mantaflowFolders(domain))),
+                    self.remap_path(domain, "cache_directory", f"{serverpath}\\{base_subfolder}\\"),
+                ))
 
-                base_subfolder = os.path.basename(
-                    os.path.dirname(f["mod"].domain_settings.cache_directory)
-                )
-
-                def save_asset(f: Any) -> None:
-                    self.postsaveResetFilepath.append(
-                        {
-                            "o": f["mod"].domain_settings,
-                            "value": f["mod"].domain_settings.cache_directory,
-                        }
-                    )
-                    f["mod"].domain_settings.cache_directory = f"{serverpath}\\{base_subfolder}\\"
-
-                valid_dir = lambda entry: not entry.name.startswith(".") and entry.is_dir()
-                for cache_dir in filter(
-                    valid_dir, os.scandir(f["mod"].domain_settings.cache_directory)
-                ):
-                    cache_dir = cache_dir.name
-                    subfolder = os.path.join(base_subfolder, cache_dir)
-                    cache_folder = os.path.join(folder, cache_dir)
-                    add_pointcache_assets(cache_folder, f, save_asset, subfolder)
-            
             elif fpc == "VOLUME":
-
-                def save_asset(f: Any) -> None:
-                    self.postsaveResetFilepath.append(
-                        {"o": f["mod"], "value": f["path"]}
+                volume = f["mod"]
+                path = bpy.path.abspath(volume.filepath, library= volume.library)
+                numbers = None
+                if volume.is_sequence:
+                    numbers = volumeSequenceNumbers(
+                        self.renderFrames(), volume.frame_start, volume.frame_duration, volume.frame_offset, volume.sequence_mode
                     )
-                    f["mod"].filepath = serverpath + "\\" + os.path.basename(bpy.path.abspath(f["mod"].filepath))
-
-                add_pointcache_assets(folder, f, save_asset)
+                sources.append((
+                    VolumeSource(os.path.dirname(path), os.path.basename(path), numbers),
+                    self.remap_path(volume, "filepath", serverpath + "\\" + os.path.basename(bpy.path.abspath(volume.filepath))),
+                ))
 
             elif fpc.use_external:
-
-                def save_asset(f: Any) -> None:
-                    self.postsaveResetFilepath.append({"o": f["pc"], "value": f["pc"].filepath})
-                    f["pc"].filepath = serverpath
-
-                add_pointcache_assets(folder, f, save_asset)
+                sources.append((CacheSource(folder), self.remap_path(fpc, "filepath", serverpath)))
 
             else:
-                filename = f["name"]
-                dir_ = os.path.dirname(bpy.context.blend_data.filepath)
-                fn = os.path.splitext(os.path.basename(bpy.context.blend_data.filepath))[0]
-                cachFolderName = f"blendcache_{fn}"
-                cacheFolder = os.path.join(dir_, cachFolderName)
-                cacheFolderDest = os.path.join(export_folder, cachFolderName)
-                if os.path.exists(cacheFolder):
-                    os.makedirs(cacheFolderDest, exist_ok=True)
-
-                    for ff in glob.glob(os.path.join(cacheFolder, f"{filename}*")):
-                        if not os.path.isdir(ff):
-                            filename = os.path.basename(ff)
-                            outFile = os.path.join(cacheFolderDest, filename)
-                            vFile = f"{cachFolderName}/{filename}"
-                            asset = Asset(vFile, ff)
-                            # shutil.copy(ff, outFile)
-                            assets.append(asset)
-
-    def save_regular_assets(self, texpath: str, serverpath: str, assets: List[str], is_preupload: bool = False) -> None:
-        def add_asset(file_: Any, take_absolute_path: bool = False) -> None:
-            self.add_asset(assets, serverpath, texpath, file_, take_absolute_path, is_preupload)
+                cacheFolder = self.blendcacheFolder()
+                sources.append((CacheSource(cacheFolder, os.path.basename(cacheFolder), prefix=f["name"]), None))
+        return sources
+
+    def regular_sources(self, serverpath: str) -> List[Tuple[AssetSource, Optional[Remap]]]:
+        """Where the images, sequences, movie clips, fonts, sounds and caches files are, read from bpy only"""
+        sources: List[Tuple[AssetSource, Optional[Remap]]] = []
+        image_users = self.imageSequenceUsers()
+        frames = self.renderFrames()
 
         # save images
-        for file_ in bpy.data.images:
+        for file_ in filter(self.isUsed, bpy.data.images):
             # handle UDIM textures
             if file_.source == 'TILED':
-                
-                base_path = file_.filepath.split('.')[0]
-                ext = file_.filepath.split('.')[-1]
-
-                for tile in file_.tiles:
-                    udim_path = f"{base_path}.{tile.number}.{ext}"
-                    udim_path_abs = bpy.path.abspath(udim_path)
+                for udim_path_abs in self.udimTilePaths(file_):
                     file_name = os.path.split(udim_path_abs)[-1]
-                    vFile = f"tex/{file_name}"
-
-                    if os.path.isfile(udim_path_abs):
-                        asset = Asset(vFile, udim_path_abs)
-
-                        if asset.path not in [a.path for a in assets if hasattr(a, 'path')]:
-                            assets.append(asset)
+                    sources.append((FileSource(f"tex/{file_name}", udim_path_abs), None))
 
             fRealPath = bpy.path.abspath(file_.filepath)
             dir_, filename = os.path.split(fRealPath)
-            add_asset(file_, take_absolute_path=True)
+            sources.append(self.file_source(serverpath, file_, take_absolute_path=True))
 
             # handle image sequences
             with suppress(Exception):
                 if file_.source == "SEQUENCE":
-                    filename, ext = os.path.splitext(filename)
-                    unnumbered_filename = filename.rstrip("0123456789")
-                    sFiles = glob.glob(f"{dir_}/{unnumbered_filename}*{ext}")
-
-                    for sFile in sFiles:
-                        sOriPath = sFile
-                        sFilename = os.path.basename(sOriPath)
-                        sOutFile = os.path.join(texpath, sFilename)
-
-                        vFile = f"tex/{sFilename}"
-                        asset = Asset(vFile, sOriPath)
-                        if asset.path not in [a.path for a in assets if hasattr(a, 'path')]:
-                        # if vFile not in assets:
-                            assets.append(asset)
-                            # shutil.copy(sOriPath, sOutFile)
+                    users = image_users.get(file_)
+                    numbers = imageSequenceNumbers(users, frames) if users else None
+                    sources.append((SequenceSource(dir_, filename, numbers), None))
 
         data = bpy.data
         for files in [data.movieclips, data.fonts, data.sounds, data.cache_files]:
-            for file_ in files:
-                add_asset(file_)
+            for file_ in filter(self.isUsed, files):
+                sources.append(self.file_source(serverpath, file_))
+        return sources
 
     #        #safe external blend files
     #        for file_ in bpy.data.libraries:
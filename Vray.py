@@ -8,6 +8,7 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from typing import List, Any
     from .renderConfiguration import Config
+    from .assetManifest import AssetManifest
 
     from .typAliases import ResetInfo
 
@@ -32,7 +33,7 @@ class ValVray(Validator):
 
         results.error("V-Ray is currently not supported for Blender.") 
 
-    def prepareSave(self, export_folder: str, assets: List[str], scene_settings: "Config") -> None:
+    def prepareSave(self, export_folder: str, assets: AssetManifest, scene_settings: "Config") -> None:
         return None
 
     def postSave(self) -> None:
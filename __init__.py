@@ -25,15 +25,16 @@ else:
     from bpy.props import ( 
         BoolProperty,
         EnumProperty,
+        IntProperty,
         PointerProperty,
         StringProperty,
     )
     from . import renderfarm
     from . import fixIt
+    from . import preupload
 from bpy.app.handlers import persistent
 
 from .utilitis import (
-            calcMd5,
             is_gpu_render,
             getChangedBlenderFilename,
             manager_version,
@@ -103,6 +104,80 @@ class FarmSettings(bpy.types.PropertyGroup):
         default= False
     )
 
+    is_incremental: BoolProperty(
+        name="Incremental upload",
+        description="Only transfer assets that changed since the last successful upload of this project",
+        default= False
+    )
+
+    is_inventory_case_sensitive: BoolProperty(
+        name="Case-sensitive farm file names",
+        description="Compare the names of the files already on the farm case-sensitively, for farm storage that tells them apart",
+        default= False
+    )
+
+    use_content_addressing: BoolProperty(
+        name="Deduplicate textures",
+        description="Upload single-file textures by content, so identical files are shared between projects and same-named files don't collide",
+        default= False
+    )
+
+    is_delta_upload: BoolProperty(
+        name="Delta upload",
+        description="Send large files that changed since the last upload as differences to the previous version",
+        default= False
+    )
+
+    is_blend_delta: BoolProperty(
+        name="Blend block delta",
+        description="Save the .blend uncompressed and send only the file blocks that changed since the last export",
+        default= False
+    )
+
+    is_bundle_small_files: BoolProperty(
+        name="Bundle small files",
+        description="Upload files below the size limit packed into a few bundle files instead of one by one",
+        default= False
+    )
+
+    bundle_threshold: IntProperty(
+        name="Bundle files below (KB)",
+        description="Files smaller than this are bundled",
+        default= 256,
+        min= 1
+    )
+
+    is_stage_assets: BoolProperty(
+        name="Stage assets",
+        description="Place all assets in the export folder (reflink, hardlink or copy), so the export is self-contained",
+        default= False
+    )
+
+    is_preupload: BoolProperty(
+        name="Pre-upload assets",
+        description="Queue changed assets for upload in the background after the file is opened or saved",
+        default= False
+    )
+
+    is_skip_unused: BoolProperty(
+        name="Skip unused data",
+        description="Only check and upload files used by the objects and settings of the rendered scenes",
+        default= False
+    )
+
+    is_prune_caches: BoolProperty(
+        name="Upload rendered cache frames only",
+        description="Skip point cache and fluid cache files of frames outside the rendered frame range",
+        default= False
+    )
+
+    cache_preroll: IntProperty(
+        name="Cache preroll",
+        description="Frames before the frame range to keep when skipping cache files",
+        default= 0,
+        min= 0
+    )
+
     
 classes = (
     FarmSettings,
@@ -144,6 +219,7 @@ bpy.app.handlers.load_pre.append(load_handler)
 def register():
     renderfarm.register()
     fixIt.register()
+    preupload.register()
 
     from bpy.utils import register_class  # pylint: disable = no-name-in-module, import-error
 
@@ -156,6 +232,7 @@ def register():
 def unregister():
     renderfarm.unregister()
     fixIt.unregister()
+    preupload.unregister()
     from bpy.utils import unregister_class  # pylint: disable = no-name-in-module, import-error
 
     for cls in classes:
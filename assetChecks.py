@@ -0,0 +1,140 @@
+"""
+Checks on external files and modifier caches that need nothing but their paths and settings.
+
+Shared by ValTexture and the standalone .blend scanner, so this module imports
+neither bpy nor anything of the add-on.
+"""
+from __future__ import annotations
+import os
+from collections import namedtuple
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Iterable, List, Optional
+
+ALLOWED_FILENAME_CHARACTERS = "abcdefghijklmnopqrstuvwxyz0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_-. "
+
+MISSING = "missing"
+NOT_A_FILE = "not_a_file"
+BAD_FILENAME = "bad_filename"
+
+# kinds of modifier caches
+CLOTH = "cloth"
+PARTICLES = "particles"
+HAIR = "hair"
+DYNAMIC_PAINT = "dynamic_paint"
+FLUID = "fluid"
+MANTAFLOW = "mantaflow"
+FLUID_SIMULATION = "fluid_simulation"
+OCEAN = "ocean"
+MESH_CACHE = "mesh_cache"
+POINT_CACHE = "point_cache"
+
+# point cache problems that baking or changing the cache settings fixes
+NOT_BAKED = "not_baked"
+NO_DISK_CACHE = "no_disk_cache"
+
+NOT_BAKED_MESSAGES = {
+    CLOTH: "Cloth Modifier: Cloth Cache Was never baked. Bake or use external files.",
+    HAIR: "Hair dynamics: PointCache Was not baked. Bake or use external.",
+    PARTICLES: "PointCache: Was not baked. Bake or use external.",
+    FLUID: "Fluid Simulation was not baked.",
+    MANTAFLOW: "Fluid Modifier: Was not baked.",
+    FLUID_SIMULATION: "Fluid Modifier: Was not baked.",
+    OCEAN: "Ocean Modifier: Was not baked.",
+}
+
+# `problem` is NOT_BAKED, NO_DISK_CACHE or None for the ones only the user can fix
+CacheProblem = namedtuple("CacheProblem", ["problem", "message"])
+
+
+def checkFilename(filename: str) -> bool:
+    return all(ch in ALLOWED_FILENAME_CHARACTERS for ch in filename)
+
+
+def isScript(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() == ".py"
+
+
+def isUnsupportedFormat(path: str) -> bool:
+    return path.endswith(".psd")
+
+
+def fileProblem(path: str, stat_cache=os.path) -> Optional[str]:
+    """
+    The first problem of an external file: MISSING, NOT_A_FILE or BAD_FILENAME, None if it's fine.
+    `stat_cache` answers exists() and isfile(), a StatCache or os.path.
+    """
+    if not stat_cache.exists(path):
+        return MISSING
+    if not stat_cache.isfile(path):
+        return NOT_A_FILE
+    if not checkFilename(os.path.basename(path)):
+        return BAD_FILENAME
+    return None
+
+
+def udimTilePaths(filepath: str, tiles: Iterable[int]) -> List[str]:
+    """The file of every UDIM tile, `filepath` as stored in the image"""
+    base_path = filepath.split('.')[0]
+    ext = filepath.split('.')[-1]
+    return [f"{base_path}.{tile}.{ext}" for tile in tiles]
+
+
+def cacheNotice(object_name: str, modifier_name: str) -> str:
+    return f"object: \"{object_name}\" modifier: \"{modifier_name}\""
+
+
+def notBakedMessage(kind: str, object_name: str, modifier_name: str) -> str:
+    message = NOT_BAKED_MESSAGES.get(kind, "Modifier: Point Cache Was never baked. Bake or use external files.")
+    return f"{message} {cacheNotice(object_name, modifier_name)}"
+
+
+def meshCacheProblem(path: str, object_name: str, modifier_name: str, stat_cache=os.path) -> Optional[str]:
+    if stat_cache.exists(path):
+        return None
+    return f"MeshCache: File not found. {path} {cacheNotice(object_name, modifier_name)}"
+
+
+def pointCacheProblems(
+    kind: str,
+    object_name: str,
+    modifier_name: str,
+    name: str,
+    path: str,
+    baked: bool,
+    external: bool,
+    disk_cache: bool,
+    outdated: bool,
+    blendcache_folder: str,
+    stat_cache=os.path,
+) -> List[CacheProblem]:
+    """
+    The problems of one point cache, from its settings. `path` is the absolute external
+    folder, `blendcache_folder` the implicit one next to the .blend.
+    """
+    notice = cacheNotice(object_name, modifier_name)
+    if not baked and not external:
+        return [CacheProblem(NOT_BAKED, notBakedMessage(kind, object_name, modifier_name))]
+
+    problems: List[CacheProblem] = []
+    if not disk_cache and not external:
+        problems.append(CacheProblem(
+            NO_DISK_CACHE, f"PointCache: Disk Cache not activated, activate Disk Cache or use external. {notice}"
+        ))
+    if external:
+        if path == "":
+            problems.append(CacheProblem(None, f"PointCache: External path empty. {notice}"))
+        elif not stat_cache.exists(path):
+            problems.append(CacheProblem(None, f"PointCache: Folder not found. {path} {notice}"))
+    elif outdated:
+        problems.append(CacheProblem(None, f"PointCache: Cache outdated. Free bake and rebake. {notice}"))
+
+    if name == "":
+        problems.append(CacheProblem(
+            None, f"Please enter a name for the Point Cache of \"{modifier_name}\", object \"{object_name}\"."
+        ))
+    if not external and disk_cache and not stat_cache.exists(blendcache_folder):
+        problems.append(CacheProblem(None, f"PointCache: implicit folder not found. {blendcache_folder}"))
+    return problems
@@ -0,0 +1,130 @@
+from __future__ import annotations
+import os
+import stat
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterator, Optional, Any, Tuple
+    from .statCache import StatCache
+
+
+class Asset:
+    """
+    A file that is exported along with the scene.
+
+    `path` is the virtual path on the farm ("tex/foo.png"), `pathlocal` the file on
+    this machine. Size, mtime, inode and device all come from a single stat which
+    is taken lazily on first access, unless a stat result is handed in (e.g. from
+    `os.DirEntry.stat()`). Note that on Windows DirEntry stats report inode 0.
+    `checksum` stays empty until the asset is hashed (see hashing.hashAssets).
+    """
+
+    __slots__ = ("path", "pathlocal", "checksum", "_size", "_mtime_ns", "_inode", "_device")
+
+    def __init__(self, path: str, pathlocal: str, st: Any = None) -> None:
+        self.path = path
+        self.pathlocal = pathlocal
+        self.checksum = ""
+        self._size = -1  # -1: not stat'ed yet
+        self._mtime_ns = 0
+        self._inode = 0
+        self._device = 0
+        if st is not None:
+            self._load(st)
+
+    @classmethod
+    def fromPath(cls, path: str, pathlocal: str, stat_cache: Optional[StatCache] = None) -> Optional[Asset]:
+        """Returns the asset for `pathlocal`, or None if it is not a regular file."""
+        if stat_cache is not None:
+            st = stat_cache.stat(pathlocal)
+        else:
+            try:
+                st = os.stat(pathlocal)
+            except OSError:
+                st = None
+        if st is None or not stat.S_ISREG(st.st_mode):
+            return None
+        return cls(path, pathlocal, st)
+
+    @classmethod
+    def fromDirEntry(cls, path: str, entry: os.DirEntry) -> Asset:
+        return cls(path, entry.path, entry.stat())
+
+    def _load(self, st: Any) -> None:
+        self._size = st.st_size
+        self._mtime_ns = st.st_mtime_ns
+        self._inode = st.st_ino
+        self._device = st.st_dev
+
+    def _stat(self) -> None:
+        if self._size >= 0:
+            return
+        try:
+            self._load(os.stat(self.pathlocal))
+        except OSError:
+            print(f"file not found {self.pathlocal}")
+            self._size = 0
+
+    @property
+    def filesize(self) -> int:
+        self._stat()
+        return self._size
+
+    @property
+    def mtime_ns(self) -> int:
+        self._stat()
+        return self._mtime_ns
+
+    @property
+    def mod_timestamp(self) -> int:
+        """Modification time in milliseconds"""
+        return self.mtime_ns // 1000000
+
+    @property
+    def key(self) -> Tuple[str, int, int, int]:
+        """(pathlocal, size, mtime_ns, inode), the key of the fingerprint store"""
+        return (self.pathlocal, self.filesize, self.mtime_ns, self.inode)
+
+    @property
+    def inode(self) -> int:
+        self._stat()
+        return self._inode
+
+    @property
+    def device(self) -> int:
+        self._stat()
+        return self._device
+
+
+class AssetManifest:
+    """
+    Ordered collection of the assets collected for an export.
+
+    Assets are indexed by their virtual path ("tex/foo.png"), so adding and
+    looking up an asset is O(1) no matter how many cache files a scene has.
+    Iteration follows insertion order, which keeps the [files] section of the
+    job file stable.
+    """
+
+    def __init__(self) -> None:
+        self._assets: Dict[str, Asset] = {}
+
+    def add(self, asset: Asset) -> bool:
+        """Adds `asset` unless its virtual path is already known. Returns True if it was added."""
+        if asset.path in self._assets:
+            return False
+        self._assets[asset.path] = asset
+        return True
+
+    def get(self, path: str) -> Optional[Asset]:
+        return self._assets.get(path)
+
+    def __contains__(self, path: object) -> bool:
+        return path in self._assets
+
+    def __iter__(self) -> Iterator[Asset]:
+        return iter(self._assets.values())
+
+    def __len__(self) -> int:
+        return len(self._assets)
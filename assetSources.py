@@ -0,0 +1,237 @@
+from __future__ import annotations
+import os
+from contextlib import suppress
+
+from .assetManifest import Asset
+from .cacheIndex import mantaflowSubfolders
+from .hashing import hashAssets
+from .sequences import sequenceFiles, sequenceMembers
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Callable, FrozenSet, Iterable, List, Optional
+    from .assetManifest import AssetManifest
+    from .cacheIndex import CacheFile, CacheIndexRegistry, CachePruning
+    from .fingerprints import FingerprintStore
+    from .statCache import StatCache
+
+
+class AssetSource:
+    """
+    Where the files of one datablock are found, as plain data taken from bpy.
+
+    Sources are gathered on the main thread; an AssetCollector turns them into
+    assets by looking at the disk, which needs no bpy and may run on any thread.
+    """
+
+    def collect(self, collector: AssetCollector) -> bool:
+        """Adds the files of this source to the collector. Returns False if there was nothing on disk."""
+        raise NotImplementedError
+
+    def cacheRoots(self) -> List[str]:
+        """Cache folders this source scans, prefetched together"""
+        return []
+
+
+class FileSource(AssetSource):
+    """A single file, stored in tex/. Content addressed files get their blob path once hashed."""
+
+    def __init__(self, path: str, pathlocal: str, content_addressed: bool = False) -> None:
+        self.path = path
+        self.pathlocal = pathlocal
+        self.content_addressed = content_addressed
+        self.asset: Optional[Asset] = None
+
+    def collect(self, collector: AssetCollector) -> bool:
+        self.asset = Asset.fromPath(self.path, self.pathlocal, collector.stat_cache)
+        if self.asset is None:
+            return False
+        if self.content_addressed:
+            # hashed together with all others in AssetCollector.finish()
+            collector.pending.append(self.asset)
+        else:
+            collector.assets.add(self.asset)
+        return True
+
+
+class SequenceSource(AssetSource):
+    """The frames of an image sequence the render reads; all of them if `numbers` is None"""
+
+    def __init__(self, folder: str, filename: str, numbers: Optional[Iterable[int]]) -> None:
+        self.folder = folder
+        self.filename = filename
+        self.numbers = None if numbers is None else sorted(numbers)
+
+    def collect(self, collector: AssetCollector) -> bool:
+        try:
+            names = collector.stat_cache.listdir(self.folder)
+        except OSError:
+            return False
+        if self.numbers is not None:
+            filenames = sequenceFiles(self.filename, self.numbers, names)
+        else:
+            # not used by anything we know of, ship the whole sequence
+            filenames = sequenceMembers(self.filename, names)
+
+        for filename in filenames:
+            vFile = f"tex/{filename}"
+            if vFile not in collector.assets:
+                collector.assets.add(Asset(vFile, os.path.join(self.folder, filename)))
+        return bool(filenames)
+
+
+class CacheSource(AssetSource):
+    """
+    Cache files directly inside `relfolder` of the cache root `folder`, stored in `vfolder`.
+    `prefix` keeps the files of one point cache; with `prune` frames outside the
+    rendered range are left out.
+    """
+
+    def __init__(
+        self, folder: str, vfolder: str = "tex", relfolder: str = "", prefix: str = "", prune: bool = True
+    ) -> None:
+        self.folder = folder
+        self.vfolder = vfolder
+        self.relfolder = relfolder
+        self.prefix = prefix
+        self.prune = prune
+
+    def cacheRoots(self) -> List[str]:
+        return [self.folder]
+
+    def files(self, collector: AssetCollector) -> Optional[List[CacheFile]]:
+        index = collector.cache_index.get(self.folder)
+        if not index.exists:
+            return None
+        files = index.filesIn(self.relfolder)
+        if self.prefix:
+            files = [cf for cf in files if os.path.basename(cf.relpath).startswith(self.prefix)]
+        if self.prune and collector.pruning is not None:
+            files = collector.pruning.filter(files)
+        return files
+
+    def collect(self, collector: AssetCollector) -> bool:
+        files = self.files(collector)
+        if files is None:
+            return False
+        collector.makeFolder(self.vfolder)
+        for cf in files:
+            vFile = f"{self.vfolder}/{os.path.basename(cf.relpath)}"
+            if vFile not in collector.assets:
+                collector.assets.add(Asset(vFile, cf.path, cf.stat))
+        return True
+
+
+class VolumeSource(CacheSource):
+    """The files of a volume: the frames `numbers` of a sequence, else just its own file"""
+
+    def __init__(self, folder: str, filename: str, numbers: Optional[Iterable[int]]) -> None:
+        # volume frames don't follow the scene frames, the sequence settings decide
+        super().__init__(folder, prune=False)
+        self.filename = filename
+        self.numbers = None if numbers is None else sorted(numbers)
+
+    def files(self, collector: AssetCollector) -> Optional[List[CacheFile]]:
+        index = collector.cache_index.get(self.folder)
+        if not index.exists:
+            return None
+        files = index.filesIn()
+        if self.numbers is not None:
+            wanted = set(sequenceFiles(self.filename, self.numbers, (cf.relpath for cf in files)))
+        else:
+            wanted = {self.filename}
+        return [cf for cf in files if cf.relpath in wanted]
+
+
+class MantaflowSource(AssetSource):
+    """
+    The subfolders of a Mantaflow cache, stored below `vfolder`.
+    With `needed` (see cacheIndex.mantaflowFolders) and cache pruning, the folders a render doesn't read are skipped.
+    """
+
+    def __init__(self, folder: str, vfolder: str, needed: Optional[FrozenSet[str]]) -> None:
+        self.folder = folder
+        self.vfolder = vfolder
+        self.needed = needed
+
+    def cacheRoots(self) -> List[str]:
+        return [self.folder]
+
+    def collect(self, collector: AssetCollector) -> bool:
+        index = collector.cache_index.get(self.folder)
+        cache_dirs = index.subfolders()
+        if collector.pruning is not None and self.needed is not None:
+            cache_dirs = mantaflowSubfolders(self.needed, cache_dirs)
+            for cache_dir in set(index.subfolders()) - set(cache_dirs):
+                collector.pruning.skip(index.filesIn(cache_dir))
+
+        for cache_dir in cache_dirs:
+            CacheSource(self.folder, f"{self.vfolder}/{cache_dir}", cache_dir).collect(collector)
+        return bool(cache_dirs)
+
+
+class AssetCollector:
+    """
+    Collects the assets of a list of sources into `assets`.
+
+    Content addressed files are hashed in one batch by finish(). With an
+    `export_folder` the cache folders are created in it as they are found.
+    `cancelled` is asked between sources and stops the collection when it returns True.
+    """
+
+    def __init__(
+        self,
+        assets: AssetManifest,
+        stat_cache: StatCache,
+        cache_index: CacheIndexRegistry,
+        pruning: Optional[CachePruning] = None,
+        store: Optional[FingerprintStore] = None,
+        export_folder: Optional[str] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
+    ) -> None:
+        self.assets = assets
+        self.stat_cache = stat_cache
+        self.cache_index = cache_index
+        self.pruning = pruning
+        self.store = store
+        self.export_folder = export_folder
+        self.cancelled = cancelled
+        self.pending: List[Asset] = []
+
+    def collectAll(self, sources: List[AssetSource]) -> List[bool]:
+        """Collects every source, then finishes. Returns which sources had files."""
+        self.cache_index.prefetch(root for source in sources for root in source.cacheRoots())
+        found: List[bool] = []
+        for source in sources:
+            if self.cancelled is not None and self.cancelled():
+                return found
+            found.append(source.collect(self))
+        self.finish()
+        return found
+
+    def makeFolder(self, vfolder: str) -> None:
+        if self.export_folder is not None and vfolder != "tex":
+            with suppress(OSError):
+                os.makedirs(os.path.join(self.export_folder, vfolder), exist_ok=True)
+
+    def finish(self) -> None:
+        """Hashes the content addressed files and adds them by blob path"""
+        pending, self.pending = self.pending, []
+        stats = hashAssets(pending, store=self.store)
+        if stats.files:
+            print(f"hashing: {stats}")
+        for asset in pending:
+            if asset.checksum:
+                asset.path = f"tex/{BlobPath(asset.checksum, asset.pathlocal)}"
+            self.assets.add(asset)
+
+
+def BlobPath(checksum: str, filename: str) -> str:
+    """
+    Location of a content addressed file relative to the tex folder, e.g. "cas/3f/3f09....png".
+    The extension is kept so Blender still detects the file type.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    name = checksum[:40]
+    return f"cas/{name[:2]}/{name}{ext}"
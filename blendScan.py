@@ -0,0 +1,327 @@
+"""
+Dependency scan of .blend files without Blender.
+
+Reads the external files (images, movie clips, sounds, fonts, libraries, cache files,
+volumes) and the point, fluid and mesh caches of the modifiers straight from the file
+blocks and runs the checks ValTexture runs on them. Many files are scanned in parallel
+processes:
+
+    python blendScan.py [-j WORKERS] [--json] <file.blend | folder> ...
+
+Unlike the check in Blender every datablock of the file is scanned, used by a
+rendered scene or not, and cache folders aren't checked for missing frames.
+"""
+from __future__ import annotations
+import os
+import sys
+import json
+import argparse
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    from .blendfile import BlendFile, BlendError
+    from .statCache import StatCache
+    from .assetChecks import (
+        MISSING,
+        NOT_A_FILE,
+        BAD_FILENAME,
+        CLOTH,
+        PARTICLES,
+        HAIR,
+        DYNAMIC_PAINT,
+        MANTAFLOW,
+        MESH_CACHE,
+        fileProblem,
+        isScript,
+        isUnsupportedFormat,
+        meshCacheProblem,
+        notBakedMessage,
+        pointCacheProblems,
+        udimTilePaths,
+    )
+except ImportError:
+    # run as a script, the modules above have no relative imports themselves
+    from blendfile import BlendFile, BlendError
+    from statCache import StatCache
+    from assetChecks import (
+        MISSING,
+        NOT_A_FILE,
+        BAD_FILENAME,
+        CLOTH,
+        PARTICLES,
+        HAIR,
+        DYNAMIC_PAINT,
+        MANTAFLOW,
+        MESH_CACHE,
+        fileProblem,
+        isScript,
+        isUnsupportedFormat,
+        meshCacheProblem,
+        notBakedMessage,
+        pointCacheProblems,
+        udimTilePaths,
+    )
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Iterable, Iterator, List, Optional
+    from .blendfile import BlendStruct
+
+# ID structs that reference a file, with the kind reported for them
+ID_FILES = [
+    ("Image", "image"),
+    ("MovieClip", "movieclip"),
+    ("bSound", "sound"),
+    ("VFont", "font"),
+    ("Library", "library"),
+    ("CacheFile", "cache_file"),
+    ("Volume", "volume"),
+]
+# the kinds ValTexture reports as textures
+TEXTURE_KINDS = {"image", "movieclip", "sound", "font"}
+# the path is stored as "name" in structs Blender renames to filepath on load
+PATH_FIELDS = ("name", "filepath")
+BUILTIN_FONT = "<builtin>"
+
+# DNA_image_types.h
+IMA_SRC_FILE = 1
+IMA_SRC_TILED = 6
+# DNA_particle_types.h
+PART_EMITTER = 0
+PART_HAIR = 2
+PART_PHYS_NO = 0
+PART_PHYS_KEYED = 2
+PSYS_HAIR_DYNAMICS = 1
+# DNA_modifier_types.h
+MOD_FLUID_TYPE_DOMAIN = 1
+# DNA_pointcache_types.h
+PTCACHE_BAKED = 1 << 0
+PTCACHE_OUTDATED = 1 << 1
+PTCACHE_DISK_CACHE = 1 << 6
+PTCACHE_EXTERNAL = 1 << 9
+
+ExternalFile = namedtuple("ExternalFile", ["kind", "name", "filepath", "abspath", "packed", "tiles"])
+CacheRef = namedtuple("CacheRef", ["kind", "object", "modifier", "name", "filepath", "abspath", "flag"])
+BlendScan = namedtuple("BlendScan", ["path", "files", "caches", "problems", "error"])
+
+
+def absPath(path: str, blend_folder: str) -> str:
+    """Resolves Blender's "//" relative paths like bpy.path.abspath"""
+    if not path:
+        return ""
+    if path.startswith("//"):
+        path = os.path.join(blend_folder, path[2:])
+    return os.path.normpath(path)
+
+
+def idName(id_struct: BlendStruct) -> str:
+    # the first two characters are the ID code
+    return id_struct.get("id.name", "")[2:]
+
+
+def externalFiles(blend: BlendFile) -> List[ExternalFile]:
+    blend_folder = os.path.dirname(os.path.abspath(blend.path))
+    files: List[ExternalFile] = []
+    for struct_name, kind in ID_FILES:
+        for id_struct in blend.structs(struct_name):
+            filepath = id_struct.first(*PATH_FIELDS, default="")
+            tiles: List[int] = []
+            if kind == "image":
+                source = id_struct.get("source", IMA_SRC_FILE)
+                if source not in (IMA_SRC_FILE, IMA_SRC_TILED):
+                    continue
+                if source == IMA_SRC_TILED:
+                    tiles = [tile.get("tile_number", 1001) for tile in id_struct.listBase("tiles")]
+            elif kind == "font" and filepath == BUILTIN_FONT:
+                continue
+
+            packed = bool(id_struct.get("packedfile", 0) or id_struct.get("packedfiles.first", 0))
+            files.append(
+                ExternalFile(kind, idName(id_struct), filepath, absPath(filepath, blend_folder), packed, tiles)
+            )
+    return files
+
+
+def modifierCaches(blend: BlendFile) -> List[CacheRef]:
+    """The caches of the modifiers ValTexture.getPointCaches looks at"""
+    blend_folder = os.path.dirname(os.path.abspath(blend.path))
+    caches: List[CacheRef] = []
+    for ob in blend.structs("Object"):
+        ob_name = idName(ob)
+        for mod in ob.listBase("modifiers"):
+            mod_name = mod.get("modifier.name", "")
+
+            def add(kind: str, point_cache: Optional[BlendStruct] = None, filepath: str = "") -> None:
+                name, flag = "", 0
+                if point_cache is not None:
+                    filepath = point_cache.get("path", "")
+                    name = point_cache.get("name", "")
+                    flag = point_cache.get("flag", 0)
+                caches.append(CacheRef(kind, ob_name, mod_name, name, filepath, absPath(filepath, blend_folder), flag))
+
+            if mod.typeName == "ClothModifierData":
+                for point_cache in mod.listBase("ptcaches"):
+                    add(CLOTH, point_cache)
+
+            elif mod.typeName == "ParticleSystemModifierData":
+                psys = mod.pointer("psys")
+                part = psys.pointer("part") if psys is not None else None
+                if part is None or part.get("type") not in (PART_EMITTER, PART_HAIR):
+                    continue
+                if part.get("phystype") in (PART_PHYS_NO, PART_PHYS_KEYED):
+                    continue
+                if part.get("type") == PART_HAIR and not psys.get("flag", 0) & PSYS_HAIR_DYNAMICS:
+                    continue
+                for point_cache in psys.listBase("ptcaches"):
+                    add(HAIR if part.get("type") == PART_HAIR else PARTICLES, point_cache)
+
+            elif mod.typeName == "DynamicPaintModifierData":
+                canvas = mod.pointer("canvas")
+                if canvas is not None:
+                    for surface in canvas.listBase("surfaces"):
+                        for point_cache in surface.listBase("ptcaches"):
+                            add(DYNAMIC_PAINT, point_cache)
+
+            elif mod.typeName == "FluidModifierData":
+                domain = mod.pointer("domain") if mod.get("type") == MOD_FLUID_TYPE_DOMAIN else None
+                if domain is not None:
+                    add(MANTAFLOW, filepath=domain.get("cache_directory", ""))
+
+            elif mod.typeName == "MeshCacheModifierData":
+                add(MESH_CACHE, filepath=mod.get("filepath", ""))
+    return caches
+
+
+def fileProblems(files: Iterable[ExternalFile], stat_cache: StatCache, blend_folder: str) -> List[str]:
+    problems: List[str] = []
+    for f in files:
+        if f.packed or not f.filepath:
+            continue
+        label = "texture" if f.kind in TEXTURE_KINDS else f.kind
+        for tile_path in udimTilePaths(f.filepath, f.tiles):
+            tile_path = absPath(tile_path, blend_folder)
+            if not stat_cache.exists(tile_path):
+                problems.append(f"File not found: {tile_path} ({label}: {f.name} )")
+
+        problem = fileProblem(f.abspath, stat_cache)
+        if isScript(f.abspath):
+            pass
+        elif problem == MISSING:
+            problems.append(f"File not found: {f.filepath} ({label}: {f.name} )")
+        elif problem == NOT_A_FILE:
+            problems.append(f"Invalid file name for {label}: {f.name} (file name: {f.filepath} )")
+        elif problem == BAD_FILENAME:
+            problems.append(f"Filename has unsupported characters: {f.filepath}")
+
+        if isUnsupportedFormat(f.filepath):
+            problems.append(f"Filetype (psd) not supported: {f.filepath}")
+    return problems
+
+
+def cacheProblems(caches: Iterable[CacheRef], stat_cache: StatCache, blendcache_folder: str) -> List[str]:
+    """The point cache checks of ValTexture.test, on the cache flags"""
+    problems: List[str] = []
+    for c in caches:
+        if c.kind == MANTAFLOW:
+            try:
+                baked = bool(stat_cache.listdir(c.abspath))
+            except OSError:
+                baked = False
+            if not baked:
+                problems.append(notBakedMessage(c.kind, c.object, c.modifier))
+        elif c.kind == MESH_CACHE:
+            problem = meshCacheProblem(c.abspath, c.object, c.modifier, stat_cache)
+            if problem is not None:
+                problems.append(problem)
+        else:
+            problems.extend(problem.message for problem in pointCacheProblems(
+                c.kind, c.object, c.modifier, c.name, c.abspath,
+                baked=bool(c.flag & PTCACHE_BAKED),
+                external=bool(c.flag & PTCACHE_EXTERNAL),
+                disk_cache=bool(c.flag & PTCACHE_DISK_CACHE),
+                outdated=bool(c.flag & PTCACHE_OUTDATED),
+                blendcache_folder=blendcache_folder,
+                stat_cache=stat_cache,
+            ))
+    return problems
+
+
+def scanBlend(path: str) -> BlendScan:
+    """Reads and checks one .blend. Files that can't be read come back with `error` set."""
+    try:
+        with BlendFile(path) as blend:
+            files = externalFiles(blend)
+            caches = modifierCaches(blend)
+    except (OSError, BlendError) as e:
+        return BlendScan(path, [], [], [], str(e))
+
+    blend_folder = os.path.dirname(os.path.abspath(path))
+    name = os.path.splitext(os.path.basename(path))[0]
+    blendcache_folder = os.path.join(blend_folder, f"blendcache_{name}")
+    stat_cache = StatCache()
+    stat_cache.prefetch(
+        [f.abspath for f in files] + [c.abspath for c in caches if c.kind != MANTAFLOW] + [blendcache_folder],
+        folders=[c.abspath for c in caches if c.kind == MANTAFLOW],
+    )
+    problems = fileProblems(files, stat_cache, blend_folder) + cacheProblems(caches, stat_cache, blendcache_folder)
+    return BlendScan(path, files, caches, problems, "")
+
+
+def scanBlends(paths: Iterable[str], max_workers: Optional[int] = None) -> Iterator[BlendScan]:
+    """Scans `paths` on a process pool, one process per core by default. Yields in completion order."""
+    paths = list(paths)
+    if len(paths) <= 1 or max_workers == 1:
+        for path in paths:
+            yield scanBlend(path)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(scanBlend, path) for path in paths]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def findBlends(paths: Iterable[str]) -> List[str]:
+    """`paths` with folders replaced by the .blend files below them"""
+    found: List[str] = []
+    for path in paths:
+        if not os.path.isdir(path):
+            found.append(path)
+            continue
+        for root, _dirs, names in os.walk(path):
+            found.extend(os.path.join(root, name) for name in sorted(names) if name.endswith(".blend"))
+    return found
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Checks the external files of .blend files without Blender")
+    parser.add_argument("paths", nargs="+", help=".blend files or folders to search for them")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="processes, default one per core")
+    parser.add_argument("--json", action="store_true", help="print one json object per file")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for scan in scanBlends(findBlends(args.paths), args.workers):
+        failed = failed or bool(scan.problems or scan.error)
+        if args.json:
+            print(json.dumps({
+                "path": scan.path,
+                "files": [f._asdict() for f in scan.files],
+                "caches": [c._asdict() for c in scan.caches],
+                "problems": scan.problems,
+                "error": scan.error,
+            }))
+            continue
+        if scan.error:
+            print(f"{scan.path}: {scan.error}")
+            continue
+        print(f"{scan.path}: {len(scan.files)} files, {len(scan.caches)} caches, {len(scan.problems)} problems")
+        for problem in scan.problems:
+            print(f"  {problem}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,684 @@
+"""
+Reading .blend files without Blender, and block level deltas of uncompressed ones.
+
+A .blend is a file header followed by file blocks, each a BHead (code, length,
+old address, SDNA index, count) plus its data, up to the ENDB block. The DNA1
+block describes the layout of every struct, so BlendFile reads fields by name.
+
+For deltas every block is hashed; a new save is described against the previous one as a list of
+ranges to reuse from the previous file and the bytes of the blocks that changed.
+
+No relative imports, so the reader and the reconstruction run on their own:
+
+    python blendfile.py index <file.blend>
+    python blendfile.py diff <previous.blend> <new.blend> <delta>
+    python blendfile.py apply <previous.blend> <delta> <output.blend>
+    python blendfile.py compare <a.blend> <b.blend>
+"""
+from __future__ import annotations
+import os
+import sys
+import json
+import re
+import gzip
+import mmap
+import struct
+import hashlib
+import tempfile
+from collections import namedtuple
+from contextlib import suppress
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+BLOCK_DIGEST_SIZE = 16
+READ_SIZE = 1024 * 1024
+
+DELTA_MAGIC = b"FARMBLD1"
+OP_REUSE = b"R"
+OP_DATA = b"D"
+OP_END = b"E"
+RANGE = struct.Struct("<QQ")
+LENGTH = struct.Struct("<Q")
+
+INDEX_VERSION = 1
+
+
+class BlendError(Exception):
+    pass
+
+
+BHead = namedtuple("BHead", ["code", "length", "old", "sdna", "count"])
+
+
+class BlendHeader:
+    """
+    The file header. Old files: "BLENDER" + pointer size ("_" 4, "-" 8) + endianness ("v"/"V")
+    + 3 digit version, 12 bytes. Since the large BHead format: "BLENDER" + header size (2 digits)
+    + "-" + format version (2 digits) + endianness + 4 digit version, 17 bytes.
+    """
+
+    def __init__(self, raw: bytes, pointer_size: int, little_endian: bool, version: int, format_version: int) -> None:
+        self.raw = raw
+        self.pointer_size = pointer_size
+        self.little_endian = little_endian
+        self.version = version
+        self.format_version = format_version
+        self.endian = "<" if little_endian else ">"
+        if format_version >= 1:
+            # LargeBHead8: code, SDNAnr, old, len, nr
+            self.bhead = struct.Struct(f"{self.endian}4siQqq")
+            self._fields = (0, 3, 2, 1, 4)
+        elif pointer_size == 8:
+            # BHead8: code, len, old, SDNAnr, nr
+            self.bhead = struct.Struct(f"{self.endian}4siQii")
+            self._fields = (0, 1, 2, 3, 4)
+        else:
+            self.bhead = struct.Struct(f"{self.endian}4siIii")
+            self._fields = (0, 1, 2, 3, 4)
+
+    @classmethod
+    def read(cls, f: BinaryIO) -> BlendHeader:
+        raw = f.read(12)
+        if raw[:2] == b"\x1f\x8b" or raw[:4] == b"\x28\xb5\x2f\xfd":
+            raise BlendError("compressed .blend, save it uncompressed")
+        if len(raw) < 12 or raw[:7] != b"BLENDER":
+            raise BlendError("not a .blend file")
+
+        if raw[7:9].isdigit():
+            size = int(raw[7:9])
+            raw += f.read(size - len(raw))
+            if len(raw) != size or raw[9:10] != b"-":
+                raise BlendError("invalid .blend header")
+            return cls(raw, 8, raw[12:13] == b"v", int(raw[13:17]), int(raw[10:12]))
+
+        pointer_size = {b"_": 4, b"-": 8}.get(raw[7:8])
+        if pointer_size is None:
+            raise BlendError("invalid .blend header")
+        return cls(raw, pointer_size, raw[8:9] == b"v", int(raw[9:12]), 0)
+
+    def unpackBHead(self, data: bytes) -> BHead:
+        fields = self.bhead.unpack(data)
+        return BHead(*(fields[i] for i in self._fields))
+
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# DNA type name -> struct format of one value
+DNA_NUMBERS = {
+    "char": "b",
+    "uchar": "B",
+    "short": "h",
+    "ushort": "H",
+    "int": "i",
+    "uint": "I",
+    "float": "f",
+    "double": "d",
+    "int8_t": "b",
+    "uint8_t": "B",
+    "int16_t": "h",
+    "uint16_t": "H",
+    "int32_t": "i",
+    "uint32_t": "I",
+    "int64_t": "q",
+    "uint64_t": "Q",
+}
+ARRAY_RE = re.compile(r"\[(\d+)\]")
+
+DNAField = namedtuple("DNAField", ["name", "type", "offset", "size", "pointer", "count"])
+Block = namedtuple("Block", ["code", "sdna", "count", "old", "offset", "length"])
+
+
+class DNAStruct:
+    def __init__(self, name: str, size: int, fields: Dict[str, DNAField]) -> None:
+        self.name = name
+        self.size = size
+        self.fields = fields
+
+
+def _fieldName(raw: str) -> Tuple[str, bool, int]:
+    """("*next" | "name[64]" | "(*func)()") -> (name, is pointer, array length)"""
+    pointer = raw.startswith("*") or raw.startswith("(*")
+    name = raw.split("[")[0].lstrip("*(").split(")")[0]
+    count = 1
+    for dim in ARRAY_RE.findall(raw):
+        count *= int(dim)
+    return name, pointer, count
+
+
+def parseSDNA(data: bytes, endian: str, pointer_size: int) -> List[DNAStruct]:
+    """The structs of a DNA1 block. Members follow each other without padding, DNA pads explicitly."""
+    pos = 0
+
+    def tag(name: bytes) -> None:
+        nonlocal pos
+        pos = (pos + 3) & ~3
+        if data[pos:pos + 4] != name:
+            raise BlendError(f"SDNA: expected {name!r} at {pos}")
+        pos += 4
+
+    def integers(fmt: str, count: int) -> Tuple[int, ...]:
+        nonlocal pos
+        layout = struct.Struct(f"{endian}{count}{fmt}")
+        values = layout.unpack_from(data, pos)
+        pos += layout.size
+        return values
+
+    def strings() -> List[str]:
+        nonlocal pos
+        (count,) = integers("i", 1)
+        names = []
+        for _ in range(count):
+            end = data.index(b"\0", pos)
+            names.append(data[pos:end].decode("latin-1"))
+            pos = end + 1
+        return names
+
+    tag(b"SDNA")
+    tag(b"NAME")
+    names = strings()
+    tag(b"TYPE")
+    types = strings()
+    tag(b"TLEN")
+    lengths = integers("h", len(types))
+    tag(b"STRC")
+    (count,) = integers("i", 1)
+
+    structs: List[DNAStruct] = []
+    for _ in range(count):
+        type_index, field_count = integers("h", 2)
+        members = integers("h", field_count * 2)
+        fields: Dict[str, DNAField] = {}
+        offset = 0
+        for field_type, field_name in zip(members[::2], members[1::2]):
+            name, pointer, array = _fieldName(names[field_name])
+            size = (pointer_size if pointer else lengths[field_type]) * array
+            fields[name] = DNAField(name, types[field_type], offset, size, pointer, array)
+            offset += size
+        structs.append(DNAStruct(types[type_index], lengths[type_index], fields))
+    return structs
+
+
+def _openZstd(path: str) -> BinaryIO:
+    with suppress(ImportError):
+        from compression import zstd  # Python 3.14
+
+        return zstd.ZstdFile(path, "rb")
+    try:
+        import zstandard
+    except ImportError:
+        raise BlendError("zstd compressed .blend, reading it needs Python 3.14 or the zstandard package")
+    return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True, closefd=True)
+
+
+def _openUncompressed(path: str) -> BinaryIO:
+    """A real file with the uncompressed .blend, compressed files are unpacked into a temporary one"""
+    with open(path, "rb") as f:
+        magic = f.read(4)
+    if magic[:2] == GZIP_MAGIC:
+        stream = gzip.open(path, "rb")
+    elif magic == ZSTD_MAGIC:
+        stream = _openZstd(path)
+    else:
+        return open(path, "rb")
+
+    out = tempfile.TemporaryFile()
+    try:
+        with stream:
+            while True:
+                data = stream.read(READ_SIZE)
+                if not data:
+                    break
+                out.write(data)
+        out.flush()
+    except BaseException:
+        out.close()
+        raise
+    return out
+
+
+class BlendFile:
+    """
+    Read access to the blocks and DNA structs of a .blend, plain, gzip or zstd compressed.
+
+        with BlendFile(path) as blend:
+            for image in blend.structs("Image"):
+                print(image.get("id.name"), image.get("name"))
+
+    Field names are the ones stored in the file, Blender renames some of them when loading
+    (Image "name" is the file path that Python sees as filepath).
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = _openUncompressed(path)
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self._file.close()
+            raise BlendError(f"{path} is empty")
+        try:
+            self._file.seek(0)
+            self.header = BlendHeader.read(self._file)
+            self.blocks = self._readBlocks()
+            dna = next((b for b in self.blocks if b.code == b"DNA1"), None)
+            if dna is None:
+                raise BlendError(f"{path} has no DNA1 block")
+            self.sdna = parseSDNA(
+                self._map[dna.offset:dna.offset + dna.length], self.header.endian, self.header.pointer_size
+            )
+        except BaseException:
+            self.close()
+            raise
+        self._structIndex = {dna.name: i for i, dna in enumerate(self.sdna)}
+        self._byAddress = {b.old: b for b in self.blocks if b.old}
+        self._pointer = struct.Struct(f"{self.header.endian}{'Q' if self.header.pointer_size == 8 else 'I'}")
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> BlendFile:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _readBlocks(self) -> List[Block]:
+        blocks: List[Block] = []
+        size = len(self._map)
+        offset = len(self.header.raw)
+        bhead_size = self.header.bhead.size
+        while offset + bhead_size <= size:
+            bhead = self.header.unpackBHead(self._map[offset:offset + bhead_size])
+            offset += bhead_size
+            if bhead.code == b"ENDB":
+                return blocks
+            if bhead.length < 0 or offset + bhead.length > size:
+                raise BlendError(f"{self.path}: block at {offset - bhead_size} is truncated")
+            blocks.append(Block(bhead.code, bhead.sdna, bhead.count, bhead.old, offset, bhead.length))
+            offset += bhead.length
+        raise BlendError(f"{self.path}: file ends without ENDB block")
+
+    def structs(self, name: str) -> Iterator[BlendStruct]:
+        """Every struct `name` stored in its own block, all items of array blocks"""
+        index = self._structIndex.get(name)
+        if index is None:
+            return
+        dna = self.sdna[index]
+        for block in self.blocks:
+            if block.sdna != index or dna.size * block.count > block.length:
+                continue
+            for i in range(block.count):
+                yield BlendStruct(self, dna, block.offset + i * dna.size)
+
+    def structAt(self, address: int, type_name: str = "") -> Optional[BlendStruct]:
+        """
+        The struct a pointer points to. Struct blocks know their type, which may be derived from
+        the pointer's (ClothModifierData behind a ModifierData *); raw data blocks have SDNA index 0
+        and are read as `type_name`.
+        """
+        block = self._byAddress.get(address) if address else None
+        if block is None:
+            return None
+        index = block.sdna or self._structIndex.get(type_name, 0)
+        return BlendStruct(self, self.sdna[index], block.offset)
+
+    def value(self, field: DNAField, offset: int) -> Any:
+        if field.pointer:
+            return self._pointer.unpack_from(self._map, offset)[0]
+        if field.type == "char" and field.count > 1:
+            raw = self._map[offset:offset + field.size]
+            return raw.split(b"\0", 1)[0].decode("utf-8", "replace")
+        fmt = DNA_NUMBERS.get(field.type)
+        if fmt is None:
+            return self._map[offset:offset + field.size]
+        values = struct.unpack_from(f"{self.header.endian}{field.count}{fmt}", self._map, offset)
+        return values[0] if field.count == 1 else values
+
+
+class BlendStruct:
+    """One DNA struct in the file, fields are read on access"""
+
+    def __init__(self, blend: BlendFile, dna: DNAStruct, offset: int) -> None:
+        self.blend = blend
+        self.dna = dna
+        self.offset = offset
+
+    @property
+    def typeName(self) -> str:
+        return self.dna.name
+
+    def has(self, name: str) -> bool:
+        return name in self.dna.fields
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """A field value; "id.name" reads into nested structs. Pointers are addresses."""
+        head, _, rest = name.partition(".")
+        field = self.dna.fields.get(head)
+        if field is None:
+            return default
+        offset = self.offset + field.offset
+        if rest:
+            index = self.blend._structIndex.get(field.type)
+            if index is None or field.pointer:
+                return default
+            return BlendStruct(self.blend, self.blend.sdna[index], offset).get(rest, default)
+        return self.blend.value(field, offset)
+
+    def first(self, *names: str, default: Any = None) -> Any:
+        """The value of the first of `names` the struct has"""
+        for name in names:
+            if name in self.dna.fields:
+                return self.get(name)
+        return default
+
+    def pointer(self, name: str) -> Optional[BlendStruct]:
+        field = self.dna.fields.get(name)
+        if field is None or not field.pointer:
+            return None
+        return self.blend.structAt(self.get(name), field.type)
+
+    def listBase(self, name: str) -> Iterator[BlendStruct]:
+        """The items of a ListBase, linked through their "next" pointer"""
+        item = self.blend.structAt(self.get(f"{name}.first", 0))
+        seen = set()
+        while item is not None and item.offset not in seen:
+            seen.add(item.offset)
+            yield item
+            item = item.pointer("next")
+
+
+class BlendIndex:
+    """Offsets, sizes and hashes of the header and every file block of one .blend"""
+
+    def __init__(self) -> None:
+        self.size = 0
+        self.checksum = ""
+        self.algorithm = ""
+        # (code, offset, size incl. BHead, hash)
+        self.blocks: List[Tuple[str, int, int, str]] = []
+
+    def toJson(self) -> Dict:
+        return {
+            "version": INDEX_VERSION,
+            "size": self.size,
+            "checksum": self.checksum,
+            "algorithm": self.algorithm,
+            "blocks": self.blocks,
+        }
+
+    @classmethod
+    def fromJson(cls, data: Dict) -> BlendIndex:
+        if data.get("version") != INDEX_VERSION:
+            raise BlendError("unsupported block index version")
+        index = cls()
+        index.size = data["size"]
+        index.checksum = data["checksum"]
+        index.algorithm = data["algorithm"]
+        index.blocks = [tuple(block) for block in data["blocks"]]
+        return index
+
+    def byHash(self) -> Dict[str, Tuple[int, int]]:
+        found: Dict[str, Tuple[int, int]] = {}
+        for _code, offset, size, digest in self.blocks:
+            found.setdefault(digest, (offset, size))
+        return found
+
+
+def indexBlend(path: str, algorithm: str = "md5") -> BlendIndex:
+    """
+    Reads `path` once, hashing every block with blake2b and the whole file with `algorithm`
+    (md5 gives the job file's check value). Raises BlendError for files it can't parse.
+    """
+    index = BlendIndex()
+    index.algorithm = algorithm
+    whole = hashlib.new(algorithm)
+
+    with open(path, "rb") as f:
+        header = BlendHeader.read(f)
+        whole.update(header.raw)
+        index.blocks.append(("HEAD", 0, len(header.raw), hashlib.blake2b(header.raw, digest_size=BLOCK_DIGEST_SIZE).hexdigest()))
+        offset = len(header.raw)
+
+        while True:
+            bhead = f.read(header.bhead.size)
+            if len(bhead) < header.bhead.size:
+                raise BlendError(f"file ends without ENDB block at {offset}")
+            code, length = header.unpackBHead(bhead)[:2]
+            if length < 0:
+                raise BlendError(f"invalid block length at {offset}")
+
+            block_hash = hashlib.blake2b(bhead, digest_size=BLOCK_DIGEST_SIZE)
+            whole.update(bhead)
+            remaining = length
+            while remaining:
+                data = f.read(min(READ_SIZE, remaining))
+                if not data:
+                    raise BlendError(f"block at {offset} is truncated")
+                block_hash.update(data)
+                whole.update(data)
+                remaining -= len(data)
+
+            size = header.bhead.size + length
+            name = code.rstrip(b"\0").decode("latin-1")
+            index.blocks.append((name, offset, size, block_hash.hexdigest()))
+            offset += size
+            if code == b"ENDB":
+                break
+
+        # anything after ENDB is kept as it is
+        while True:
+            data = f.read(READ_SIZE)
+            if not data:
+                break
+            whole.update(data)
+            offset += len(data)
+
+    if offset > index.blocks[-1][1] + index.blocks[-1][2]:
+        tail = index.blocks[-1][1] + index.blocks[-1][2]
+        index.blocks.append(("TAIL", tail, offset - tail, _rangeHash(path, tail, offset - tail)))
+    index.size = offset
+    index.checksum = whole.hexdigest()
+    return index
+
+
+def _rangeHash(path: str, offset: int, size: int) -> str:
+    h = hashlib.blake2b(digest_size=BLOCK_DIGEST_SIZE)
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for data in _readRange(f, size):
+            h.update(data)
+    return h.hexdigest()
+
+
+def _readRange(f: BinaryIO, size: int):
+    while size:
+        data = f.read(min(READ_SIZE, size))
+        if not data:
+            raise BlendError("unexpected end of file")
+        yield data
+        size -= len(data)
+
+
+class DeltaStats:
+    def __init__(self) -> None:
+        self.blocks = 0
+        self.changedBlocks = 0
+        self.changedBytes = 0
+        self.size = 0
+
+
+def makeBlendDelta(previous: BlendIndex, current: BlendIndex, path: str, delta_path: str) -> DeltaStats:
+    """Writes the delta that rebuilds `path` (indexed as `current`) from the file indexed as `previous`"""
+    known = previous.byHash()
+    stats = DeltaStats()
+    reuse: Optional[List[int]] = None  # [offset, size] in the previous file
+
+    with open(path, "rb") as src, open(delta_path, "wb") as out:
+        out.write(DELTA_MAGIC)
+        out.write(LENGTH.pack(previous.size))
+        out.write(LENGTH.pack(current.size))
+        _writeString(out, previous.checksum)
+        _writeString(out, current.algorithm)
+        _writeString(out, current.checksum)
+
+        def flush() -> None:
+            if reuse is not None:
+                out.write(OP_REUSE)
+                out.write(RANGE.pack(*reuse))
+
+        for _code, offset, size, digest in current.blocks:
+            stats.blocks += 1
+            found = known.get(digest)
+            if found is not None and found[1] == size:
+                if reuse is not None and reuse[0] + reuse[1] == found[0]:
+                    reuse[1] += size
+                else:
+                    flush()
+                    reuse = [found[0], size]
+                continue
+
+            flush()
+            reuse = None
+            stats.changedBlocks += 1
+            stats.changedBytes += size
+            out.write(OP_DATA)
+            out.write(LENGTH.pack(size))
+            src.seek(offset)
+            for data in _readRange(src, size):
+                out.write(data)
+        flush()
+        out.write(OP_END)
+        stats.size = out.tell()
+    return stats
+
+
+def applyBlendDelta(previous_path: str, delta_path: str, out_path: str) -> None:
+    """Rebuilds the new .blend from the previous one and a delta and checks its size and checksum"""
+    with open(delta_path, "rb") as delta, open(previous_path, "rb") as previous:
+        if delta.read(len(DELTA_MAGIC)) != DELTA_MAGIC:
+            raise BlendError("not a .blend delta")
+        (previous_size,) = LENGTH.unpack(delta.read(LENGTH.size))
+        (size,) = LENGTH.unpack(delta.read(LENGTH.size))
+        _previous_checksum = _readString(delta)
+        algorithm = _readString(delta)
+        checksum = _readString(delta)
+        if os.fstat(previous.fileno()).st_size != previous_size:
+            raise BlendError(f"{previous_path} is not the file the delta was made against")
+
+        h = hashlib.new(algorithm)
+        tmp_path = f"{out_path}.part"
+        try:
+            with open(tmp_path, "wb") as out:
+                while True:
+                    op = delta.read(1)
+                    if op == OP_END:
+                        break
+                    if op == OP_REUSE:
+                        offset, length = RANGE.unpack(delta.read(RANGE.size))
+                        previous.seek(offset)
+                        chunks = _readRange(previous, length)
+                    elif op == OP_DATA:
+                        (length,) = LENGTH.unpack(delta.read(LENGTH.size))
+                        chunks = _readRange(delta, length)
+                    else:
+                        raise BlendError("delta is truncated" if not op else f"unknown delta op {op!r}")
+                    for data in chunks:
+                        out.write(data)
+                        h.update(data)
+
+                if out.tell() != size:
+                    raise BlendError(f"rebuilt {out.tell()} bytes, expected {size}")
+            if h.hexdigest() != checksum:
+                raise BlendError("checksum of the rebuilt file doesn't match")
+            os.replace(tmp_path, out_path)
+        finally:
+            with suppress(OSError):
+                os.remove(tmp_path)
+
+
+def sameContent(path: str, other: str) -> bool:
+    """Byte for byte comparison"""
+    if os.path.getsize(path) != os.path.getsize(other):
+        return False
+    with open(path, "rb") as a, open(other, "rb") as b:
+        while True:
+            data = a.read(READ_SIZE)
+            if data != b.read(READ_SIZE):
+                return False
+            if not data:
+                return True
+
+
+def _writeString(f: BinaryIO, text: str) -> None:
+    data = text.encode("utf-8")
+    f.write(struct.pack("<H", len(data)))
+    f.write(data)
+
+
+def _readString(f: BinaryIO) -> str:
+    (length,) = struct.unpack("<H", f.read(2))
+    return f.read(length).decode("utf-8")
+
+
+class BlendDeltaState:
+    """
+    The previous export of a project's .blend and its block index, kept in the state folder.
+    The copy is a reflink or hardlink where the file system allows it.
+    """
+
+    def __init__(self, folder: str) -> None:
+        self.folder = folder
+        self.blend_path = os.path.join(folder, "previous.blend")
+        self.index_path = os.path.join(folder, "previous.json")
+
+    def previous(self) -> Optional[BlendIndex]:
+        if not os.path.isfile(self.blend_path):
+            return None
+        with suppress(OSError, ValueError, KeyError, BlendError):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = BlendIndex.fromJson(json.load(f))
+            if index.size == os.path.getsize(self.blend_path):
+                return index
+        return None
+
+    def keep(self, path: str, index: BlendIndex, stage_file) -> None:
+        """Remembers `path` as the previous export, `stage_file(src, dst)` places the copy"""
+        os.makedirs(self.folder, exist_ok=True)
+        with suppress(OSError):
+            os.remove(self.index_path)
+        try:
+            stage_file(path, self.blend_path)
+            with open(f"{self.index_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(index.toJson(), f)
+            os.replace(f"{self.index_path}.tmp", self.index_path)
+        except OSError as e:
+            print(f"blend delta: could not keep {path} {e}")
+
+
+def main(argv: List[str]) -> int:
+    if len(argv) == 2 and argv[0] == "index":
+        index = indexBlend(argv[1])
+        print(f"{len(index.blocks)} blocks, {index.size} bytes, md5 {index.checksum}")
+        return 0
+    if len(argv) == 4 and argv[0] == "diff":
+        stats = makeBlendDelta(indexBlend(argv[1]), indexBlend(argv[2]), argv[2], argv[3])
+        print(f"{stats.changedBlocks} of {stats.blocks} blocks changed, delta {stats.size} bytes")
+        return 0
+    if len(argv) == 4 and argv[0] == "apply":
+        applyBlendDelta(argv[1], argv[2], argv[3])
+        return 0
+    if len(argv) == 3 and argv[0] == "compare":
+        same = sameContent(argv[1], argv[2])
+        print("identical" if same else "different")
+        return 0 if same else 1
+    print(__doc__)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,259 @@
+from __future__ import annotations
+import os
+import json
+import struct
+import hashlib
+from contextlib import suppress
+
+from .assetManifest import Asset
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+# Bundle layout:
+#   MAGIC | file data ... | index (utf-8 json) | footer
+# the footer is struct FOOTER: index offset, index size, MAGIC.
+# The index lists every file (path, offset, size, mtime_ns) and the blake2b
+# digest of every CHUNK_SIZE block of the data region.
+MAGIC = b"FARMBDL1"
+FOOTER = struct.Struct("<QQ8s")
+INDEX_VERSION = 1
+CHUNK_SIZE = 1024 * 1024
+DIGEST_SIZE = 16
+
+BUNDLE_FOLDER = "bundles"
+BUNDLE_EXT = ".fbdl"
+DEFAULT_THRESHOLD = 256 * 1024
+MAX_BUNDLE_SIZE = 256 * 1024 * 1024
+
+
+class BundleError(Exception):
+    pass
+
+
+class BundleWriter:
+    """Streams files into one bundle, hashing the data region block by block as it goes"""
+
+    def __init__(self, path: str, chunk_size: int = CHUNK_SIZE) -> None:
+        self.path = path
+        self.chunk_size = chunk_size
+        self.entries: List[Dict[str, Any]] = []
+        self.chunks: List[str] = []
+        self.dataSize = 0
+        self._hash = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        self._filled = 0
+        self._file: BinaryIO = open(f"{path}.part", "wb")
+        self._file.write(MAGIC)
+
+    def add(self, virtual_path: str, local_path: str) -> None:
+        """Appends `local_path`. Raises OSError if it can't be read, the bundle stays consistent."""
+        offset = self.dataSize
+        with open(local_path, "rb") as f:
+            st = os.fstat(f.fileno())
+            try:
+                while True:
+                    data = f.read(self.chunk_size - self._filled)
+                    if not data:
+                        break
+                    self._write(data)
+            except OSError:
+                # drop what got in of this file
+                self._truncate(offset)
+                raise
+        self.entries.append(
+            {"path": virtual_path, "offset": offset, "size": self.dataSize - offset, "mtime_ns": st.st_mtime_ns}
+        )
+
+    def _write(self, data: bytes) -> None:
+        self._file.write(data)
+        self._hash.update(data)
+        self._filled += len(data)
+        self.dataSize += len(data)
+        if self._filled == self.chunk_size:
+            self.chunks.append(self._hash.hexdigest())
+            self._hash = hashlib.blake2b(digest_size=DIGEST_SIZE)
+            self._filled = 0
+
+    def _truncate(self, offset: int) -> None:
+        """Rewinds the data region to `offset` and rehashes the block it ends in"""
+        self._file.flush()
+        chunk_start = offset - offset % self.chunk_size
+        with open(f"{self.path}.part", "rb") as f:
+            f.seek(len(MAGIC) + chunk_start)
+            kept = f.read(offset - chunk_start)
+
+        del self.chunks[chunk_start // self.chunk_size:]
+        self._file.seek(len(MAGIC) + chunk_start)
+        self._file.truncate()
+        self.dataSize = chunk_start
+        self._hash = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        self._filled = 0
+        self._write(kept)
+
+    def contentName(self) -> str:
+        """Digest of the bundled paths and data, the same for the same files in the same order"""
+        h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        for entry in self.entries:
+            h.update(f"{entry['path']}\0{entry['size']}\0".encode("utf-8"))
+        for chunk in self.chunks:
+            h.update(chunk.encode("ascii"))
+        if self._filled:
+            h.update(self._hash.copy().hexdigest().encode("ascii"))
+        return h.hexdigest()
+
+    def close(self, path: Optional[str] = None) -> None:
+        """Writes index and footer and moves the bundle in place, to `path` if given"""
+        if self._filled:
+            self.chunks.append(self._hash.hexdigest())
+        index = json.dumps(
+            {
+                "version": INDEX_VERSION,
+                "chunk_size": self.chunk_size,
+                "data_size": self.dataSize,
+                "chunks": self.chunks,
+                "entries": self.entries,
+            },
+            separators=(",", ":"),
+        ).encode("utf-8")
+        index_offset = len(MAGIC) + self.dataSize
+        self._file.write(index)
+        self._file.write(FOOTER.pack(index_offset, len(index), MAGIC))
+        self._file.close()
+        os.replace(f"{self.path}.part", path or self.path)
+        if path:
+            self.path = path
+
+    def abort(self) -> None:
+        self._file.close()
+        with suppress(OSError):
+            os.remove(f"{self.path}.part")
+
+
+def isBundleCandidate(asset: Asset, threshold: int) -> bool:
+    # content addressed textures are deduplicated on the farm, they stay single files
+    return asset.filesize < threshold and "/cas/" not in asset.path
+
+
+def writeBundles(
+    assets: Iterable[Asset],
+    folder: str,
+    threshold: int = DEFAULT_THRESHOLD,
+    max_bundle_size: int = MAX_BUNDLE_SIZE,
+) -> Tuple[List[Asset], List[Asset], Dict[str, List[str]]]:
+    """
+    Packs the assets smaller than `threshold` into bundles of at most `max_bundle_size`
+    bytes below `folder`/bundles. Bundles are named after their content (see
+    BundleWriter.contentName), so an unchanged bundle keeps its name from export to
+    export; bundles of earlier exports are removed.
+
+    Returns (bundle assets, assets shipped as they are, bundled virtual paths per bundle
+    virtual path). Files that can't be read stay unbundled, so the usual checks report them.
+    """
+    bundle_folder = os.path.join(folder, BUNDLE_FOLDER)
+    bundles: List[Asset] = []
+    single: List[Asset] = []
+    contents: Dict[str, List[str]] = {}
+    writer: Optional[BundleWriter] = None
+
+    def finish() -> None:
+        if writer is None:
+            return
+        if not writer.entries:
+            writer.abort()
+            return
+        writer.close(os.path.join(bundle_folder, f"{writer.contentName()}{BUNDLE_EXT}"))
+        virtual_path = f"{BUNDLE_FOLDER}/{os.path.basename(writer.path)}"
+        bundles.append(Asset(virtual_path, writer.path))
+        contents[virtual_path] = [entry["path"] for entry in writer.entries]
+
+    try:
+        for asset in assets:
+            if not isBundleCandidate(asset, threshold):
+                single.append(asset)
+                continue
+
+            if writer is not None and writer.dataSize + asset.filesize > max_bundle_size:
+                finish()
+                writer = None
+            if writer is None:
+                os.makedirs(bundle_folder, exist_ok=True)
+                writer = BundleWriter(os.path.join(bundle_folder, f"{len(bundles):03d}{BUNDLE_EXT}"))
+
+            try:
+                writer.add(asset.path, asset.pathlocal)
+            except OSError:
+                single.append(asset)
+        finish()
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+
+    written = {os.path.basename(bundle.pathlocal) for bundle in bundles}
+    with suppress(OSError):
+        for filename in os.listdir(bundle_folder):
+            if filename.endswith(BUNDLE_EXT) and filename not in written:
+                with suppress(OSError):
+                    os.remove(os.path.join(bundle_folder, filename))
+    return bundles, single, contents
+
+
+def readIndex(f: BinaryIO) -> Dict[str, Any]:
+    f.seek(0)
+    if f.read(len(MAGIC)) != MAGIC:
+        raise BundleError("not a bundle")
+    f.seek(-FOOTER.size, os.SEEK_END)
+    index_offset, index_size, magic = FOOTER.unpack(f.read(FOOTER.size))
+    if magic != MAGIC:
+        raise BundleError("bundle footer missing, the file is truncated")
+    f.seek(index_offset)
+    index = json.loads(f.read(index_size).decode("utf-8"))
+    if index.get("version") != INDEX_VERSION:
+        raise BundleError(f"unsupported bundle version {index.get('version')}")
+    return index
+
+
+def verifyBundle(f: BinaryIO, index: Dict[str, Any]) -> List[int]:
+    """Returns the numbers of the chunks whose checksum doesn't match"""
+    chunk_size = index["chunk_size"]
+    bad: List[int] = []
+    f.seek(len(MAGIC))
+    remaining = index["data_size"]
+    for i, digest in enumerate(index["chunks"]):
+        data = f.read(min(chunk_size, remaining))
+        remaining -= len(data)
+        if hashlib.blake2b(data, digest_size=DIGEST_SIZE).hexdigest() != digest:
+            bad.append(i)
+    return bad
+
+
+def extractBundle(path: str, dest_folder: str, verify: bool = True) -> List[str]:
+    """Unpacks a bundle below `dest_folder`, restoring mtimes. Returns the extracted virtual paths."""
+    with open(path, "rb") as f:
+        index = readIndex(f)
+        if verify:
+            bad = verifyBundle(f, index)
+            if bad:
+                raise BundleError(f"{path}: checksum mismatch in chunks {bad}")
+
+        extracted: List[str] = []
+        for entry in index["entries"]:
+            dest = os.path.join(dest_folder, *entry["path"].split("/"))
+            if os.path.commonpath([os.path.abspath(dest), os.path.abspath(dest_folder)]) != os.path.abspath(dest_folder):
+                raise BundleError(f"{path}: entry outside the target folder {entry['path']}")
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+
+            f.seek(len(MAGIC) + entry["offset"])
+            remaining = entry["size"]
+            with open(dest, "wb") as out:
+                while remaining:
+                    data = f.read(min(CHUNK_SIZE, remaining))
+                    if not data:
+                        raise BundleError(f"{path}: data of {entry['path']} is truncated")
+                    out.write(data)
+                    remaining -= len(data)
+            os.utime(dest, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+            extracted.append(entry["path"])
+    return extracted
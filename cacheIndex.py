@@ -0,0 +1,274 @@
+from __future__ import annotations
+import os
+import re
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from .statCache import PROBE_TIMEOUT, PROBE_WORKERS
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, List, Optional, Set, Tuple, Any
+
+# point caches: <name>_<frame:6>_<index:2>.bphys
+BPHYS_RE = re.compile(r"^(?P<name>.+)_(?P<frame>\d{6})_(?P<index>\d{2})\.bphys$")
+# everything else puts the frame last, after an underscore and padded to at least 4 digits:
+# data_0012.vdb, lMesh_0012.bobj.gz, disp_0001.exr. Other digits (wave_v2.uni, lowres2.abc)
+# are part of the name of a file that belongs to no frame
+FRAME_RE = re.compile(r"^(?P<name>.+)_(?P<frame>\d{4,})$")
+DOUBLE_EXTENSIONS = (".bobj.gz", ".obj.gz", ".tar.gz")
+# subfolders Blender writes below a Mantaflow cache directory
+MANTAFLOW_FOLDERS = ("config", "data", "noise", "mesh", "particles", "guiding")
+
+
+def parseCacheFilename(filename: str) -> Tuple[str, Optional[int]]:
+    """Returns (name, frame) of a cache file, frame is None for files that don't belong to a frame"""
+    match = BPHYS_RE.match(filename)
+    if match:
+        return match.group("name"), int(match.group("frame"))
+
+    lower = filename.lower()
+    ext = next((e for e in DOUBLE_EXTENSIONS if lower.endswith(e)), None)
+    stem = filename[: -len(ext)] if ext else os.path.splitext(filename)[0]
+    match = FRAME_RE.match(stem)
+    if match is None:
+        return stem, None
+    return match.group("name"), int(match.group("frame"))
+
+
+class CacheFile:
+    __slots__ = ("relpath", "path", "name", "frame", "stat")
+
+    def __init__(self, relpath: str, path: str, stat: Any) -> None:
+        self.relpath = relpath
+        self.path = path
+        self.stat = stat
+        self.name, self.frame = parseCacheFilename(os.path.basename(relpath))
+
+    @property
+    def size(self) -> int:
+        return self.stat.st_size
+
+
+class CacheDirIndex:
+    """
+    All files below a cache root, found in one scan.
+
+    Keeps each file's stat (from os.scandir) and the frame number parsed from
+    its name, so validation and packaging can share a single directory walk.
+    Dotfiles are ignored. An index whose scan didn't finish in time is `timedOut`
+    and counts as missing.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.exists = False
+        self.timedOut = False
+        self.files: List[CacheFile] = []
+        self._byFolder: Dict[str, List[CacheFile]] = {}
+        self._folders: List[str] = []
+
+    def scan(self) -> CacheDirIndex:
+        self.exists = os.path.isdir(self.root)
+        self.files = []
+        self._byFolder = {}
+        self._folders = []
+        if self.exists:
+            self._scan(self.root, "")
+        return self
+
+    def _scan(self, folder: str, relfolder: str) -> None:
+        try:
+            entries = sorted(os.scandir(folder), key=lambda entry: entry.name)
+        except OSError:
+            return
+
+        files = self._byFolder.setdefault(relfolder, [])
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            relpath = f"{relfolder}/{entry.name}" if relfolder else entry.name
+            try:
+                if entry.is_dir():
+                    self._folders.append(relpath)
+                    self._scan(entry.path, relpath)
+                elif entry.is_file():
+                    cache_file = CacheFile(relpath, entry.path, entry.stat())
+                    files.append(cache_file)
+                    self.files.append(cache_file)
+            except OSError:
+                continue
+
+    @property
+    def isEmpty(self) -> bool:
+        return not self.files
+
+    def subfolders(self) -> List[str]:
+        """Folders directly below the root"""
+        return [folder for folder in self._folders if "/" not in folder]
+
+    def filesIn(self, relfolder: str = "") -> List[CacheFile]:
+        """Files directly inside `relfolder` ("" is the root)"""
+        return self._byFolder.get(relfolder.replace("\\", "/").strip("/"), [])
+
+    def frames(self, files: Optional[Iterable[CacheFile]] = None) -> Set[int]:
+        return {f.frame for f in (self.files if files is None else files) if f.frame is not None}
+
+    def missingFrames(self, start: int, end: int, files: Optional[Iterable[CacheFile]] = None) -> List[int]:
+        """Frames in [start, end] without a cache file. Empty if the files carry no frame numbers at all."""
+        frames = self.frames(files)
+        if not frames:
+            return []
+        return [frame for frame in range(start, end + 1) if frame not in frames]
+
+
+class CacheIndexRegistry:
+    """Scans each cache root at most once per check; the owner clears it when a new check starts"""
+
+    def __init__(self) -> None:
+        self._indices: Dict[str, CacheDirIndex] = {}
+
+    def get(self, root: str) -> CacheDirIndex:
+        key = os.path.normpath(root)
+        index = self._indices.get(key)
+        if index is None:
+            index = self._indices[key] = CacheDirIndex(root).scan()
+        return index
+
+    def prefetch(
+        self, roots: Iterable[str], max_workers: int = PROBE_WORKERS, timeout: float = PROBE_TIMEOUT
+    ) -> int:
+        """
+        Scans the roots that aren't indexed yet concurrently. Roots not scanned within
+        `timeout` seconds of the start are indexed as missing and `timedOut`, so a hanging
+        share isn't scanned again by get(). Returns the number of scanned indices.
+        """
+        todo: Dict[str, str] = {}
+        for root in roots:
+            key = os.path.normpath(root)
+            if root and key not in self._indices:
+                todo.setdefault(key, root)
+        if not todo:
+            return 0
+
+        pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="farm_probe")
+        futures: List[Future] = []
+        try:
+            futures = [pool.submit(CacheDirIndex(root).scan) for root in todo.values()]
+            # one deadline for the whole batch, like StatCache.prefetch
+            wait(futures, timeout=timeout)
+
+            scanned = 0
+            for (key, root), future in zip(todo.items(), futures):
+                if future.done() and not future.cancelled():
+                    self._indices[key] = future.result()
+                    scanned += 1
+                else:
+                    print(f"cache scan timed out: {root}")
+                    index = self._indices[key] = CacheDirIndex(root)
+                    index.timedOut = True
+            return scanned
+        finally:
+            # the scan threads of a hanging share are abandoned, not joined
+            try:
+                pool.shutdown(wait=False, cancel_futures=True)
+            except TypeError:
+                # Python < 3.9
+                for future in futures:
+                    future.cancel()
+                pool.shutdown(wait=False)
+
+    def clear(self) -> None:
+        self._indices.clear()
+
+
+def mantaflowFrameFolder(domain: Any) -> str:
+    """The Mantaflow cache subfolder that has a file for every rendered frame"""
+    if getattr(domain, "domain_type", "GAS") == "LIQUID" and getattr(domain, "use_mesh", False):
+        return "mesh"
+    return "data"
+
+
+def mantaflowFolders(domain: Any) -> Set[str]:
+    """
+    The subfolders of a Mantaflow cache a render of `domain` reads.
+
+    Config is always needed. Gas renders the data grids and, with noise, the
+    noise grids. Liquid renders the mesh if one was baked, else the data
+    (which also holds the FLIP particles), and the secondary particles if any
+    are enabled. Guiding is only used while baking.
+    """
+    needed = {"config"}
+    if getattr(domain, "domain_type", "GAS") == "LIQUID":
+        use_mesh = getattr(domain, "use_mesh", False)
+        if use_mesh:
+            needed.add("mesh")
+        if not use_mesh or getattr(domain, "use_flip_particles", False):
+            needed.add("data")
+        if any(
+            getattr(domain, f"use_{kind}_particles", False) for kind in ("spray", "foam", "bubble", "tracer")
+        ):
+            needed.add("particles")
+    else:
+        needed.add("data")
+        if getattr(domain, "use_noise", False):
+            needed.add("noise")
+    return needed
+
+
+def mantaflowSubfolders(needed: Iterable[str], subfolders: Iterable[str]) -> List[str]:
+    """`subfolders` without the Mantaflow folders that aren't `needed`, folders not written by Blender are kept"""
+    needed = set(needed)
+    return [folder for folder in subfolders if folder in needed or folder not in MANTAFLOW_FOLDERS]
+
+
+class CachePruning:
+    """
+    Keeps the cache files of the frames that get rendered.
+    Whole folders a render doesn't read are dropped with skip().
+
+    `ranges` are inclusive (start, end) frame ranges. Files without a frame
+    number (cache metadata) are always kept; everything skipped is counted.
+    """
+
+    def __init__(self, ranges: List[Tuple[int, int]]) -> None:
+        self.ranges = ranges
+        self.skippedFiles = 0
+        self.skippedBytes = 0
+
+    def keep(self, cache_file: CacheFile) -> bool:
+        if cache_file.frame is None or any(start <= cache_file.frame <= end for start, end in self.ranges):
+            return True
+        self.skippedFiles += 1
+        self.skippedBytes += cache_file.size
+        return False
+
+    def filter(self, files: Iterable[CacheFile]) -> List[CacheFile]:
+        return [cache_file for cache_file in files if self.keep(cache_file)]
+
+    def skip(self, files: Iterable[CacheFile]) -> None:
+        for cache_file in files:
+            self.skippedFiles += 1
+            self.skippedBytes += cache_file.size
+
+    def toSection(self) -> Dict[str, str]:
+        return {
+            "frames": " ".join(f"{start}-{end}" for start, end in self.ranges),
+            "skippedfiles": str(self.skippedFiles),
+            "skippedbytes": str(self.skippedBytes),
+        }
+
+
+def formatFrames(frames: List[int], limit: int = 10) -> str:
+    """[1, 2, 3, 7] -> "1-3, 7" """
+    ranges: List[str] = []
+    start = prev = None
+    for frame in frames + [None]:
+        if start is not None and frame is not None and frame == prev + 1:
+            prev = frame
+            continue
+        if start is not None:
+            ranges.append(str(start) if start == prev else f"{start}-{prev}")
+        start = prev = frame
+    text = ", ".join(ranges[:limit])
+    return text + ", ..." if len(ranges) > limit else text
@@ -0,0 +1,403 @@
+"""
+rsync style deltas between two versions of a large asset.
+
+The previous version is described by a signature: a weak (rolling) and a strong
+checksum for every block. The new version is scanned for blocks the signature
+knows at any byte offset; the delta is a stream of block copies and literal data.
+
+No relative imports: the farm side (or a local stand-in manager) can run this file
+on its own to rebuild a file:
+
+    python delta.py apply <previous version> <delta> <output>
+"""
+from __future__ import annotations
+import os
+import sys
+import mmap
+import struct
+import hashlib
+import itertools
+from collections import namedtuple
+from contextlib import suppress
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+    from .assetManifest import Asset
+
+# same as hashing.DEFAULT_ALGORITHM, so checksums match the job file
+ALGORITHM = "blake2b"
+STRONG_SIZE = 16
+DEFAULT_BLOCK_SIZE = 64 * 1024
+# more blocks make bigger signatures without finding much more
+MAX_BLOCKS = 1 << 20
+# window starts scanned per numpy pass, bounds the memory used
+SEGMENT_SIZE = 4 * 1024 * 1024
+COPY_BUFFER = 1024 * 1024
+
+# only files at least this big are sent as deltas
+MIN_DELTA_FILE_SIZE = 16 * 1024 * 1024
+# a delta that isn't clearly smaller than the file isn't worth the rebuild
+MAX_DELTA_RATIO = 0.8
+
+SIGNATURE_MAGIC = b"FARMSIG1"
+DELTA_MAGIC = b"FARMDLT1"
+HEADER = struct.Struct("<IQQ")
+COUNT = struct.Struct("<Q")
+OP_COPY = b"C"
+OP_DATA = b"D"
+OP_END = b"E"
+COPY_ARGS = struct.Struct("<QQ")
+
+DeltaInfo = namedtuple("DeltaInfo", ["path", "base", "size"])
+
+
+class DeltaError(Exception):
+    pass
+
+
+def blockSizeFor(size: int) -> int:
+    block_size = DEFAULT_BLOCK_SIZE
+    while size // block_size > MAX_BLOCKS:
+        block_size *= 2
+    return block_size
+
+
+def weakChecksum(data: bytes) -> int:
+    """Rolling checksum of one block: a = sum(x), b = sum((len - i) * x[i]), both mod 2^16"""
+    a = sum(data)
+    b = sum(itertools.accumulate(data))
+    return (a & 0xFFFF) | ((b & 0xFFFF) << 16)
+
+
+def strongChecksum(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=STRONG_SIZE).digest()
+
+
+def _blockWeakChecksums(data: bytes, block_size: int) -> List[int]:
+    """weakChecksum of every full block of `data`"""
+    count = len(data) // block_size
+    if np is None or count == 0:
+        return [weakChecksum(data[i * block_size:(i + 1) * block_size]) for i in range(count)]
+
+    blocks = np.frombuffer(data, dtype=np.uint8, count=count * block_size).reshape(count, block_size)
+    weights = np.arange(block_size, 0, -1, dtype=np.int64)
+    a = blocks.sum(axis=1, dtype=np.int64)
+    b = blocks.astype(np.int64) @ weights
+    return ((a & 0xFFFF) | ((b & 0xFFFF) << 16)).tolist()
+
+
+class Signature:
+    def __init__(self, block_size: int, size: int, mtime_ns: int, checksum: str) -> None:
+        self.block_size = block_size
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.checksum = checksum
+        self.weak: List[int] = []
+        self.strong: List[bytes] = []
+
+    def table(self) -> Dict[int, List[int]]:
+        """Block numbers by weak checksum. A partial last block can't match a full window, it is left out."""
+        table: Dict[int, List[int]] = {}
+        for i, weak in enumerate(self.weak[: self.size // self.block_size]):
+            table.setdefault(weak, []).append(i)
+        return table
+
+    def write(self, f: BinaryIO) -> None:
+        f.write(SIGNATURE_MAGIC)
+        f.write(HEADER.pack(self.block_size, self.size, self.mtime_ns))
+        _writeString(f, self.checksum)
+        f.write(COUNT.pack(len(self.weak)))
+        f.write(struct.pack(f"<{len(self.weak)}I", *self.weak))
+        f.write(b"".join(self.strong))
+
+    @classmethod
+    def read(cls, f: BinaryIO) -> Signature:
+        if f.read(len(SIGNATURE_MAGIC)) != SIGNATURE_MAGIC:
+            raise DeltaError("not a signature")
+        sig = cls(*HEADER.unpack(f.read(HEADER.size)), _readString(f))
+        (count,) = COUNT.unpack(f.read(COUNT.size))
+        sig.weak = list(struct.unpack(f"<{count}I", f.read(4 * count)))
+        strong = f.read(STRONG_SIZE * count)
+        if len(strong) != STRONG_SIZE * count:
+            raise DeltaError("signature is truncated")
+        sig.strong = [strong[i:i + STRONG_SIZE] for i in range(0, len(strong), STRONG_SIZE)]
+        return sig
+
+
+def computeSignature(path: str, checksum: str = "", block_size: int = 0) -> Signature:
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        sig = Signature(block_size or blockSizeFor(st.st_size), st.st_size, st.st_mtime_ns, checksum)
+        # whole blocks per read, so the numpy path gets big batches
+        read_size = max(sig.block_size, SEGMENT_SIZE - SEGMENT_SIZE % sig.block_size)
+        while True:
+            data = f.read(read_size)
+            if not data:
+                break
+            full = len(data) - len(data) % sig.block_size
+            sig.weak.extend(_blockWeakChecksums(data, sig.block_size))
+            sig.strong.extend(strongChecksum(data[i:i + sig.block_size]) for i in range(0, full, sig.block_size))
+            if full < len(data):
+                sig.weak.append(weakChecksum(data[full:]))
+                sig.strong.append(strongChecksum(data[full:]))
+    return sig
+
+
+def _candidates(data: mmap.mmap, size: int, block_size: int, weak_keys: List[int]) -> Iterator[Tuple[int, int]]:
+    """(offset, weak checksum) of every window whose weak checksum the signature knows, in order"""
+    last_start = size - block_size
+    if last_start < 0:
+        return
+
+    if np is None:
+        # without numpy only block aligned positions are looked at
+        known = set(weak_keys)
+        for offset in range(0, last_start + 1, block_size):
+            weak = weakChecksum(data[offset:offset + block_size])
+            if weak in known:
+                yield offset, weak
+        return
+
+    keys = np.array(sorted(weak_keys), dtype=np.int64)
+    view = np.frombuffer(data, dtype=np.uint8)
+    for seg_start in range(0, last_start + 1, SEGMENT_SIZE):
+        starts = min(SEGMENT_SIZE, last_start + 1 - seg_start)
+        x = view[seg_start:seg_start + starts + block_size - 1].astype(np.int64)
+        # window k: a = S[k+B] - S[k], b = (B + k) * a - (T[k+B] - T[k]) with T the cumsum of j * x[j]
+        s = np.zeros(len(x) + 1, dtype=np.int64)
+        np.cumsum(x, out=s[1:])
+        t = np.zeros(len(x) + 1, dtype=np.int64)
+        np.cumsum(x * np.arange(len(x), dtype=np.int64), out=t[1:])
+        k = np.arange(starts, dtype=np.int64)
+        a = s[block_size:block_size + starts] - s[:starts]
+        b = (block_size + k) * a - (t[block_size:block_size + starts] - t[:starts])
+        weak = (a & 0xFFFF) | ((b & 0xFFFF) << 16)
+        hits = np.nonzero(np.isin(weak, keys, assume_unique=False))[0]
+        for hit in hits.tolist():
+            yield seg_start + hit, int(weak[hit])
+
+
+class _DeltaWriter:
+    def __init__(self, f: BinaryIO, data: mmap.mmap) -> None:
+        self.f = f
+        self.data = data
+        self.copy: Optional[List[int]] = None  # [first block, count]
+
+    def literal(self, start: int, end: int) -> None:
+        if end <= start:
+            return
+        self._flushCopy()
+        for offset in range(start, end, COPY_BUFFER):
+            chunk = self.data[offset:min(end, offset + COPY_BUFFER)]
+            self.f.write(OP_DATA)
+            self.f.write(COUNT.pack(len(chunk)))
+            self.f.write(chunk)
+
+    def block(self, index: int) -> None:
+        if self.copy is not None and self.copy[0] + self.copy[1] == index:
+            self.copy[1] += 1
+            return
+        self._flushCopy()
+        self.copy = [index, 1]
+
+    def _flushCopy(self) -> None:
+        if self.copy is not None:
+            self.f.write(OP_COPY)
+            self.f.write(COPY_ARGS.pack(*self.copy))
+            self.copy = None
+
+    def end(self) -> None:
+        self._flushCopy()
+        self.f.write(OP_END)
+
+
+def makeDelta(signature: Signature, path: str, delta_path: str, checksum: str = "") -> int:
+    """
+    Writes the delta that turns the file described by `signature` into `path`.
+    `checksum` is the new file's hash, stored so the rebuild can be verified.
+    Returns the size of the delta.
+    """
+    table = signature.table()
+    block_size = signature.block_size
+    with open(path, "rb") as f, open(delta_path, "wb") as out:
+        size = os.fstat(f.fileno()).st_size
+        out.write(DELTA_MAGIC)
+        out.write(HEADER.pack(block_size, signature.size, size))
+        _writeString(out, signature.checksum)
+        _writeString(out, checksum)
+        if size == 0:
+            out.write(OP_END)
+            return out.tell()
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            writer = _DeltaWriter(out, data)
+            pos = 0
+            for offset, weak in _candidates(data, size, block_size, list(table)):
+                if offset < pos:
+                    continue
+                strong = strongChecksum(data[offset:offset + block_size])
+                index = next((i for i in table[weak] if signature.strong[i] == strong), None)
+                if index is None:
+                    continue
+                writer.literal(pos, offset)
+                writer.block(index)
+                pos = offset + block_size
+            writer.literal(pos, size)
+            writer.end()
+        return out.tell()
+
+
+def applyDelta(source_path: str, delta_path: str, out_path: str) -> None:
+    """Rebuilds the new version from the previous one and a delta, verifying the result if the delta has a checksum"""
+    with open(delta_path, "rb") as delta, open(source_path, "rb") as source:
+        if delta.read(len(DELTA_MAGIC)) != DELTA_MAGIC:
+            raise DeltaError("not a delta")
+        block_size, source_size, target_size = HEADER.unpack(delta.read(HEADER.size))
+        _base_checksum = _readString(delta)
+        checksum = _readString(delta)
+        if os.fstat(source.fileno()).st_size != source_size:
+            raise DeltaError(f"{source_path} is not the version the delta was made against")
+
+        h = hashlib.new(ALGORITHM)
+        tmp_path = f"{out_path}.part"
+        try:
+            with open(tmp_path, "wb") as out:
+
+                def emit(data: bytes) -> None:
+                    out.write(data)
+                    h.update(data)
+
+                while True:
+                    op = delta.read(1)
+                    if op == OP_END:
+                        break
+                    if op == OP_COPY:
+                        index, count = COPY_ARGS.unpack(delta.read(COPY_ARGS.size))
+                        source.seek(index * block_size)
+                        remaining = count * block_size
+                        while remaining:
+                            data = source.read(min(COPY_BUFFER, remaining))
+                            if not data:
+                                raise DeltaError("delta copies past the end of the previous version")
+                            emit(data)
+                            remaining -= len(data)
+                    elif op == OP_DATA:
+                        (length,) = COUNT.unpack(delta.read(COUNT.size))
+                        data = delta.read(length)
+                        if len(data) != length:
+                            raise DeltaError("delta is truncated")
+                        emit(data)
+                    else:
+                        raise DeltaError("delta is truncated" if not op else f"unknown delta op {op!r}")
+
+                if out.tell() != target_size:
+                    raise DeltaError(f"rebuilt {out.tell()} bytes, expected {target_size}")
+            if checksum and h.hexdigest() != checksum:
+                raise DeltaError("checksum of the rebuilt file doesn't match")
+            os.replace(tmp_path, out_path)
+        finally:
+            with suppress(OSError):
+                os.remove(tmp_path)
+
+
+def _writeString(f: BinaryIO, text: str) -> None:
+    data = text.encode("utf-8")
+    f.write(struct.pack("<H", len(data)))
+    f.write(data)
+
+
+def _readString(f: BinaryIO) -> str:
+    (length,) = struct.unpack("<H", f.read(2))
+    return f.read(length).decode("utf-8")
+
+
+class SignatureStore:
+    """Signatures of the large assets of the last export of a project, one file per virtual path"""
+
+    def __init__(self, folder: str) -> None:
+        self.folder = folder
+
+    def signaturePath(self, path: str) -> str:
+        return os.path.join(self.folder, hashlib.md5(path.encode("utf-8")).hexdigest() + ".sig")
+
+    def load(self, path: str) -> Optional[Signature]:
+        with suppress(OSError, DeltaError, struct.error):
+            with open(self.signaturePath(path), "rb") as f:
+                return Signature.read(f)
+        return None
+
+    def save(self, path: str, signature: Signature) -> None:
+        os.makedirs(self.folder, exist_ok=True)
+        sig_path = self.signaturePath(path)
+        try:
+            with open(f"{sig_path}.tmp", "wb") as f:
+                signature.write(f)
+            os.replace(f"{sig_path}.tmp", sig_path)
+        except OSError as e:
+            print(f"delta: could not write signature of {path} {e}")
+
+    def makeDeltas(
+        self, assets: Iterable[Asset], delta_folder: str, min_size: int = MIN_DELTA_FILE_SIZE
+    ) -> Dict[str, DeltaInfo]:
+        """
+        Writes deltas for the large assets that changed since their signature was taken.
+        Assets need their checksum. Returns the deltas that are worth sending, by virtual path.
+        """
+        deltas: Dict[str, DeltaInfo] = {}
+        for asset in assets:
+            if asset.filesize < min_size:
+                continue
+            signature = self.load(asset.path)
+            if signature is None or signature.checksum == asset.checksum:
+                continue
+
+            os.makedirs(delta_folder, exist_ok=True)
+            name = os.path.splitext(os.path.basename(self.signaturePath(asset.path)))[0]
+            delta_path = os.path.join(delta_folder, f"{name}.fdelta")
+            try:
+                delta_size = makeDelta(signature, asset.pathlocal, delta_path, asset.checksum)
+            except (OSError, ValueError) as e:
+                print(f"delta: could not diff {asset.pathlocal} {e}")
+                continue
+            if delta_size < asset.filesize * MAX_DELTA_RATIO:
+                deltas[asset.path] = DeltaInfo(delta_path, signature.checksum, delta_size)
+            else:
+                with suppress(OSError):
+                    os.remove(delta_path)
+        return deltas
+
+    def update(self, assets: Iterable[Asset], min_size: int = MIN_DELTA_FILE_SIZE) -> None:
+        """Takes signatures of the large assets whose signature is missing or outdated"""
+        for asset in assets:
+            if asset.filesize < min_size:
+                continue
+            signature = self.load(asset.path)
+            if signature is not None and signature.checksum == asset.checksum:
+                continue
+            try:
+                self.save(asset.path, computeSignature(asset.pathlocal, asset.checksum))
+            except OSError as e:
+                print(f"delta: could not read {asset.pathlocal} {e}")
+
+
+def main(argv: List[str]) -> int:
+    if len(argv) == 4 and argv[0] == "apply":
+        applyDelta(argv[1], argv[2], argv[3])
+        return 0
+    if len(argv) == 4 and argv[0] == "diff":
+        # diff <previous version> <new version> <delta>, handy for testing
+        makeDelta(computeSignature(argv[1]), argv[2], argv[3])
+        return 0
+    print(__doc__)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,277 @@
+from __future__ import annotations
+import time
+
+import bpy
+import numpy as np
+
+from .driverIndex import DriverEntry, DriverIndex
+from .keyReduction import BEZTRIPLE_SIZE, channelTolerance, reduceKeys
+from .driverExpressions import (
+    SIMPLE,
+    DRIVER_TYPE,
+    GENERATOR,
+    FNGENERATOR,
+    REWRITE,
+    BAKE,
+    analyzeExpression,
+)
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class BakeStats:
+    def __init__(self) -> None:
+        self.channels = 0
+        self.frames = 0
+        self.keys = 0
+        self.removedKeys = 0
+        self.rewritten = 0
+        self.skipped: List[str] = []
+        self.seconds = 0.0
+
+    @property
+    def savedBytes(self) -> int:
+        """Size the removed keys would have taken in the uncompressed .blend"""
+        return self.removedKeys * BEZTRIPLE_SIZE
+
+    def __str__(self) -> str:
+        text = f"{self.channels} channels over {self.frames} frames, {self.keys} keys in {self.seconds:.2f}s"
+        if self.removedKeys:
+            text += f", {self.removedKeys} keys removed ({self.savedBytes // 1024} KB smaller .blend)"
+        if self.rewritten:
+            text += f", {self.rewritten} drivers rewritten without Python"
+        return text
+
+
+def analyzeDriver(driver: DriverEntry):
+    return analyzeExpression(driver.expression, driver.variables, driver.use_self)
+
+
+def sampleDriver(driver: DriverEntry) -> float:
+    """The driven value, as evaluated for the current frame"""
+    value = driver.id_data.path_resolve(driver.data_path)
+    if not isinstance(value, (int, float)):
+        value = value[driver.array_index]
+    return float(value)
+
+
+def keyframeDefaults() -> Tuple[str, str]:
+    """(interpolation, handle type) of new keyframes from the user preferences"""
+    edit = bpy.context.preferences.edit
+    return edit.keyframe_new_interpolation_type, edit.keyframe_new_handle_type
+
+
+def enumValue(prop: str, identifier: str) -> int:
+    return bpy.types.Keyframe.bl_rna.properties[prop].enum_items[identifier].value
+
+
+def writeKeys(driver: DriverEntry, frames: np.ndarray, values: np.ndarray, defaults: Tuple[str, str]) -> int:
+    """Keys the driven property on the sampled frames. Returns the number of keys."""
+    id_ = driver.id_data
+    fcurve = findFCurve(id_, driver.data_path, driver.array_index)
+    if fcurve is not None and len(fcurve.keyframe_points):
+        # the property is animated already, merge into its keys
+        points = fcurve.keyframe_points
+        for frame, value in zip(frames.tolist(), values.tolist()):
+            points.insert(frame, value, options={'FAST'}).interpolation = defaults[0]
+        fcurve.update()
+        return len(frames)
+
+    if fcurve is None:
+        # creates action, slot and F-curve the way this Blender version wants them
+        if not id_.keyframe_insert(driver.data_path, index=driver.array_index, frame=float(frames[0])):
+            return 0
+        fcurve = findFCurve(id_, driver.data_path, driver.array_index)
+        if fcurve is None:
+            return 0
+
+    count = len(frames)
+    points = fcurve.keyframe_points
+    points.add(count - len(points))
+    co = np.empty(count * 2, dtype=np.float32)
+    co[0::2] = frames
+    co[1::2] = values
+    points.foreach_set("co", co)
+    # handles are placed by update(), free ones stay on their key
+    points.foreach_set("handle_left", co)
+    points.foreach_set("handle_right", co)
+    interpolation = enumValue("interpolation", defaults[0])
+    handle = enumValue("handle_left_type", defaults[1])
+    points.foreach_set("interpolation", np.full(count, interpolation, dtype=np.int32))
+    points.foreach_set("handle_left_type", np.full(count, handle, dtype=np.int32))
+    points.foreach_set("handle_right_type", np.full(count, handle, dtype=np.int32))
+    fcurve.update()
+    return count
+
+
+def findFCurve(id_: Any, data_path: str, index: int) -> Optional[Any]:
+    anim = id_.animation_data
+    action = anim.action if anim is not None else None
+    if action is None:
+        return None
+    if bpy.app.version >= (4, 4, 0):
+        # layered actions keep the F-curves per slot
+        from bpy_extras import anim_utils
+
+        channelbag = anim_utils.action_get_channelbag_for_slot(action, anim.action_slot)
+        return channelbag.fcurves.find(data_path, index=index) if channelbag is not None else None
+    return action.fcurves.find(data_path, index=index)
+
+
+def isIdentityMapping(fcurve: Any) -> bool:
+    """True if the driver F-curve passes the driver value through unchanged"""
+    points = fcurve.keyframe_points
+    modifiers = [m for m in fcurve.modifiers if not m.mute]
+    if len(points) == 0 and not modifiers:
+        return True
+    if len(points) == 0 and len(modifiers) == 1:
+        # what Python's driver_add sets up
+        m = modifiers[0]
+        return (
+            m.type == 'GENERATOR' and m.mode == 'POLYNOMIAL' and m.poly_order == 1 and not m.use_additive
+            and tuple(m.coefficients) == (0.0, 1.0) and not m.use_restricted_range and not m.use_influence
+        )
+    if len(points) == 2 and not modifiers and fcurve.extrapolation == 'LINEAR':
+        # what adding a driver in the UI sets up
+        return (
+            tuple(points[0].co) == (0.0, 0.0) and tuple(points[1].co) == (1.0, 1.0)
+            and points[0].interpolation == 'LINEAR'
+        )
+    return False
+
+
+def replaceWithModifier(driver: DriverEntry, analysis: Any) -> bool:
+    """Replaces a frame only driver by an animation F-curve with a Generator or Built-in Function modifier"""
+    id_ = driver.id_data
+    anim = id_.animation_data
+    driver_fcurve = anim.drivers.find(driver.data_path, index=driver.array_index)
+    if driver_fcurve is None or not isIdentityMapping(driver_fcurve):
+        return False
+    if findFCurve(id_, driver.data_path, driver.array_index) is not None:
+        # keyed as well, the keys would be lost
+        return False
+    if not id_.keyframe_insert(driver.data_path, index=driver.array_index):
+        return False
+    fcurve = findFCurve(id_, driver.data_path, driver.array_index)
+    if fcurve is None:
+        return False
+    for point in reversed(list(fcurve.keyframe_points)):
+        fcurve.keyframe_points.remove(point, fast=True)
+
+    if analysis.kind == GENERATOR:
+        modifier = fcurve.modifiers.new('GENERATOR')
+        modifier.mode = 'POLYNOMIAL'
+        modifier.poly_order = len(analysis.coefficients) - 1
+        for i, coefficient in enumerate(analysis.coefficients):
+            modifier.coefficients[i] = coefficient
+    else:
+        modifier = fcurve.modifiers.new('FNGENERATOR')
+        function, amplitude, multiplier, offset, value = analysis.function
+        modifier.function_type = function
+        modifier.amplitude = amplitude
+        modifier.phase_multiplier = multiplier
+        modifier.phase_offset = offset
+        modifier.value_offset = value
+    anim.drivers.remove(driver_fcurve)
+    return True
+
+
+def rewriteScriptedDrivers(drivers: Iterable[DriverEntry]) -> Tuple[Dict[str, int], List[DriverEntry]]:
+    """
+    Turns the scripted drivers that don't need Python into driver types, F-curve modifiers
+    or simple expressions. Returns how many drivers got which treatment and the drivers
+    that still need baking.
+    """
+    counts: Dict[str, int] = {}
+    remaining: List[DriverEntry] = []
+    for driver in drivers:
+        analysis = analyzeDriver(driver)
+        kind = analysis.kind
+        if kind in (GENERATOR, FNGENERATOR) and not replaceWithModifier(driver, analysis):
+            kind = REWRITE if analysis.expression else BAKE
+
+        fcurve = driver.id_data.animation_data.drivers.find(driver.data_path, index=driver.array_index)
+        if kind == DRIVER_TYPE:
+            fcurve.driver.type = analysis.driver_type
+        elif kind == REWRITE:
+            fcurve.driver.expression = analysis.expression
+            fcurve.driver.use_self = False
+        elif kind == BAKE:
+            remaining.append(driver)
+        if kind != SIMPLE:
+            counts[kind] = counts.get(kind, 0) + 1
+    print(f"rewrite scripted drivers: {counts}")
+    return counts, remaining
+
+
+def removeDrivers(drivers: Iterable[DriverEntry]) -> None:
+    for driver in drivers:
+        anim = driver.id_data.animation_data
+        fcurve = anim.drivers.find(driver.data_path, index=driver.array_index)
+        if fcurve is not None:
+            anim.drivers.remove(fcurve)
+
+
+def bakeScriptedDrivers(
+    scene: bpy.types.Scene, ids: Optional[Iterable[Any]] = None, reduce: bool = False, rewrite: bool = True
+) -> BakeStats:
+    """
+    Bakes the scripted drivers of `ids` (all animated IDs by default) to keyframes and removes them.
+    With `rewrite` the drivers that can do without Python are rewritten first and not baked.
+
+    The frame range is swept once and every driven channel sampled per frame, so the cost
+    is one scene evaluation per frame however many drivers there are. With `reduce` only the
+    keys a LINEAR curve needs to stay within the channel's tolerance of the samples are written.
+    Simple expressions run without Python and are left alone.
+    """
+    stats = BakeStats()
+    start = time.perf_counter()
+    drivers = DriverIndex.build(ids).scripted()
+    if rewrite:
+        counts, drivers = rewriteScriptedDrivers(drivers)
+        stats.rewritten = sum(count for kind, count in counts.items() if kind != BAKE)
+    else:
+        drivers = [driver for driver in drivers if not analyzeDriver(driver).simple]
+    if not drivers:
+        stats.seconds = time.perf_counter() - start
+        return stats
+
+    frames = np.arange(scene.frame_start, scene.frame_end + 1, dtype=np.float32)
+    # one row of samples per driven channel
+    samples = np.empty((len(drivers), len(frames)), dtype=np.float32)
+    valid = np.ones(len(drivers), dtype=bool)
+    current_frame = scene.frame_current
+    try:
+        for column, frame in enumerate(range(scene.frame_start, scene.frame_end + 1)):
+            scene.frame_set(frame)
+            for row, driver in enumerate(drivers):
+                if not valid[row]:
+                    continue
+                try:
+                    samples[row, column] = sampleDriver(driver)
+                except (ValueError, TypeError, IndexError):
+                    # the path doesn't resolve to a number, nothing to bake
+                    valid[row] = False
+                    stats.skipped.append(f"{driver.id_data.name}: {driver.data_path}[{driver.array_index}]")
+    finally:
+        scene.frame_set(current_frame)
+
+    baked = [driver for driver, ok in zip(drivers, valid) if ok]
+    defaults = keyframeDefaults()
+    for driver, values in zip(baked, samples[valid]):
+        if reduce:
+            keep = reduceKeys(frames, values, channelTolerance(driver.data_path))
+            stats.removedKeys += len(frames) - int(keep.sum())
+            stats.keys += writeKeys(driver, frames[keep], values[keep], ('LINEAR', defaults[1]))
+        else:
+            stats.keys += writeKeys(driver, frames, values, defaults)
+        stats.channels += 1
+    removeDrivers(baked)
+
+    stats.frames = len(frames)
+    stats.seconds = time.perf_counter() - start
+    print(f"bake scripted drivers: {stats}")
+    return stats
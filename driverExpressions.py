@@ -0,0 +1,390 @@
+"""
+Classifies scripted driver expressions by what they need to run on the farm.
+
+Blender evaluates a small subset of Python without the interpreter ("simple
+expressions": numbers, driver variables, frame, arithmetic, comparisons, conditionals
+and a fixed set of math functions), so those drivers work with script auto-run off.
+Other expressions often only need a rewrite to fit the subset, are just a SUM,
+AVERAGE, MIN or MAX driver, or depend on the frame alone and can be replaced by an
+F-curve modifier. Only what's left has to be baked.
+"""
+from __future__ import annotations
+import ast
+import math
+from collections import namedtuple
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, List, Optional, Sequence, Set, Tuple
+
+SIMPLE = "simple"  # runs without Python as it is
+DRIVER_TYPE = "driver_type"  # a SUM, AVERAGE, MIN or MAX driver
+GENERATOR = "generator"  # polynomial of the frame, a Generator modifier
+FNGENERATOR = "fngenerator"  # amplitude * fn(multiplier * frame + offset) + value, a Built-in Function modifier
+REWRITE = "rewrite"  # a simple expression once rewritten
+BAKE = "bake"
+
+FRAME = "frame"
+CONSTANTS = {"pi": math.pi, "True": 1.0, "False": 0.0}
+# functions of the simple expression evaluator, (min, max) arguments
+SIMPLE_FUNCTIONS = {
+    "radians": (1, 1),
+    "degrees": (1, 1),
+    "abs": (1, 1),
+    "fabs": (1, 1),
+    "floor": (1, 1),
+    "ceil": (1, 1),
+    "trunc": (1, 1),
+    "round": (1, 1),
+    "int": (1, 1),
+    "sin": (1, 1),
+    "cos": (1, 1),
+    "tan": (1, 1),
+    "asin": (1, 1),
+    "acos": (1, 1),
+    "atan": (1, 1),
+    "atan2": (2, 2),
+    "exp": (1, 1),
+    "log": (1, 2),
+    "sqrt": (1, 1),
+    "pow": (2, 2),
+    "fmod": (2, 2),
+    "min": (2, 2),
+    "max": (2, 2),
+    "clamp": (3, 3),
+    "lerp": (3, 3),
+    "smoothstep": (3, 3),
+}
+SIMPLE_BINARY = {ast.Add: "+", ast.Sub: "-", ast.Mult: "*", ast.Div: "/"}
+SIMPLE_UNARY = {ast.USub: "-", ast.UAdd: "+", ast.Not: "not "}
+SIMPLE_COMPARE = {ast.Eq: "==", ast.NotEq: "!=", ast.Lt: "<", ast.LtE: "<=", ast.Gt: ">", ast.GtE: ">="}
+# F-Modifier function_type of the functions a Built-in Function modifier has
+FN_FUNCTIONS = {"sin": "SIN", "cos": "COS", "tan": "TAN", "sqrt": "SQRT", "log": "LN"}
+MAX_POLY_ORDER = 8
+
+# binding strength for printing, higher binds tighter
+PRECEDENCE = {ast.IfExp: 1, ast.BoolOp: 3, ast.Compare: 5, ast.BinOp: 6, ast.UnaryOp: 8}
+
+# kind, whether the expression runs without Python as it is, the expression to use (REWRITE,
+# fallback of the modifier kinds), driver type (DRIVER_TYPE), polynomial coefficients (GENERATOR),
+# (function, amplitude, multiplier, offset, value) (FNGENERATOR), why it has to be baked (BAKE)
+Analysis = namedtuple(
+    "Analysis", ["kind", "simple", "expression", "driver_type", "coefficients", "function", "reason"]
+)
+
+_NO_VALUE = object()
+
+
+def _number(node: ast.AST) -> Any:
+    """The value of a numeric literal, _NO_VALUE for anything else"""
+    value = _NO_VALUE
+    if isinstance(node, ast.Constant):
+        value = node.value
+    elif hasattr(ast, "Num") and isinstance(node, ast.Num):
+        # Python 3.7
+        value = node.n
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return _NO_VALUE
+    return value
+
+
+def _name(id_: str) -> ast.Name:
+    return ast.Name(id=id_, ctx=ast.Load())
+
+
+def _call(func: str, *args: ast.AST) -> ast.Call:
+    return ast.Call(func=_name(func), args=list(args), keywords=[])
+
+
+class _Normalize(ast.NodeTransformer):
+    """Rewrites Python that has a simple expression equivalent"""
+
+    def visit_Attribute(self, node: ast.Attribute) -> ast.AST:
+        path = _dottedName(node)
+        if path == "bpy.context.scene.frame_current":
+            return _name(FRAME)
+        if path is not None and path.startswith("math."):
+            name = path[len("math."):]
+            if name in SIMPLE_FUNCTIONS or name == "pi":
+                return _name(name)
+        return self.generic_visit(node)
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Pow):
+            return _call("pow", node.left, node.right)
+        if isinstance(node.op, ast.FloorDiv):
+            return _call("floor", ast.BinOp(left=node.left, op=ast.Div(), right=node.right))
+        if isinstance(node.op, ast.Mod):
+            # Python's % follows the sign of the divisor, fmod the one of the dividend
+            floored = _call("floor", ast.BinOp(left=node.left, op=ast.Div(), right=node.right))
+            return ast.BinOp(
+                left=node.left, op=ast.Sub(), right=ast.BinOp(left=floored, op=ast.Mult(), right=node.right)
+            )
+        return node
+
+    def visit_Compare(self, node: ast.Compare) -> ast.AST:
+        self.generic_visit(node)
+        if len(node.ops) == 1:
+            return node
+        # a < b < c -> a < b and b < c
+        operands = [node.left] + node.comparators
+        pairs = [
+            ast.Compare(left=left, ops=[op], comparators=[right])
+            for left, op, right in zip(operands, node.ops, operands[1:])
+        ]
+        return ast.BoolOp(op=ast.And(), values=pairs)
+
+
+def _dottedName(node: ast.AST) -> Optional[str]:
+    parts: List[str] = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def simpleProblem(node: ast.AST, names: Set[str]) -> Optional[str]:
+    """Why `node` isn't a simple expression over `names`, None if it is one"""
+    if _number(node) is not _NO_VALUE:
+        return None
+    if isinstance(node, ast.Name):
+        return None if node.id in names or node.id in CONSTANTS else f"unknown name {node.id}"
+    if isinstance(node, (ast.Constant, getattr(ast, "NameConstant", ast.Constant))):
+        return None if isinstance(node.value, bool) else "non numeric constant"
+    if isinstance(node, ast.BinOp):
+        if type(node.op) not in SIMPLE_BINARY:
+            return f"operator {type(node.op).__name__}"
+        return simpleProblem(node.left, names) or simpleProblem(node.right, names)
+    if isinstance(node, ast.UnaryOp):
+        if type(node.op) not in SIMPLE_UNARY:
+            return f"operator {type(node.op).__name__}"
+        return simpleProblem(node.operand, names)
+    if isinstance(node, ast.BoolOp):
+        return next((p for p in (simpleProblem(v, names) for v in node.values) if p), None)
+    if isinstance(node, ast.Compare):
+        if len(node.ops) != 1 or type(node.ops[0]) not in SIMPLE_COMPARE:
+            return "comparison"
+        return simpleProblem(node.left, names) or simpleProblem(node.comparators[0], names)
+    if isinstance(node, ast.IfExp):
+        return simpleProblem(node.test, names) or simpleProblem(node.body, names) or simpleProblem(node.orelse, names)
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in SIMPLE_FUNCTIONS:
+            return f"function {_dottedName(node.func) or 'call'}"
+        low, high = SIMPLE_FUNCTIONS[node.func.id]
+        if node.keywords or not low <= len(node.args) <= high:
+            return f"arguments of {node.func.id}"
+        return next((p for p in (simpleProblem(arg, names) for arg in node.args) if p), None)
+    return type(node).__name__
+
+
+def render(node: ast.AST, parent: int = 0) -> str:
+    """Prints a simple expression with the parentheses it needs"""
+    value = _number(node)
+    if value is not _NO_VALUE:
+        return repr(value)
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, (ast.Constant, getattr(ast, "NameConstant", ast.Constant))):
+        return repr(node.value)
+    if isinstance(node, ast.Call):
+        return f"{node.func.id}({', '.join(render(arg) for arg in node.args)})"
+
+    own = PRECEDENCE[type(node)]
+    if isinstance(node, ast.BinOp):
+        own += isinstance(node.op, (ast.Mult, ast.Div))
+        # left associative, an equally strong right operand needs parentheses
+        text = f"{render(node.left, own)} {SIMPLE_BINARY[type(node.op)]} {render(node.right, own + 1)}"
+    elif isinstance(node, ast.UnaryOp):
+        own = 4 if isinstance(node.op, ast.Not) else own
+        text = f"{SIMPLE_UNARY[type(node.op)]}{render(node.operand, own)}"
+    elif isinstance(node, ast.BoolOp):
+        own -= isinstance(node.op, ast.Or)
+        joiner = " and " if isinstance(node.op, ast.And) else " or "
+        text = joiner.join(render(v, own + 1) for v in node.values)
+    elif isinstance(node, ast.Compare):
+        text = f"{render(node.left, own + 1)} {SIMPLE_COMPARE[type(node.ops[0])]} {render(node.comparators[0], own + 1)}"
+    else:
+        text = f"{render(node.body, own + 1)} if {render(node.test, own + 1)} else {render(node.orelse, own)}"
+    return f"({text})" if own < parent else text
+
+
+def _sumTerms(node: ast.AST) -> Optional[List[str]]:
+    """The names of a + b + ..., None for anything else"""
+    if isinstance(node, ast.Name):
+        return [node.id]
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        left, right = _sumTerms(node.left), _sumTerms(node.right)
+        if left is not None and right is not None:
+            return left + right
+    return None
+
+
+def driverType(node: ast.AST, variables: Sequence[str]) -> Optional[str]:
+    """The driver type computing the same as `node` from all `variables`, each used once"""
+    expected = sorted(variables)
+    if not expected:
+        return None
+    if (
+        isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in ("min", "max")
+        and all(isinstance(arg, ast.Name) for arg in node.args)
+        and sorted(arg.id for arg in node.args) == expected
+    ):
+        return node.func.id.upper()
+    if _sumTerms(node) is not None and sorted(_sumTerms(node)) == expected:
+        return "AVERAGE" if len(expected) == 1 else "SUM"
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Div) and _number(node.right) == len(expected):
+        terms = _sumTerms(node.left)
+        if terms is not None and sorted(terms) == expected:
+            return "AVERAGE"
+    return None
+
+
+def polynomial(node: ast.AST) -> Optional[List[float]]:
+    """Coefficients (constant first) of `node` as a polynomial of the frame, None if it isn't one"""
+    value = _number(node)
+    if value is not _NO_VALUE:
+        return [float(value)]
+    if isinstance(node, ast.Name):
+        if node.id == FRAME:
+            return [0.0, 1.0]
+        return [CONSTANTS[node.id]] if node.id in CONSTANTS else None
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        inner = polynomial(node.operand)
+        if inner is None:
+            return None
+        return [-c for c in inner] if isinstance(node.op, ast.USub) else inner
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and len(node.args) == 1:
+        scale = {"radians": math.pi / 180.0, "degrees": 180.0 / math.pi}.get(node.func.id)
+        inner = polynomial(node.args[0]) if scale is not None else None
+        return None if inner is None else [c * scale for c in inner]
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "pow" and len(node.args) == 2:
+        base, exponent = polynomial(node.args[0]), polynomial(node.args[1])
+        if base is None or exponent is None or len(_trim(exponent)) != 1:
+            return None
+        power = exponent[0]
+        if power != int(power) or not 0 <= power * (len(_trim(base)) - 1) <= MAX_POLY_ORDER:
+            return None
+        result = [1.0]
+        for _ in range(int(power)):
+            result = _multiply(result, base)
+        return result
+    if not isinstance(node, ast.BinOp):
+        return None
+
+    left, right = polynomial(node.left), polynomial(node.right)
+    if left is None or right is None:
+        return None
+    if isinstance(node.op, (ast.Add, ast.Sub)):
+        sign = 1.0 if isinstance(node.op, ast.Add) else -1.0
+        size = max(len(left), len(right))
+        left, right = left + [0.0] * (size - len(left)), right + [0.0] * (size - len(right))
+        return [a + sign * b for a, b in zip(left, right)]
+    if isinstance(node.op, ast.Mult):
+        result = _multiply(left, right)
+        return result if len(_trim(result)) - 1 <= MAX_POLY_ORDER else None
+    if isinstance(node.op, ast.Div):
+        right = _trim(right)
+        if len(right) != 1 or right[0] == 0:
+            return None
+        return [c / right[0] for c in left]
+    return None
+
+
+def _multiply(a: List[float], b: List[float]) -> List[float]:
+    result = [0.0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        for j, y in enumerate(b):
+            result[i + j] += x * y
+    return result
+
+
+def _trim(coefficients: List[float]) -> List[float]:
+    end = len(coefficients)
+    while end > 1 and coefficients[end - 1] == 0:
+        end -= 1
+    return coefficients[:end]
+
+
+def builtinFunction(node: ast.AST) -> Optional[Tuple[str, float, float, float, float]]:
+    """
+    (function_type, amplitude, phase_multiplier, phase_offset, value_offset) if `node` is
+    amplitude * fn(phase_multiplier * frame + phase_offset) + value_offset, None otherwise
+    """
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and len(node.args) == 1:
+        function = FN_FUNCTIONS.get(node.func.id)
+        inner = polynomial(node.args[0]) if function is not None else None
+        if inner is None or len(_trim(inner)) != 2:
+            return None
+        return function, 1.0, inner[1], inner[0], 0.0
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        inner_fn = builtinFunction(node.operand)
+        if inner_fn is None or isinstance(node.op, ast.UAdd):
+            return inner_fn
+        function, amplitude, multiplier, offset, value = inner_fn
+        return function, -amplitude, multiplier, offset, -value
+    if not isinstance(node, ast.BinOp):
+        return None
+
+    for fn_side, other_side in ((node.left, node.right), (node.right, node.left)):
+        fn = builtinFunction(fn_side)
+        constant = polynomial(other_side)
+        if fn is None or constant is None or len(_trim(constant)) != 1:
+            continue
+        c = constant[0]
+        function, amplitude, multiplier, offset, value = fn
+        if isinstance(node.op, ast.Add):
+            return function, amplitude, multiplier, offset, value + c
+        if isinstance(node.op, ast.Sub):
+            if fn_side is node.left:
+                return function, amplitude, multiplier, offset, value - c
+            return function, -amplitude, multiplier, offset, c - value
+        if isinstance(node.op, ast.Mult):
+            return function, amplitude * c, multiplier, offset, value * c
+        if isinstance(node.op, ast.Div) and fn_side is node.left and c != 0:
+            return function, amplitude / c, multiplier, offset, value / c
+    return None
+
+
+def _names(node: ast.AST) -> Set[str]:
+    return {n.id for n in ast.walk(node) if isinstance(n, ast.Name)}
+
+
+def analyzeExpression(expression: str, variables: Sequence[str] = (), use_self: bool = False) -> Analysis:
+    """Classifies a scripted driver expression, see the module docstring"""
+    try:
+        tree = ast.parse(expression.strip(), mode="eval").body
+    except (SyntaxError, ValueError) as e:
+        return Analysis(BAKE, False, expression, None, None, None, f"syntax error {e}")
+
+    names = set(variables) | {FRAME}
+    # self switches the simple evaluation off
+    simple = simpleProblem(tree, names) is None and not use_self
+
+    driver_type = driverType(tree, variables)
+    if driver_type is not None:
+        return Analysis(DRIVER_TYPE, simple, expression, driver_type, None, None, "")
+    if simple:
+        return Analysis(SIMPLE, True, expression, None, None, None, "")
+
+    tree = _Normalize().visit(tree)
+    problem = simpleProblem(tree, names)
+    rewritten = render(tree) if problem is None else ""
+
+    if FRAME in _names(tree) and not _names(tree) & set(variables):
+        coefficients = polynomial(tree)
+        if coefficients is not None:
+            coefficients = _trim(coefficients)
+            coefficients += [0.0] * (2 - len(coefficients))
+            return Analysis(GENERATOR, False, rewritten, None, coefficients, None, "")
+        function = builtinFunction(tree)
+        if function is not None:
+            return Analysis(FNGENERATOR, False, rewritten, None, None, function, "")
+
+    if problem is None:
+        return Analysis(REWRITE, False, rewritten, None, None, None, "")
+    return Analysis(BAKE, False, expression, None, None, None, problem)
@@ -0,0 +1,109 @@
+from __future__ import annotations
+from collections import namedtuple
+
+import bpy
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+# bpy.data collections whose IDs can have animation_data, missing ones are skipped
+ANIMATED_COLLECTIONS = [
+    "objects",
+    "meshes",
+    "curves",
+    "hair_curves",
+    "pointclouds",
+    "volumes",
+    "lattices",
+    "metaballs",
+    "armatures",
+    "grease_pencils",
+    "shape_keys",
+    "materials",
+    "textures",
+    "images",
+    "worlds",
+    "lights",
+    "lightprobes",
+    "cameras",
+    "speakers",
+    "particles",
+    "node_groups",
+    "linestyles",
+    "movieclips",
+    "masks",
+    "cache_files",
+    "scenes",
+]
+# node trees embedded in these IDs aren't in bpy.data.node_groups
+EMBEDDED_NODE_TREES = ["materials", "worlds", "lights", "textures", "linestyles", "scenes"]
+
+# one row per driver F-curve; owner is the ID users know, the material of an embedded
+# node tree or the mesh of a shape key block, otherwise id_data itself
+DriverEntry = namedtuple(
+    "DriverEntry",
+    ["id_data", "owner", "data_path", "array_index", "type", "expression", "variables", "use_self"],
+)
+
+
+def animatedIDs(local: bool = True) -> Iterator[Tuple[Any, Any]]:
+    """(ID, owner) for every ID that can have drivers, embedded node trees included"""
+    for name in ANIMATED_COLLECTIONS:
+        for id_ in getattr(bpy.data, name, ()):
+            if local and id_.library is not None:
+                continue
+            owner = getattr(id_, "user", None) if name == "shape_keys" else id_
+            yield id_, owner or id_
+            if name in EMBEDDED_NODE_TREES and getattr(id_, "node_tree", None) is not None:
+                yield id_.node_tree, id_
+
+
+def ownerLabel(owner: Any) -> str:
+    return f"{owner.bl_rna.name}: '{owner.name}'"
+
+
+def ownerKey(owner: Any) -> str:
+    """Names an owner uniquely among local IDs: an object and a mesh may both be called 'Cube'"""
+    return f"{owner.bl_rna.identifier}:{owner.name}"
+
+
+class DriverIndex:
+    """
+    Every driver of the file, collected in one pass over bpy.data.
+    Build it once per check or fix and query it instead of walking the collections again.
+    """
+
+    def __init__(self, entries: List[DriverEntry]) -> None:
+        self.entries = entries
+
+    @classmethod
+    def build(cls, ids: Optional[Iterable[Any]] = None, local: bool = True) -> DriverIndex:
+        """Indexes the drivers of `ids`, or of all animated IDs; linked ones only when not `local`"""
+        pairs = animatedIDs(local) if ids is None else ((id_, id_) for id_ in ids)
+        entries: List[DriverEntry] = []
+        for id_, owner in pairs:
+            anim = getattr(id_, "animation_data", None)
+            if anim is None:
+                continue
+            for fcurve in anim.drivers:
+                driver = fcurve.driver
+                entries.append(DriverEntry(
+                    id_, owner, fcurve.data_path, fcurve.array_index, driver.type, driver.expression,
+                    tuple(v.name for v in driver.variables), driver.use_self
+                ))
+        return cls(entries)
+
+    def __iter__(self) -> Iterator[DriverEntry]:
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def scripted(self) -> List[DriverEntry]:
+        return [entry for entry in self.entries if entry.type == 'SCRIPTED']
+
+    def ownedBy(self, key: str) -> List[DriverEntry]:
+        """Drivers of the IDs shown under the owner with ownerKey `key`"""
+        return [entry for entry in self.entries if ownerKey(entry.owner) == key]
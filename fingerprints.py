@@ -0,0 +1,174 @@
+from __future__ import annotations
+import os
+import time
+import sqlite3
+import threading
+from contextlib import suppress
+
+from .hashing import DEFAULT_ALGORITHM, hashFiles
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, List, Optional, Tuple
+
+    # (path, size, mtime_ns, inode)
+    FileKey = Tuple[str, int, int, int]
+
+DB_NAME = "fingerprints.sqlite"
+MAX_ENTRIES = 250000
+# SQLite limits the number of host parameters per statement (999 on old builds)
+BATCH_SIZE = 500
+
+
+class FingerprintStore:
+    """
+    Local cache of content hashes keyed by (path, size, mtime_ns, inode).
+
+    The database lives next to the farm settings and is shared between Blender
+    instances: it runs in WAL mode, waits on locks instead of failing and does
+    every write in a single IMMEDIATE transaction. The least recently used entries
+    are evicted once more than `max_entries` are stored.
+    An inode of 0 (Windows DirEntry stats) matches any inode.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = MAX_ENTRIES, timeout: float = 30.0) -> None:
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def inFolder(cls, folder: str) -> FingerprintStore:
+        """The store below `folder`, or next to clientsettings.cfg if `folder` is empty"""
+        return cls(os.path.join(folder or os.path.dirname(__file__), DB_NAME))
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(
+                self.db_path, timeout=self.timeout, isolation_level=None, check_same_thread=False
+            )
+            conn.execute(f"PRAGMA busy_timeout = {int(self.timeout * 1000)}")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fingerprints ("
+                " path TEXT NOT NULL, algorithm TEXT NOT NULL,"
+                " size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, inode INTEGER NOT NULL,"
+                " hash TEXT NOT NULL, last_used INTEGER NOT NULL,"
+                " PRIMARY KEY (path, algorithm))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS fingerprints_lru ON fingerprints (last_used)")
+            self._conn = conn
+        return self._conn
+
+    def lookup(self, key: FileKey, algorithm: str) -> Optional[str]:
+        return self.lookupMany([key], algorithm).get(key[0])
+
+    def lookupMany(self, keys: Iterable[FileKey], algorithm: str) -> Dict[str, str]:
+        """Returns the known hashes keyed by path. Entries whose size, mtime or inode changed are misses."""
+        wanted = {key[0]: key for key in keys}
+        found: Dict[str, str] = {}
+        if not wanted:
+            return found
+
+        paths = list(wanted)
+        now = int(time.time())
+        with self._lock:
+            try:
+                conn = self._connection()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    for i in range(0, len(paths), BATCH_SIZE):
+                        batch = paths[i:i + BATCH_SIZE]
+                        marks = ",".join("?" * len(batch))
+                        rows = conn.execute(
+                            "SELECT path, size, mtime_ns, inode, hash FROM fingerprints"
+                            f" WHERE algorithm = ? AND path IN ({marks})",
+                            [algorithm, *batch],
+                        ).fetchall()
+                        for path, size, mtime_ns, inode, hash_ in rows:
+                            _path, want_size, want_mtime, want_inode = wanted[path]
+                            same_inode = inode == want_inode or not inode or not want_inode
+                            if size == want_size and mtime_ns == want_mtime and same_inode:
+                                found[path] = hash_
+                    conn.executemany(
+                        "UPDATE fingerprints SET last_used = ? WHERE path = ? AND algorithm = ?",
+                        ((now, path, algorithm) for path in found),
+                    )
+                    conn.execute("COMMIT")
+                except:
+                    conn.execute("ROLLBACK")
+                    raise
+            except sqlite3.Error as e:
+                print(f"fingerprints: lookup failed {e}")
+
+        self.hits += len(found)
+        self.misses += len(wanted) - len(found)
+        return found
+
+    def store(self, key: FileKey, algorithm: str, hash_: str) -> None:
+        self.storeMany([(key, hash_)], algorithm)
+
+    def storeMany(self, entries: Iterable[Tuple[FileKey, str]], algorithm: str) -> None:
+        """Upserts all `entries` in one transaction and evicts the least recently used rows if needed."""
+        now = int(time.time())
+        rows = [
+            (path, algorithm, size, mtime_ns, inode, hash_, now)
+            for (path, size, mtime_ns, inode), hash_ in entries
+        ]
+        if not rows:
+            return
+
+        with self._lock:
+            try:
+                conn = self._connection()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.executemany("INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                    (count,) = conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()
+                    if count > self.max_entries:
+                        conn.execute(
+                            "DELETE FROM fingerprints WHERE rowid IN"
+                            " (SELECT rowid FROM fingerprints ORDER BY last_used LIMIT ?)",
+                            (count - self.max_entries,),
+                        )
+                    conn.execute("COMMIT")
+                except:
+                    conn.execute("ROLLBACK")
+                    raise
+            except sqlite3.Error as e:
+                print(f"fingerprints: store failed {e}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                with suppress(sqlite3.Error):
+                    self._conn.close()
+                self._conn = None
+
+
+def fileKey(path: str) -> Optional[FileKey]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (path, st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+def cachedHashes(
+    store: Optional[FingerprintStore], paths: Iterable[str], algorithm: str = DEFAULT_ALGORITHM
+) -> Dict[str, str]:
+    """Hashes `paths`, answering from `store` where possible and remembering new hashes in it"""
+    keys = [key for key in map(fileKey, dict.fromkeys(paths)) if key is not None]
+    hashes = store.lookupMany(keys, algorithm) if store is not None else {}
+    missing = [key for key in keys if key[0] not in hashes]
+
+    results = hashFiles((key[0] for key in missing), algorithm)
+    hashes.update((path, result.hexdigest) for path, result in results.items())
+    if store is not None:
+        store.storeMany(((key, results[key[0]].hexdigest) for key in missing if key[0] in results), algorithm)
+    return hashes
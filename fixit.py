@@ -7,7 +7,8 @@ from bpy_extras.io_utils import ImportHelper
 import os
 from dataclasses import dataclass
 from typing import List
-from .utilitis import bake_scripted_drivers
+from .driverBake import bakeScriptedDrivers
+from .driverIndex import DriverIndex
 
 @dataclass(frozen= True)
 class OperatorMap:
@@ -272,6 +273,11 @@ class Farm_BakeScripted(bpy.types.Operator, FixMe):
 
     bake_anyway: bpy.props.BoolProperty(name= "Bake anyway, I've already saved a backup", default= False)
     bake_all: bpy.props.BoolProperty(name= "Bake all scripted expressions", default= False)
+    reduce_keys: bpy.props.BoolProperty(
+        name= "Reduce keyframes",
+        description= "Keep only the keyframes needed to follow the baked values within a small tolerance",
+        default= False
+    )
 
     @classmethod
     def poll(cls, context):
@@ -285,12 +291,13 @@ class Farm_BakeScripted(bpy.types.Operator, FixMe):
         scene = context.scene
         
         if self.bake_anyway and self.bake_all:
-            # bake for all objects
-            for ob in bpy.data.objects:
-                bake_scripted_drivers(ob, scene)
+            stats = bakeScriptedDrivers(scene, reduce= self.reduce_keys)
+            self.report(type= {'INFO'}, message= f"Baked {stats}")
         elif self.bake_anyway:
-            ob = bpy.data.objects.get(self.info_1)
-            bake_scripted_drivers(ob, scene)
+            # info_1 is the ownerKey of the owner, an object, material, mesh, ...
+            ids = {entry.id_data for entry in DriverIndex.build().ownedBy(self.info_1)}
+            stats = bakeScriptedDrivers(scene, ids, reduce= self.reduce_keys)
+            self.report(type= {'INFO'}, message= f"Baked {stats}")
         else:
             self.report(type= {'WARNING'}, message= "No scripted expressions were baked, please select bake anyway checkbox")
 
@@ -305,6 +312,7 @@ class Farm_BakeScripted(bpy.types.Operator, FixMe):
 
         col = layout.column()
         col.prop(self, "bake_all")
+        col.prop(self, "reduce_keys")
         if not self.bake_anyway:
             col.enabled = False
 
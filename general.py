@@ -10,6 +10,7 @@ if TYPE_CHECKING:
     from typing import List
     from bpy.types import Operator  # pylint: disable = no-name-in-module, import-error
     from .renderConfiguration import Config
+    from .assetManifest import AssetManifest
 
 
 class ValGeneral(Validator):
@@ -29,7 +30,7 @@ class ValGeneral(Validator):
         if not os.path.exists(bpy.data.filepath):
             results.error("Please save the project before exporting to Farm Desk!", type_= 11)
 
-    def prepareSave(self, export_folder: str, assets: List[str], scene_settings: "Config") -> None:
+    def prepareSave(self, export_folder: str, assets: AssetManifest, scene_settings: "Config") -> None:
         return
 
     def postSave(self) -> None:
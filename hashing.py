@@ -0,0 +1,173 @@
+from __future__ import annotations
+import os
+import mmap
+import time
+import hashlib
+from contextlib import suppress
+from concurrent.futures import ThreadPoolExecutor, Future
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, List, Optional
+    from .assetManifest import Asset
+    from .fingerprints import FingerprintStore
+
+# md5 is kept for the [checksum] check field the manager expects,
+# everything new should use DEFAULT_ALGORITHM.
+DEFAULT_ALGORITHM = "blake2b"
+CHUNK_SIZE = 4 * 1024 * 1024
+MAX_WORKERS = min(8, (os.cpu_count() or 1) + 2)
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+class HashResult:
+    __slots__ = ("path", "hexdigest", "size", "seconds")
+
+    def __init__(self, path: str, hexdigest: str, size: int, seconds: float) -> None:
+        self.path = path
+        self.hexdigest = hexdigest
+        self.size = size
+        self.seconds = seconds
+
+    @property
+    def bytesPerSecond(self) -> float:
+        return self.size / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        return f"{self.size} bytes in {self.seconds:.2f}s ({formatRate(self.bytesPerSecond)})"
+
+
+class HashStats:
+    """Totals of a batch of hashes. Wall time is measured around the whole batch."""
+
+    def __init__(self) -> None:
+        self.files = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.failed: List[str] = []
+
+    @property
+    def bytesPerSecond(self) -> float:
+        return self.bytes / self.seconds if self.seconds > 0 else 0.0
+
+    def add(self, other: HashStats) -> None:
+        self.files += other.files
+        self.bytes += other.bytes
+        self.seconds += other.seconds
+        self.failed.extend(other.failed)
+
+    def __str__(self) -> str:
+        return f"{self.files} files, {self.bytes} bytes in {self.seconds:.2f}s ({formatRate(self.bytesPerSecond)})"
+
+
+def formatRate(bytes_per_second: float) -> str:
+    return f"{bytes_per_second / (1024 * 1024):.1f} MB/s"
+
+
+def hashFile(
+    path: str, algorithm: str = DEFAULT_ALGORITHM, chunk_size: int = CHUNK_SIZE, use_mmap: bool = False
+) -> HashResult:
+    """
+    Hashes `path` in chunks of `chunk_size` bytes, so memory use does not grow with the file.
+    hashlib releases the GIL while digesting large buffers, so this can run on worker threads.
+    Raises OSError if the file can't be read.
+    """
+    start = time.perf_counter()
+    h = hashlib.new(algorithm)
+    size = 0
+
+    with open(path, "rb") as f:
+        if use_mmap:
+            size = os.fstat(f.fileno()).st_size
+            if size > 0:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    view = memoryview(mapped)
+                    try:
+                        for offset in range(0, size, chunk_size):
+                            h.update(view[offset:offset + chunk_size])
+                    finally:
+                        view.release()
+        else:
+            buf = bytearray(chunk_size)
+            view = memoryview(buf)
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                h.update(view[:n])
+                size += n
+
+    return HashResult(path, h.hexdigest(), size, time.perf_counter() - start)
+
+
+def hashFileAsync(path: str, algorithm: str = DEFAULT_ALGORITHM, use_mmap: bool = False) -> Future:
+    """Starts hashing `path` on the shared worker pool. The future resolves to a HashResult."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="farm_hash")
+    return _executor.submit(hashFile, path, algorithm, CHUNK_SIZE, use_mmap)
+
+
+def hashFiles(
+    paths: Iterable[str], algorithm: str = DEFAULT_ALGORITHM, max_workers: int = MAX_WORKERS
+) -> Dict[str, HashResult]:
+    """
+    Hashes `paths` concurrently on a bounded thread pool.
+    Returns the results keyed by path in input order; unreadable files are left out.
+    """
+    unique_paths = list(dict.fromkeys(paths))
+    results: Dict[str, HashResult] = {}
+    if len(unique_paths) == 1:
+        # not worth a pool
+        with suppress(OSError):
+            results[unique_paths[0]] = hashFile(unique_paths[0], algorithm)
+        return results
+    if not unique_paths:
+        return results
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="farm_hash") as pool:
+        futures = [pool.submit(hashFile, path, algorithm) for path in unique_paths]
+        for path, future in zip(unique_paths, futures):
+            try:
+                results[path] = future.result()
+            except OSError:
+                print(f"could not hash {path}")
+    return results
+
+
+def hashAssets(
+    assets: Iterable[Asset],
+    algorithm: str = DEFAULT_ALGORITHM,
+    max_workers: int = MAX_WORKERS,
+    store: Optional[FingerprintStore] = None,
+) -> HashStats:
+    """
+    Fills `checksum` of every asset that doesn't have one yet and returns the throughput.
+    With a fingerprint `store`, unchanged files are answered from it and only the rest is read.
+    """
+    stats = HashStats()
+    pending = [asset for asset in assets if not asset.checksum]
+    if store is not None and pending:
+        known = store.lookupMany((asset.key for asset in pending), algorithm)
+        for asset in pending:
+            asset.checksum = known.get(asset.pathlocal, "")
+        pending = [asset for asset in pending if not asset.checksum]
+
+    start = time.perf_counter()
+    results = hashFiles((asset.pathlocal for asset in pending), algorithm, max_workers)
+    stats.seconds = time.perf_counter() - start
+
+    for asset in pending:
+        result = results.get(asset.pathlocal)
+        if result is None:
+            stats.failed.append(asset.pathlocal)
+            continue
+        asset.checksum = result.hexdigest
+        stats.files += 1
+        stats.bytes += result.size
+
+    if store is not None:
+        store.storeMany(((asset.key, asset.checksum) for asset in pending if asset.checksum), algorithm)
+    return stats
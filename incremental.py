@@ -0,0 +1,200 @@
+from __future__ import annotations
+import os
+import json
+import hashlib
+from contextlib import suppress
+
+from .hashing import hashAssets
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, List, Optional, Any
+    from .assetManifest import Asset, AssetManifest
+    from .fingerprints import FingerprintStore
+    from .remoteInventory import RemoteInventory
+
+STATE_FOLDER = "exportstate"
+STATE_VERSION = 1
+
+NEW = "new"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+
+
+def projectStatePath(export_folder: str, blend_path: str) -> str:
+    """One state file per .blend, named after it plus a short hash of its full path"""
+    name = os.path.splitext(os.path.basename(blend_path))[0] or "untitled"
+    digest = hashlib.md5(os.path.abspath(blend_path).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(export_folder, STATE_FOLDER, f"{name}_{digest}.json")
+
+
+def projectPreuploadStatePath(export_folder: str, blend_path: str) -> str:
+    """What the pre-upload queued for the project, kept apart from the export state"""
+    return os.path.splitext(projectStatePath(export_folder, blend_path))[0] + "_preupload.json"
+
+
+def projectSignatureFolder(export_folder: str, blend_path: str) -> str:
+    """Delta signatures of the project's large assets, next to its state file"""
+    return os.path.splitext(projectStatePath(export_folder, blend_path))[0] + "_signatures"
+
+
+def projectBlendDeltaFolder(export_folder: str, blend_path: str) -> str:
+    """Previous exported .blend and its block index, next to the project's state file"""
+    return os.path.splitext(projectStatePath(export_folder, blend_path))[0] + "_blend"
+
+
+class ExportDiff:
+    def __init__(self) -> None:
+        self.states: Dict[str, str] = {}
+        self.removed: List[str] = []
+
+    def paths(self, state: str) -> List[str]:
+        return [path for path, s in self.states.items() if s == state]
+
+    def state(self, path: str) -> str:
+        return self.states.get(path, NEW)
+
+    def changedBytes(self, assets: AssetManifest) -> int:
+        return sum(asset.filesize for asset in assets if self.state(asset.path) != UNCHANGED)
+
+    def toSection(self) -> Dict[str, str]:
+        section = {
+            NEW: str(len(self.paths(NEW))),
+            CHANGED: str(len(self.paths(CHANGED))),
+            UNCHANGED: str(len(self.paths(UNCHANGED))),
+            "removed": str(len(self.removed)),
+        }
+        for i, path in enumerate(self.removed):
+            section[f"removed{i}"] = path
+        return section
+
+
+class IncrementalExport:
+    """
+    Remembers the assets of the last successful export of a project
+    (virtual path, local path, size, mtime and content hash) and compares new exports against it.
+
+    An export is only written as pending: the manager uploads after the export, so
+    confirm() moves the pending assets into the state once the farm's file list
+    shows them with the right size. A failed or cancelled upload never marks files unchanged.
+    """
+
+    def __init__(self, state_path: str, store: Optional[FingerprintStore] = None) -> None:
+        self.state_path = state_path
+        self.pending_path = f"{state_path}.pending"
+        self.store = store
+        self.previous: Dict[str, Dict[str, Any]] = self._load(self.state_path)
+
+    def _load(self, path: str) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if state.get("version") != STATE_VERSION:
+            return {}
+        return state.get("assets", {})
+
+    def diff(self, assets: AssetManifest) -> ExportDiff:
+        """
+        Sorts `assets` into new, changed and unchanged and lists the removed ones.
+        Size and mtime decide first; files that only got touched are compared by hash.
+        """
+        diff = ExportDiff()
+        uncertain: List[Asset] = []
+
+        for asset in assets:
+            prev = self.previous.get(asset.path)
+            if prev is None:
+                diff.states[asset.path] = NEW
+            elif prev["size"] != asset.filesize or prev["pathlocal"] != asset.pathlocal:
+                diff.states[asset.path] = CHANGED
+            elif prev["mtime_ns"] == asset.mtime_ns:
+                diff.states[asset.path] = UNCHANGED
+                if not asset.checksum:
+                    asset.checksum = prev["checksum"]
+            else:
+                uncertain.append(asset)
+
+        stats = hashAssets(uncertain, store=self.store)
+        if stats.files:
+            print(f"incremental export: hashed {stats}")
+        for asset in uncertain:
+            same = asset.checksum and asset.checksum == self.previous[asset.path]["checksum"]
+            diff.states[asset.path] = UNCHANGED if same else CHANGED
+
+        diff.removed = [path for path in self.previous if path not in assets]
+        return diff
+
+    def confirm(self, inventory: RemoteInventory) -> int:
+        """
+        Moves the pending assets the farm has into the state. Returns the number of confirmed assets.
+
+        An asset is confirmed by its virtual path in the same size (and hash, where listed).
+        The farm may list it by file name only, which cache files of different folders share,
+        so then the hash has to be listed and match.
+        """
+        pending = self._load(self.pending_path)
+        if not pending or not inventory.entries:
+            # nothing to confirm, or the manager hasn't listed the farm yet
+            return 0
+
+        confirmed = {}
+        for path, entry in pending.items():
+            remote = inventory.lookup(path)
+            if remote is not None:
+                if remote.size != entry["size"]:
+                    continue
+                if remote.checksum and len(remote.checksum) == len(entry["checksum"]) and remote.checksum != entry["checksum"]:
+                    continue
+            else:
+                remote = inventory.lookup(os.path.basename(path))
+                if remote is None or remote.size != entry["size"] or not entry["checksum"]:
+                    continue
+                if remote.checksum != entry["checksum"]:
+                    continue
+            confirmed[path] = entry
+
+        # unconfirmed ones were never uploaded, the next export sends them again
+        self.previous = confirmed
+        self._write(self.state_path, confirmed)
+        with suppress(OSError):
+            os.remove(self.pending_path)
+        return len(confirmed)
+
+    def save(self, assets: AssetManifest) -> None:
+        """Records `assets` as exported and waiting for upload, see confirm()"""
+        self._write(self.pending_path, self._entries(assets))
+
+    def record(self, assets: AssetManifest) -> None:
+        """Makes `assets` the state right away, for states that don't wait for an upload"""
+        self.previous = self._entries(assets)
+        self._write(self.state_path, self.previous)
+
+    def _entries(self, assets: AssetManifest) -> Dict[str, Dict[str, Any]]:
+        stats = hashAssets(assets, store=self.store)
+        if stats.files:
+            print(f"incremental export: hashed {stats}")
+        return {
+            asset.path: {
+                "pathlocal": asset.pathlocal,
+                "size": asset.filesize,
+                "mtime_ns": asset.mtime_ns,
+                "checksum": asset.checksum,
+            }
+            for asset in assets
+        }
+
+    def _write(self, path: str, assets: Dict[str, Dict[str, Any]]) -> None:
+        state = {"version": STATE_VERSION, "assets": assets}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"incremental export: could not write {path} {e}")
+            with suppress(OSError):
+                os.remove(tmp_path)
@@ -0,0 +1,100 @@
+from __future__ import annotations
+import numpy as np
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict
+
+# largest difference a reduced channel may have from the baked samples, by the property
+# at the end of the data path; bool and int properties keep their exact values
+DEFAULT_TOLERANCE = 1e-4
+CHANNEL_TOLERANCES: Dict[str, float] = {
+    "location": 1e-4,
+    "scale": 1e-4,
+    "rotation_euler": 2e-4,
+    "rotation_quaternion": 1e-4,
+    "rotation_axis_angle": 2e-4,
+    "delta_location": 1e-4,
+    "delta_scale": 1e-4,
+    "delta_rotation_euler": 2e-4,
+    "color": 1e-3,
+    "energy": 1e-3,
+    "strength": 1e-3,
+    "hide_render": 0.0,
+    "hide_viewport": 0.0,
+    "frame_current": 0.0,
+}
+# bytes of one BezTriple in the .blend
+BEZTRIPLE_SIZE = 72
+
+
+def channelTolerance(data_path: str) -> float:
+    if data_path.endswith("]"):
+        # custom property or an indexed item, nothing known about it
+        return DEFAULT_TOLERANCE
+    return CHANNEL_TOLERANCES.get(data_path.rsplit(".", 1)[-1], DEFAULT_TOLERANCE)
+
+
+def linearInterior(frames: np.ndarray, values: np.ndarray, tolerance: float) -> np.ndarray:
+    """Keys lying on the line between their neighbours, constant runs included"""
+    inner = np.zeros(len(values), dtype=bool)
+    if len(values) < 3:
+        return inner
+    t = (frames[1:-1] - frames[:-2]) / (frames[2:] - frames[:-2])
+    between = values[:-2] + (values[2:] - values[:-2]) * t
+    inner[1:-1] = np.abs(values[1:-1] - between) <= min(tolerance, 1e-6)
+    return inner
+
+
+def douglasPeucker(frames: np.ndarray, values: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Ramer-Douglas-Peucker on the value axis: the keys to keep so that linear interpolation
+    between them stays within `tolerance` of every input key.
+    """
+    count = len(values)
+    keep = np.zeros(count, dtype=bool)
+    if count == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        t = (frames[a + 1:b] - frames[a]) / (frames[b] - frames[a])
+        error = np.abs(values[a + 1:b] - (values[a] + (values[b] - values[a]) * t))
+        i = int(np.argmax(error))
+        if error[i] > tolerance:
+            split = a + 1 + i
+            keep[split] = True
+            stack.append((a, split))
+            stack.append((split, b))
+    return keep
+
+
+def reduceKeys(frames: np.ndarray, values: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Mask of the keys a LINEAR curve needs to follow the samples within `tolerance`.
+
+    Interior keys of straight and constant runs go first in one vectorized pass and
+    Douglas-Peucker runs on the rest. Each dropped key is only near the line through its
+    neighbours, so a long run of them can still bend away from its chord; the error is
+    therefore measured on every sample afterwards, and segments that are off are reduced
+    again from all of their samples.
+    """
+    frames = np.asarray(frames, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    candidates = np.flatnonzero(~linearInterior(frames, values, tolerance))
+    keep = np.zeros(len(values), dtype=bool)
+    keep[candidates[douglasPeucker(frames[candidates], values[candidates], tolerance)]] = True
+    if len(values) < 3:
+        return keep
+
+    kept = np.flatnonzero(keep)
+    error = np.abs(values - np.interp(frames, frames[kept], values[kept]))
+    # index into `kept` of the end of every segment with a sample off by more than `tolerance`
+    for end in np.unique(np.searchsorted(kept, np.flatnonzero(error > tolerance))):
+        a, b = kept[end - 1], kept[end]
+        keep[a:b + 1] |= douglasPeucker(frames[a:b + 1], values[a:b + 1], tolerance)
+    return keep
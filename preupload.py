@@ -0,0 +1,270 @@
+from __future__ import annotations
+import os
+import time
+import threading
+from contextlib import contextmanager, suppress
+
+import bpy
+from bpy.app.handlers import persistent
+
+from .assetManifest import AssetManifest
+from .assetSources import AssetCollector
+from .cacheIndex import CacheIndexRegistry
+from .hashing import HashStats, hashAssets
+from .incremental import IncrementalExport, projectPreuploadStatePath, projectStatePath, UNCHANGED
+from .renderConfiguration import Config
+from .statCache import StatCache
+from .utilitis import TexPath, farmProps
+from .Texture import ValTexture
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, List, Optional, Tuple
+    from .assetManifest import Asset
+    from .assetSources import AssetSource
+    from .cacheIndex import CachePruning
+    from .fingerprints import FingerprintStore
+
+# upload queue the manager works through in the background, one per user folder
+QUEUE_FILE = "at2_preupload.txt"
+
+# seconds after a load or save before collecting; every further save restarts the wait
+START_DELAY = 5.0
+POLL_INTERVAL = 1.0
+# the worker hashes this many files at a time and pauses in between,
+# so Blender keeps most of the disk and CPU
+BATCH_SIZE = 16
+BATCH_PAUSE = 0.2
+HASH_WORKERS = 2
+
+_worker: Optional[PreuploadWorker] = None
+# set while an export runs, its own save of the .blend must not start a pre-upload
+_exporting = False
+
+
+class PreuploadWorker(threading.Thread):
+    """
+    Finds the files of the asset sources gathered on the main thread, hashes them,
+    compares them with the last upload of the project and adds the new and changed
+    ones to the manager's queue.
+
+    What was queued is remembered in a pre-upload state of its own, so unchanged
+    files aren't queued again on the next save. The export state is left alone:
+    only an export whose upload the farm confirmed may mark files unchanged.
+    """
+
+    def __init__(
+        self,
+        sources: List[AssetSource],
+        pruning: Optional[CachePruning],
+        export_folder: str,
+        blend_path: str,
+        store: FingerprintStore,
+    ) -> None:
+        super().__init__(name="farm_preupload", daemon=True)
+        self.sources = sources
+        self.pruning = pruning
+        self.assets: List[Asset] = []
+        self.export_folder = export_folder
+        self.blend_path = blend_path
+        self.store = store
+        self.hashed = 0
+        self.queued = 0
+        self.error = ""
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def run(self) -> None:
+        try:
+            self._run()
+        except Exception as e:
+            self.error = str(e)
+
+    def _run(self) -> None:
+        began = time.perf_counter()
+        manifest = AssetManifest()
+        # caches of its own, the main thread's belong to the checks
+        collector = AssetCollector(
+            manifest, StatCache(), CacheIndexRegistry(), self.pruning, self.store, cancelled=lambda: self.cancelled
+        )
+        collector.collectAll(self.sources)
+        if self.cancelled:
+            return
+        self.assets = list(manifest)
+        print(f"preupload: collected {len(self.assets)} files in {time.perf_counter() - began:.2f}s")
+
+        hashed = HashStats()
+        for start in range(0, len(self.assets), BATCH_SIZE):
+            if self.cancelled:
+                return
+            batch = self.assets[start:start + BATCH_SIZE]
+            hashed.add(hashAssets(batch, max_workers=HASH_WORKERS, store=self.store))
+            self.hashed += len(batch)
+            self._cancelled.wait(BATCH_PAUSE)
+        if self.cancelled:
+            return
+        if hashed.files:
+            print(f"preupload: hashed {hashed}")
+
+        exported = IncrementalExport(projectStatePath(self.export_folder, self.blend_path), self.store).diff(manifest)
+        queued = IncrementalExport(projectPreuploadStatePath(self.export_folder, self.blend_path), self.store)
+        already_queued = queued.diff(manifest)
+        pending = [
+            asset for asset in manifest
+            if exported.state(asset.path) != UNCHANGED and already_queued.state(asset.path) != UNCHANGED
+        ]
+        if pending:
+            self.queued = writeQueue(os.path.join(self.export_folder, QUEUE_FILE), pending, self.blend_path)
+        queued.record(manifest)
+
+
+def writeQueue(queue_path: str, assets: List[Asset], blend_path: str) -> int:
+    """
+    Adds `assets` to the upload queue file, keeping the entries the manager
+    hasn't picked up yet. Returns the number of queued files.
+    """
+    entries: Dict[str, Tuple[str, str, str]] = {}
+    with suppress(Exception):
+        files = Config.from_filepath(queue_path)["files"]
+        for i in range(int(files.get("paths", "0"))):
+            entries[files[f"path{i}"]] = (files[f"pathlocal{i}"], files[f"pathsize{i}"], files[f"pathchecksum{i}"])
+
+    for asset in assets:
+        entries[asset.path] = (asset.pathlocal, str(asset.filesize), asset.checksum)
+
+    queue = Config()
+    queue["preupload"] = {"scene": blend_path, "time": str(int(time.time()))}
+    files_section: Dict[str, str] = {}
+    for i, (path, (pathlocal, size, checksum)) in enumerate(entries.items()):
+        files_section[f"path{i}"] = path
+        files_section[f"pathlocal{i}"] = pathlocal
+        files_section[f"pathsize{i}"] = size
+        files_section[f"pathchecksum{i}"] = checksum
+    files_section["paths"] = str(len(entries))
+    queue["files"] = files_section
+
+    # the manager must never see a half written queue
+    tmp_path = f"{queue_path}.tmp"
+    queue.write_to_file(tmp_path)
+    os.replace(tmp_path, queue_path)
+    return len(entries)
+
+
+def gatherSources() -> Tuple[List[AssetSource], Optional[CachePruning]]:
+    """
+    The asset sources an export would collect and its cache pruning, read from bpy only.
+    Touches neither the disk nor any file paths of the scene, the worker does the rest.
+    """
+    dlg = bpy.farmRender
+    tex = next(v for v in dlg.tests if isinstance(v, ValTexture))
+    serverpath = TexPath(dlg.m_userName)
+    sources = tex.point_cache_sources(serverpath) + tex.regular_sources(serverpath)
+    return [source for source, _remap in sources], tex.createCachePruning()
+
+
+@contextmanager
+def exportInProgress():
+    """Saves inside this block, like the export's copy of the .blend, don't schedule a pre-upload"""
+    global _exporting
+    _exporting = True
+    try:
+        yield
+    finally:
+        _exporting = False
+
+
+def schedulePreupload() -> None:
+    """(Re)starts the countdown to the next pre-upload"""
+    if bpy.app.timers.is_registered(_startPreupload):
+        bpy.app.timers.unregister(_startPreupload)
+    bpy.app.timers.register(_startPreupload, first_interval=START_DELAY)
+
+
+def cancelPreupload(wait: bool = False) -> None:
+    """Stops a running pre-upload; with `wait` until the worker has let go of the state files"""
+    if bpy.app.timers.is_registered(_startPreupload):
+        bpy.app.timers.unregister(_startPreupload)
+    if _worker is not None and _worker.is_alive():
+        _worker.cancel()
+        if wait:
+            _worker.join()
+
+
+def _startPreupload() -> Optional[float]:
+    global _worker
+    cancelPreupload(wait=True)
+
+    dlg = bpy.farmRender
+    if not farmProps().is_preupload or not dlg.m_defaultPath or not dlg.m_userName or not bpy.data.filepath:
+        return None
+
+    export_folder = os.path.join(dlg.m_defaultPath, dlg.m_userName)
+    if not os.path.isdir(export_folder):
+        return None
+
+    # the scene may have changed since the last check
+    dlg.reachable = None
+
+    start = time.perf_counter()
+    sources, pruning = gatherSources()
+    print(f"preupload: gathered {len(sources)} sources in {time.perf_counter() - start:.2f}s")
+
+    _worker = PreuploadWorker(sources, pruning, export_folder, bpy.data.filepath, dlg.getFingerprints())
+    _worker.start()
+    bpy.app.timers.register(_pollPreupload, first_interval=POLL_INTERVAL)
+    return None
+
+
+def _pollPreupload() -> Optional[float]:
+    worker = _worker
+    if worker is None:
+        return None
+    if worker.is_alive():
+        return POLL_INTERVAL
+
+    if worker.error:
+        print(f"preupload: failed {worker.error}")
+    elif worker.cancelled:
+        print(f"preupload: cancelled after {worker.hashed} of {len(worker.assets)} files")
+    else:
+        print(f"preupload: {worker.queued} files queued for upload")
+    return None
+
+
+@persistent
+def preuploadLoadPreHandler(_dummy) -> None:
+    # the running worker belongs to the file that is being closed
+    cancelPreupload()
+
+
+@persistent
+def preuploadHandler(_dummy) -> None:
+    if _exporting:
+        return
+    with suppress(Exception):
+        if farmProps().is_preupload:
+            schedulePreupload()
+
+
+def register() -> None:
+    bpy.app.handlers.load_pre.append(preuploadLoadPreHandler)
+    bpy.app.handlers.load_post.append(preuploadHandler)
+    bpy.app.handlers.save_post.append(preuploadHandler)
+
+
+def unregister() -> None:
+    cancelPreupload()
+    for handlers, handler in [
+        (bpy.app.handlers.load_pre, preuploadLoadPreHandler),
+        (bpy.app.handlers.load_post, preuploadHandler),
+        (bpy.app.handlers.save_post, preuploadHandler),
+    ]:
+        with suppress(ValueError):
+            handlers.remove(handler)
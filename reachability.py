@@ -0,0 +1,68 @@
+from __future__ import annotations
+import bpy
+from collections import deque
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, Iterator, Set
+    from bpy.types import ID, LayerCollection, Scene  # pylint: disable = no-name-in-module, import-error
+
+# datablocks that reference far more than what gets rendered, they are never walked through
+OPAQUE_TYPES = (bpy.types.Scene, bpy.types.Screen, bpy.types.WorkSpace, bpy.types.WindowManager)
+
+
+def visibleObjects(layer_collection: LayerCollection) -> Iterator[bpy.types.Object]:
+    """Objects of a view layer that get rendered: not excluded, not hidden from render"""
+    if layer_collection.exclude or layer_collection.collection.hide_render:
+        return
+    for ob in layer_collection.collection.objects:
+        if not ob.hide_render:
+            yield ob
+    for child in layer_collection.children:
+        yield from visibleObjects(child)
+
+
+def renderSeeds(scene: Scene, uses: Dict[ID, Set[ID]]) -> Set[ID]:
+    """What a render of `scene` starts from: its visible objects and camera plus everything else the scene uses directly"""
+    seeds: Set[ID] = set()
+    for view_layer in scene.view_layers:
+        if view_layer.use:
+            seeds.update(visibleObjects(view_layer.layer_collection))
+    if scene.camera is not None:
+        seeds.add(scene.camera)
+
+    # world, compositor, sequencer, clips ... but not the objects and collections that are hidden
+    seeds.update(
+        id_ for id_ in uses.get(scene, ()) if not isinstance(id_, (bpy.types.Object, bpy.types.Collection))
+    )
+    return seeds
+
+
+def reachableIDs(scenes: Iterable[Scene]) -> Set[ID]:
+    """
+    All datablocks the render of `scenes` depends on.
+
+    Walks the inverted bpy.data.user_map() breadth-first from the render seeds,
+    so instanced collections, modifier targets, materials, images and node
+    groups of visible objects are included, orphans and hidden-only data are not.
+    """
+    uses: Dict[ID, Set[ID]] = {}
+    for id_, users in bpy.data.user_map().items():
+        for user in users:
+            uses.setdefault(user, set()).add(id_)
+
+    reachable: Set[ID] = set()
+    for scene in scenes:
+        reachable.add(scene)
+        queue = deque(renderSeeds(scene, uses) - reachable)
+        reachable.update(queue)
+        while queue:
+            id_ = queue.popleft()
+            if isinstance(id_, OPAQUE_TYPES):
+                continue
+            for used in uses.get(id_, ()):
+                if used not in reachable:
+                    reachable.add(used)
+                    queue.append(used)
+    return reachable
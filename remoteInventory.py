@@ -0,0 +1,117 @@
+from __future__ import annotations
+import os
+import time
+from collections import namedtuple
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, Optional
+
+# file list of the farm storage written by the manager, one "name:size[:hash]" per line
+INVENTORY_FILE = "at2_reb_ftpcontents.txt"
+# a last line without newline counts as complete once the file is this old, or unchanged between refreshes
+STABLE_SECONDS = 2.0
+
+RemoteFile = namedtuple("RemoteFile", ["size", "checksum"])
+
+
+class RemoteInventory:
+    """
+    Index of the files already on the farm, keyed by normalized file name.
+
+    refresh() only reads the inventory file again when its mtime or size changed,
+    and only parses the appended part when the manager just added lines.
+    Names are compared case-insensitively unless `case_sensitive` is set.
+    """
+
+    def __init__(self, path: str, case_sensitive: bool = False) -> None:
+        self.path = path
+        self.case_sensitive = case_sensitive
+        self.entries: Dict[str, RemoteFile] = {}
+        self._mtime_ns = -1
+        self._size = -1
+        self._offset = 0
+        self._tail = b""
+        # size of the file when an unterminated last line was left for later
+        self._unterminatedSize = -1
+
+    def normalize(self, name: str) -> str:
+        return name if self.case_sensitive else name.lower()
+
+    def lookup(self, name: str) -> Optional[RemoteFile]:
+        return self.entries.get(self.normalize(name))
+
+    def refresh(self) -> bool:
+        """Brings the index up to date with the inventory file. Returns True if it changed."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            changed = bool(self.entries)
+            self._reset()
+            return changed
+
+        if st.st_mtime_ns == self._mtime_ns and st.st_size == self._size:
+            return False
+
+        try:
+            with open(self.path, "rb") as f:
+                if not self._isAppendedTo(f, st.st_size):
+                    self._reset()
+                f.seek(self._offset)
+                data = f.read()
+        except OSError:
+            return False
+
+        # a line still being written is picked up next time, unless the file has settled
+        end = data.rfind(b"\n") + 1
+        unterminated = end < len(data)
+        if unterminated and self._isStable(st):
+            end = len(data)
+            unterminated = False
+        if self._offset == 0 and data.startswith(b"\xef\xbb\xbf"):
+            self._parse(data[3:end])
+        else:
+            self._parse(data[:end])
+        self._offset += end
+        self._tail = (self._tail + data[:end])[-64:]
+        if unterminated:
+            # not recorded as read, so the next refresh looks at the tail again
+            self._unterminatedSize = st.st_size
+            self._mtime_ns = -1
+            self._size = -1
+        else:
+            self._unterminatedSize = -1
+            self._mtime_ns = st.st_mtime_ns
+            self._size = st.st_size
+        return end > 0
+
+    def _isStable(self, st: os.stat_result) -> bool:
+        if st.st_size == self._unterminatedSize:
+            return True
+        return time.time() - st.st_mtime_ns / 1e9 >= STABLE_SECONDS
+
+    def _isAppendedTo(self, f, size: int) -> bool:
+        if self._offset == 0 or size < self._offset:
+            return False
+        f.seek(self._offset - len(self._tail))
+        return f.read(len(self._tail)) == self._tail
+
+    def _reset(self) -> None:
+        self.entries = {}
+        self._mtime_ns = -1
+        self._size = -1
+        self._offset = 0
+        self._tail = b""
+
+    def _parse(self, data: bytes) -> None:
+        for line in data.decode("utf-8", errors="replace").splitlines():
+            parts = line.strip().split(":")
+            if len(parts) not in (2, 3):
+                continue
+            try:
+                size = int(parts[1])
+            except ValueError:
+                continue
+            checksum = parts[2] if len(parts) == 3 else ""
+            self.entries[self.normalize(parts[0])] = RemoteFile(size, checksum)
@@ -21,7 +21,6 @@ else:
     try:
         from . import utilitis, general, rendersettings
         from .utilitis import (
-            calcMd5,
             is_gpu_render,
             getChangedBlenderFilename,
             manager_version,
@@ -31,7 +30,7 @@ else:
             TexPath,
             createFarmOutputPath,
             farmProps,
-            bake_scripted_drivers
+            getRenderScenes,
         )
         from .validator import Validator, TestResult, ResultHelper
         from .general import ValGeneral
@@ -39,10 +38,24 @@ else:
         from .Texture import ValTexture
         from .Vray import ValVray
         from .renderConfiguration import Config
+        from .assetManifest import AssetManifest
+        from .fingerprints import FingerprintStore
+        from .incremental import IncrementalExport, projectStatePath, projectSignatureFolder, projectBlendDeltaFolder
+        from .hashing import hashAssets, hashFileAsync
+        from .delta import SignatureStore, MIN_DELTA_FILE_SIZE
+        from .remoteInventory import RemoteInventory, INVENTORY_FILE
+        from .statCache import StatCache
+        from .cacheIndex import CacheIndexRegistry
+        from .reachability import reachableIDs
+        from .preupload import cancelPreupload, exportInProgress
+        from .staging import stageAssets, stageFile
+        from .bundling import writeBundles
+        from .driverBake import bakeScriptedDrivers
+        from .blendfile import BlendDeltaState, BlendError, indexBlend, makeBlendDelta
     except:
         print("Farminizer plugin not installed correctly")
 
-from typing import List, Dict, Set, Any, cast
+from typing import List, Dict, Optional, Set, Any, cast
 
 from . import Texture, Vray
 from .fixIt import operators_list
@@ -59,8 +72,13 @@ class FarmRenderDlg:
     m_CpuData = ""
     m_distributed = False
     m_distributedConfirmed = False
+    fingerprints = None  # type: FingerprintStore
+    remoteInventory = None  # type: RemoteInventory
+    reachable = None  # type: Set[bpy.types.ID]
 
     def __init__(self) -> None:
+        self.statCache = StatCache()
+        self.cacheIndex = CacheIndexRegistry()
         self.tests = [ValGeneral(self), ValRendersettings(self), ValTexture(self), ValVray(self)]
         print("Farm Dialog Running")
 
@@ -79,6 +97,33 @@ class FarmRenderDlg:
             self.manager_file_exists = False
             self.status_file_exists = False
 
+    def getFingerprints(self) -> FingerprintStore:
+        """The fingerprint store in the farm folder, shared by all validators and Blender instances"""
+        store = FingerprintStore.inFolder(self.m_defaultPath)
+        if self.fingerprints is None or self.fingerprints.db_path != store.db_path:
+            if self.fingerprints is not None:
+                self.fingerprints.close()
+            self.fingerprints = store
+        return self.fingerprints
+
+    def getRemoteInventory(self) -> RemoteInventory:
+        """Index of the files on the farm, reloaded only when the manager updated the list"""
+        path = os.path.join(self.m_defaultPath, self.m_userName, INVENTORY_FILE)
+        case_sensitive = farmProps().is_inventory_case_sensitive
+        inventory = self.remoteInventory
+        if inventory is None or inventory.path != path or inventory.case_sensitive != case_sensitive:
+            inventory = self.remoteInventory = RemoteInventory(path, case_sensitive)
+        inventory.refresh()
+        return inventory
+
+    def getReachable(self) -> Optional[Set[bpy.types.ID]]:
+        """Datablocks the rendered scenes use, None if unused data isn't skipped"""
+        if not farmProps().is_skip_unused:
+            return None
+        if self.reachable is None:
+            self.reachable = reachableIDs(getRenderScenes())
+        return self.reachable
+
     def isAllValid(self) -> bool:
         not_empty = len(self.results) > 0
         return not_empty and all(res.severity != 2 for res in self.results)
@@ -128,6 +173,10 @@ class FarmRenderDlg:
 
     def actionStart(self, fastCheck: bool) -> bool:
         self.results = []
+        # file probes are cached from here until the end of the export
+        self.statCache.clear()
+        self.cacheIndex.clear()
+        self.reachable = None
         results = ResultHelper(self.results, None)
         conf = getConfigFileContent()
         if len(conf) >= 4:
@@ -163,6 +212,8 @@ class FarmRenderDlg:
 
     def actionExport(self, op: bpy.types.Operator) -> None:
         results = ResultHelper(self.results, None)
+        # the export takes over, and writes the export state itself
+        cancelPreupload(wait=True)
         with suppress(Exception):
             bpy.ops.file.unpack_all()
 
@@ -183,12 +234,14 @@ class FarmRenderDlg:
             os.mkdir(export_folder)
 
         
-        self.doExportFolder(export_folder)
+        with exportInProgress():
+            self.doExportFolder(export_folder)
+        print(f"file probes: {self.statCache}")
         results.info("Project has been successfully exported !") 
         bpy.ops.farm.project_export_success("INVOKE_DEFAULT")
 
     def doExportFolder(self, export_folder: str) -> None:
-        assets = []  # type: List[str]
+        assets = AssetManifest()
 
         mangled_basename, _ext = os.path.splitext(os.path.basename(getChangedBlenderFilename()))
         blenderpath = unique_filename(export_folder, mangled_basename, ".blend")
@@ -203,6 +256,8 @@ class FarmRenderDlg:
                 bpy.ops.object.make_local(type="ALL")
 
         bpy.ops.file.make_paths_absolute()
+        # make_local replaced linked datablocks
+        self.reachable = None
 
         scene_settings = Config()
         scene_settings.add_section("region")
@@ -215,6 +270,33 @@ class FarmRenderDlg:
 
         props = farmProps()
 
+        if props.is_bundle_small_files:
+            bundles, single, contents = writeBundles(assets, export_folder, props.bundle_threshold * 1024)
+            assets = AssetManifest()
+            for asset in single + bundles:
+                assets.add(asset)
+
+            bundles_section = {"bundles": str(len(contents))}
+            for i, (bundle_path, paths) in enumerate(contents.items()):
+                bundles_section[f"bundle{i}"] = bundle_path
+                bundles_section[f"bundlefiles{i}"] = str(len(paths))
+            scene_settings["bundles"] = bundles_section
+            print(f"bundling: {sum(map(len, contents.values()))} files in {len(bundles)} bundles")
+
+        if props.is_stage_assets:
+            wm = bpy.context.window_manager
+            wm.progress_begin(0, max(1, len(assets)))
+            try:
+                stats = stageAssets(assets, export_folder, progress=lambda done, _total: wm.progress_update(done))
+            finally:
+                wm.progress_end()
+            print(f"staging: {stats}")
+            scene_settings["staging"] = {
+                "files": str(stats.files),
+                "bytes": str(stats.bytes),
+                "failed": str(len(stats.failed)),
+            }
+
         if props.is_auto_start:
             scene_settings["region"]["autostart"] = "1"
 
@@ -256,31 +338,109 @@ class FarmRenderDlg:
                 scene_settings[f"{scene.name}"]["take"] = f"scene.name"
             
 
+        # block deltas need the blocks as they are in memory, so that mode saves uncompressed
         bpy.ops.wm.save_as_mainfile(
-            filepath=blenderpath, compress=True, copy=True, relative_remap=False
+            filepath=blenderpath, compress=not props.is_blend_delta, copy=True, relative_remap=False
         )
 
+        blend_state = None
+        blend_index = None
+        if props.is_blend_delta:
+            blend_state = BlendDeltaState(projectBlendDeltaFolder(export_folder, bpy.data.filepath))
+            try:
+                blend_index = indexBlend(blenderpath)
+            except (OSError, BlendError) as e:
+                print(f"blend delta: could not read {blenderpath} {e}")
+            previous = blend_state.previous() if blend_index is not None else None
+            if previous is not None:
+                delta_path = f"{blenderpath}.bdelta"
+                stats = makeBlendDelta(previous, blend_index, blenderpath, delta_path)
+                scene_settings["blenddelta"] = {
+                    "delta": delta_path,
+                    "base": previous.checksum,
+                    "blocks": str(stats.blocks),
+                    "changedblocks": str(stats.changedBlocks),
+                    "changedbytes": str(stats.changedBytes),
+                    "size": str(stats.size),
+                }
+                print(f"blend delta: {stats.changedBlocks} of {stats.blocks} blocks changed, {stats.size} bytes")
+
+        checksum = None
+        if blend_index is None:
+            # hashed on a worker thread while the assets are diffed below
+            checksum = hashFileAsync(blenderpath, "md5")
+
+        incremental = None
+        if props.is_incremental:
+            incremental = IncrementalExport(
+                projectStatePath(export_folder, bpy.data.filepath), self.getFingerprints()
+            )
+            confirmed = incremental.confirm(self.getRemoteInventory())
+            print(f"incremental export: {confirmed} files of the previous export confirmed on the farm")
+            diff = incremental.diff(assets)
+            scene_settings["incremental"] = diff.toSection()
+            print(f"incremental export: {diff.changedBytes(assets)} bytes to transfer")
+
+        signatures = None
+        deltas = {}
+        if props.is_delta_upload:
+            signatures = SignatureStore(projectSignatureFolder(export_folder, bpy.data.filepath))
+            large_assets = [asset for asset in assets if asset.filesize >= MIN_DELTA_FILE_SIZE]
+            stats = hashAssets(large_assets, store=self.getFingerprints())
+            if stats.files:
+                print(f"delta upload: hashed {stats}")
+            deltas = signatures.makeDeltas(large_assets, os.path.join(export_folder, "deltas"))
+
+            deltas_section = {"deltas": str(len(deltas))}
+            for i, (path, delta) in enumerate(deltas.items()):
+                deltas_section[f"delta{i}"] = path
+                deltas_section[f"deltalocal{i}"] = delta.path
+                deltas_section[f"deltabase{i}"] = delta.base
+                deltas_section[f"deltasize{i}"] = str(delta.size)
+            scene_settings["deltas"] = deltas_section
+            print(f"delta upload: {len(deltas)} files, {sum(d.size for d in deltas.values())} bytes of deltas")
+
         files_section: "Dict[str, str]" = {}
         for i, f in enumerate(assets):
             files_section[f"path{i}"] = f.path
             files_section[f"pathlocal{i}"] = f.pathlocal
-            size = 0
-            try:
-                size = os.stat(os.path.join(export_folder, f.pathlocal)).st_size
-            except:
-                print(f"file not found {os.path.join(export_folder, f.pathlocal)}")
-            files_section[f"pathsize{i}"] = str(size)
+            files_section[f"pathsize{i}"] = str(f.filesize)
+            if incremental is not None:
+                files_section[f"pathstate{i}"] = diff.state(f.path)
+            if f.path in deltas:
+                files_section[f"pathdelta{i}"] = deltas[f.path].path
 
         files_section["paths"] = str(len(assets))
         scene_settings["files"] = files_section
 
+        if blend_index is not None:
+            # indexing the blocks already hashed the whole file
+            check = blend_index.checksum
+        else:
+            try:
+                result = checksum.result()
+            except OSError:
+                check = "0"
+            else:
+                check = result.hexdigest
+                print(f"checksum: {os.path.basename(blenderpath)} {result}")
         scene_settings["checksum"] = {
-            "check": str(calcMd5(blenderpath)),  # todo
+            "check": check,
             "scenesize": str(os.stat(blenderpath).st_size),
         }
 
         scene_settings.write_to_file(f"{blenderpath}.txt")
 
+        if incremental is not None:
+            # pending until the farm's file list confirms the upload
+            incremental.save(assets)
+        if signatures is not None:
+            # the next export diffs against this one
+            signatures.update(large_assets)
+        if blend_state is not None and blend_index is not None:
+            # the export is never rewritten in place, a hardlink is safe
+            blend_state.keep(blenderpath, blend_index, lambda src, dst: stageFile(src, dst, allow_hardlink=True))
+
         for v in self.tests:
             v.postSave()
  
@@ -471,6 +631,22 @@ class RENDER_PT_farm_settings_gen():
         if bpy.context.scene.frame_end - bpy.context.scene.frame_start >= 1 or not bpy.context.scene.cycles.device == 'CPU':
             row.enabled = False
         row.prop(props, "is_distributed")
+        col.prop(props, "use_content_addressing")
+        col.prop(props, "is_incremental")
+        col.prop(props, "is_inventory_case_sensitive")
+        col.prop(props, "is_preupload")
+        col.prop(props, "is_stage_assets")
+        col.prop(props, "is_delta_upload")
+        col.prop(props, "is_blend_delta")
+        col.prop(props, "is_bundle_small_files")
+        row = col.row()
+        row.enabled = props.is_bundle_small_files
+        row.prop(props, "bundle_threshold")
+        col.prop(props, "is_skip_unused")
+        col.prop(props, "is_prune_caches")
+        row = col.row()
+        row.enabled = props.is_prune_caches
+        row.prop(props, "cache_preroll")
         
         row = layout.row()
         row.scale_y = 5
@@ -880,6 +1056,11 @@ class Farm_OT_BakeScriptedExpressions(bpy.types.Operator):
     bl_label = "Bake all scripted expressions"
 
     bake_anyway: bpy.props.BoolProperty(name= "I've already saved a backup", default= False)
+    reduce_keys: bpy.props.BoolProperty(
+        name= "Reduce keyframes",
+        description= "Keep only the keyframes needed to follow the baked values within a small tolerance",
+        default= False
+    )
 
     @classmethod
     def poll(cls, context: bpy.types.Context) -> bool:
@@ -887,9 +1068,8 @@ class Farm_OT_BakeScriptedExpressions(bpy.types.Operator):
 
     def execute(self, context: bpy.types.Context) -> Set[str]:
         if self.bake_anyway:
-            scene = context.scene
-            for ob in bpy.data.objects:
-                bake_scripted_drivers(ob, scene)
+            stats = bakeScriptedDrivers(context.scene, reduce= self.reduce_keys)
+            self.report({"INFO"}, f"Baked {stats}")
 
             bpy.ops.farm.check()
         return {"FINISHED"}
@@ -903,6 +1083,7 @@ class Farm_OT_BakeScriptedExpressions(bpy.types.Operator):
         col = layout.column()
         col.label(text= "We recommend saving a backup of the blend file before baking scripted expressions")
         col.prop(self, "bake_anyway")
+        col.prop(self, "reduce_keys")
 
 
 def register():
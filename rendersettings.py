@@ -5,6 +5,8 @@ import os
 from contextlib import suppress
 
 from .validator import Validator, TestResult, ResultHelper
+from .driverExpressions import BAKE, analyzeExpression
+from .driverIndex import DriverIndex, ownerKey, ownerLabel
 from .utilitis import (
     createFarmOutputPath,
     is_gpu_render,
@@ -18,6 +20,7 @@ from typing import TYPE_CHECKING, List, Iterable, Any, Tuple, cast
 if TYPE_CHECKING:
     from bpy.types import Operator  # pylint: disable = no-name-in-module, import-error
     from .renderConfiguration import Config
+    from .assetManifest import AssetManifest
     from .typAliases import ResetFilepath, FileoutputNodes
 
 
@@ -90,16 +93,25 @@ class ValRendersettings(Validator):
         except:
             return []
 
-    def testForScriptedExpressions(self, drivers: Iterable[Any], results: ResultHelper) -> None:
-        for obj in drivers:
-            with suppress(Exception):
-                for driver in obj.animation_data.drivers:
-                    with suppress(Exception):
-                        if driver.driver.type == "SCRIPTED":
-                            results.error(
-                                f"Scripted Expressions are unsupported. ( Object: '{obj.name}', Expression: {driver.driver.expression} ) ",
-                                type_= 7, info_1= obj.name, info_2= driver.driver.expression
-                            )
+    def testForScriptedExpressions(self, index: DriverIndex, results: ResultHelper) -> None:
+        for entry in index.scripted():
+            analysis = analyzeExpression(entry.expression, entry.variables, entry.use_self)
+            if analysis.simple:
+                # evaluated without Python, fine on the farm
+                continue
+            library = getattr(entry.owner, "library", None)
+            if library is not None:
+                # the bake fix only changes local data, this has to be fixed in the library
+                results.error(
+                    f"Scripted Expressions are unsupported. ( {ownerLabel(entry.owner)}, Expression: {entry.expression} ) "
+                    f"Linked from {library.filepath}, bake it in that file. "
+                )
+                continue
+            hint = " (can be rewritten without baking)" if analysis.kind != BAKE else ""
+            results.error(
+                f"Scripted Expressions are unsupported. ( {ownerLabel(entry.owner)}, Expression: {entry.expression} ){hint} ",
+                type_= 7, info_1= ownerKey(entry.owner), info_2= entry.expression
+            )
 
     def test(self, results_: List[TestResult]) -> None:
         results = ResultHelper(results_, self)
@@ -257,17 +269,14 @@ class ValRendersettings(Validator):
                 )
 
         # test if drivers have scripted expressions
-        self.testForScriptedExpressions(bpy.data.objects, results)
-        self.testForScriptedExpressions(bpy.data.textures, results)
-        self.testForScriptedExpressions(bpy.data.materials, results)
-        self.testForScriptedExpressions(bpy.data.particles, results)
-        self.testForScriptedExpressions(bpy.data.worlds, results)
+        # linked drivers run on the farm too
+        self.testForScriptedExpressions(DriverIndex.build(local=False), results)
 
     def furtherAction(self, op: Operator, result: TestResult) -> None:
         op.report({"ERROR"}, result.message)
 
     def prepareSave(
-        self, _export_folder: str, assets: List[str], scene_settings: "Config"
+        self, _export_folder: str, assets: AssetManifest, scene_settings: "Config"
     ) -> None:
         scene = bpy.context.scene
 
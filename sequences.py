@@ -0,0 +1,105 @@
+from __future__ import annotations
+import os
+import re
+from collections import namedtuple
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Iterable, List, Optional, Set, Tuple
+
+# the last group of digits in a file name, in front of the extension
+SEQUENCE_RE = re.compile(r"^(?P<head>.*?)(?P<digits>\d+)(?P<tail>\D*)$")
+
+# frame settings of an image user (image node, texture, image empty, camera background)
+SequenceUser = namedtuple("SequenceUser", ["frame_start", "frame_duration", "frame_offset", "cyclic"])
+
+
+def imageUserFrame(frame: int, frame_start: int, frame_duration: int, frame_offset: int, cyclic: bool) -> int:
+    """The file number an image user reads at scene `frame`, as BKE_image_user_frame_get computes it"""
+    if frame_duration == 0:
+        return 0
+
+    number = frame - frame_start + 1
+    if cyclic:
+        number %= frame_duration
+        if number == 0:
+            number = frame_duration
+    number = min(max(number, 0), frame_duration)
+    return number + frame_offset
+
+
+def volumeFrame(frame: int, frame_start: int, frame_duration: int, frame_offset: int, mode: str) -> Optional[int]:
+    """The file number a volume sequence reads at scene `frame`, None if it shows nothing there"""
+    if frame_duration == 0:
+        return None
+
+    number = frame - frame_start + 1
+    if mode == "CLIP":
+        if number < 1 or number > frame_duration:
+            return None
+    elif mode == "EXTEND":
+        number = min(max(number, 1), frame_duration)
+    elif mode == "REPEAT":
+        number %= frame_duration
+        if number == 0:
+            number = frame_duration
+    elif mode == "PING_PONG":
+        pingpong_duration = frame_duration * 2 - 1
+        number %= pingpong_duration
+        if number == 0:
+            number = pingpong_duration
+        if number > frame_duration:
+            number = frame_duration * 2 - number
+    return number + frame_offset
+
+
+def imageSequenceNumbers(users: Iterable[SequenceUser], frames: Iterable[int]) -> Set[int]:
+    frames = list(frames)
+    return {
+        imageUserFrame(frame, user.frame_start, user.frame_duration, user.frame_offset, user.cyclic)
+        for user in users
+        for frame in frames
+    }
+
+
+def volumeSequenceNumbers(
+    frames: Iterable[int], frame_start: int, frame_duration: int, frame_offset: int, mode: str
+) -> Set[int]:
+    numbers = (volumeFrame(frame, frame_start, frame_duration, frame_offset, mode) for frame in frames)
+    return {number for number in numbers if number is not None}
+
+
+def splitSequenceFilename(filename: str) -> Optional[Tuple[str, str, str]]:
+    """(head, digits, tail) of a numbered file name, None if the name has no number"""
+    stem, ext = os.path.splitext(filename)
+    match = SEQUENCE_RE.match(stem)
+    if match is None:
+        return None
+    return match.group("head"), match.group("digits"), match.group("tail") + ext
+
+
+def sequenceFilename(filename: str, number: int) -> str:
+    """`filename` with its frame number replaced by `number`, keeping the zero padding"""
+    parts = splitSequenceFilename(filename)
+    if parts is None:
+        return filename
+    head, digits, tail = parts
+    # Blender writes negative frame numbers as 0
+    return f"{head}{max(0, number):0{len(digits)}d}{tail}"
+
+
+def sequenceFiles(filename: str, numbers: Iterable[int], names: Iterable[str]) -> List[str]:
+    """The files of `names` (one folder listing) that hold the frame `numbers` of the sequence `filename`"""
+    wanted = {sequenceFilename(filename, number) for number in numbers}
+    return [name for name in names if name in wanted]
+
+
+def sequenceMembers(filename: str, names: Iterable[str]) -> List[str]:
+    """All files of `names` that belong to the sequence `filename`: same head and tail, any frame number"""
+    parts = splitSequenceFilename(filename)
+    if parts is None:
+        return [name for name in names if name == filename]
+    head, _digits, tail = parts
+    pattern = re.compile(f"^{re.escape(head)}\\d+{re.escape(tail)}$")
+    return [name for name in names if pattern.match(name)]
@@ -0,0 +1,172 @@
+from __future__ import annotations
+import os
+import sys
+import time
+import errno
+import shutil
+from contextlib import suppress
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .hashing import CHUNK_SIZE, formatRate
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Callable, Dict, Iterable, List, Optional
+    from .assetManifest import Asset
+
+# copying is bound by the disks, a few workers keep them busy
+MAX_WORKERS = 4
+
+REFLINK = "reflink"
+HARDLINK = "hardlink"
+COPY = "copy"
+SKIPPED = "skipped"
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+# errors that only say "not possible here", the next method is tried
+FALLBACK_ERRNOS = {
+    errno.EXDEV, errno.EPERM, errno.EACCES, errno.EINVAL, errno.ENOTSUP, errno.EOPNOTSUPP, errno.ENOTTY, errno.EMLINK
+}
+
+
+class StagingStats:
+    """Totals of one staging run. Wall time is measured around the whole run."""
+
+    def __init__(self) -> None:
+        self.files = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.methods: Dict[str, int] = {}
+        self.failed: List[str] = []
+
+    @property
+    def bytesPerSecond(self) -> float:
+        return self.bytes / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        methods = ", ".join(f"{count} {method}" for method, count in sorted(self.methods.items()))
+        return (
+            f"{self.files} files ({methods}), {self.bytes} bytes in {self.seconds:.2f}s"
+            f" ({formatRate(self.bytesPerSecond)})"
+        )
+
+
+def isStaged(src_stat: os.stat_result, dst: str, allow_hardlink: bool = False) -> bool:
+    """
+    True if `dst` is a copy with the same size and mtime, or, with `allow_hardlink`, the same file.
+    Without it a hardlink left by an older staging is replaced by a copy.
+    """
+    try:
+        dst_stat = os.stat(dst)
+    except OSError:
+        return False
+    if (dst_stat.st_ino, dst_stat.st_dev) == (src_stat.st_ino, src_stat.st_dev) and src_stat.st_ino:
+        return allow_hardlink
+    return dst_stat.st_size == src_stat.st_size and dst_stat.st_mtime_ns == src_stat.st_mtime_ns
+
+
+def _reflink(src: str, dst: str) -> None:
+    """Copy-on-write clone (btrfs, xfs, ...). Raises OSError where not supported."""
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.ENOTSUP, "reflink not supported", dst)
+    import fcntl
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    shutil.copystat(src, dst)
+
+
+def _copy(src: str, dst: str, chunk_size: int = CHUNK_SIZE) -> None:
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        while True:
+            n = fsrc.readinto(buf)
+            if not n:
+                break
+            fdst.write(view[:n])
+    shutil.copystat(src, dst)
+
+
+def stageFile(src: str, dst: str, allow_hardlink: bool = False) -> str:
+    """
+    Puts `src` at `dst`, trying a reflink and finally a chunked copy.
+    The file only appears at `dst` once it is complete. Returns the method used.
+
+    A hardlink shares the file with `src`, so rewriting `src` in place (a re-bake,
+    an external tool) would change what is queued for upload. It is only tried with
+    `allow_hardlink`, for sources nobody rewrites like the exported .blend.
+    A `src` that already is `dst` is left alone.
+    """
+    src_stat = os.stat(src)
+    if os.path.normcase(os.path.abspath(src)) == os.path.normcase(os.path.abspath(dst)):
+        # written into the export folder already, like the bundles
+        return SKIPPED
+    if isStaged(src_stat, dst, allow_hardlink):
+        return SKIPPED
+
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = f"{dst}.part"
+    with suppress(FileNotFoundError):
+        os.remove(tmp)
+    try:
+        methods = [(REFLINK, _reflink)]
+        if allow_hardlink:
+            methods.append((HARDLINK, os.link))
+        for method, link in methods:
+            try:
+                link(src, tmp)
+            except OSError as e:
+                if e.errno not in FALLBACK_ERRNOS:
+                    raise
+                with suppress(FileNotFoundError):
+                    os.remove(tmp)
+                continue
+            os.replace(tmp, dst)
+            return method
+
+        _copy(src, tmp)
+        os.replace(tmp, dst)
+        return COPY
+    finally:
+        with suppress(OSError):
+            os.remove(tmp)
+
+
+def stageAssets(
+    assets: Iterable[Asset],
+    export_folder: str,
+    max_workers: int = MAX_WORKERS,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> StagingStats:
+    """
+    Materializes `assets` below `export_folder` at their virtual paths on a bounded thread pool.
+    Files that are already there unchanged are skipped. `progress(done, total)` is called
+    on the calling thread after every file.
+    """
+    jobs = {os.path.join(export_folder, asset.path): asset for asset in assets}
+    stats = StagingStats()
+    if not jobs:
+        return stats
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="farm_stage") as pool:
+        futures = {pool.submit(stageFile, asset.pathlocal, dst): asset for dst, asset in jobs.items()}
+        for done, future in enumerate(as_completed(futures), 1):
+            asset = futures[future]
+            try:
+                method = future.result()
+            except OSError as e:
+                print(f"could not stage {asset.pathlocal} {e}")
+                stats.failed.append(asset.pathlocal)
+            else:
+                stats.methods[method] = stats.methods.get(method, 0) + 1
+                stats.files += 1
+                if method != SKIPPED:
+                    stats.bytes += asset.filesize
+            if progress is not None:
+                progress(done, len(jobs))
+    stats.seconds = time.perf_counter() - start
+    return stats
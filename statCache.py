@@ -0,0 +1,179 @@
+from __future__ import annotations
+import os
+import stat
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, List, Optional
+
+# network shares answer slowly but in parallel
+PROBE_WORKERS = 16
+PROBE_TIMEOUT = 10.0
+
+
+class StatCache:
+    """
+    Memoizes filesystem probes for the duration of one Check / Upload.
+
+    Every path is stat'ed at most once, exists/isfile/isdir/size/mtime are all
+    answered from that stat. Missing files are cached as well. The owner clears
+    the cache when a new check starts.
+    """
+
+    def __init__(self) -> None:
+        self._stats: Dict[str, Optional[os.stat_result]] = {}
+        self._listings: Dict[str, Optional[List[str]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self) -> None:
+        self._stats.clear()
+        self._listings.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normpath(path)
+
+    def stat(self, path: str) -> Optional[os.stat_result]:
+        """os.stat(path), or None if it doesn't exist"""
+        key = self._key(path)
+        try:
+            st = self._stats[key]
+            self.hits += 1
+            return st
+        except KeyError:
+            self.misses += 1
+
+        try:
+            st = os.stat(path)
+        except (OSError, ValueError):
+            st = None
+        self._stats[key] = st
+        return st
+
+    def store(self, path: str, st: Optional[os.stat_result]) -> None:
+        """Remembers a stat taken elsewhere, e.g. from os.scandir"""
+        self._stats[self._key(path)] = st
+
+    def isCached(self, path: str) -> bool:
+        return self._key(path) in self._stats
+
+    def exists(self, path: str) -> bool:
+        return self.stat(path) is not None
+
+    def isfile(self, path: str) -> bool:
+        st = self.stat(path)
+        return st is not None and stat.S_ISREG(st.st_mode)
+
+    def isdir(self, path: str) -> bool:
+        st = self.stat(path)
+        return st is not None and stat.S_ISDIR(st.st_mode)
+
+    def size(self, path: str) -> int:
+        """Like os.path.getsize, raises OSError for missing files"""
+        st = self.stat(path)
+        if st is None:
+            raise FileNotFoundError(path)
+        return st.st_size
+
+    def mtime(self, path: str) -> float:
+        """Like os.path.getmtime, raises OSError for missing files"""
+        st = self.stat(path)
+        if st is None:
+            raise FileNotFoundError(path)
+        return st.st_mtime
+
+    def listdir(self, path: str) -> List[str]:
+        """Like os.listdir, raises OSError for missing folders"""
+        key = self._key(path)
+        if key in self._listings:
+            self.hits += 1
+            names = self._listings[key]
+        else:
+            self.misses += 1
+            try:
+                names = sorted(os.listdir(path))
+            except OSError:
+                names = None
+            self._listings[key] = names
+
+        if names is None:
+            raise FileNotFoundError(path)
+        return names
+
+    def storeListing(self, path: str, names: Optional[List[str]]) -> None:
+        self._listings[self._key(path)] = None if names is None else sorted(names)
+
+    def prefetch(
+        self,
+        paths: Iterable[str] = (),
+        folders: Iterable[str] = (),
+        max_workers: int = PROBE_WORKERS,
+        timeout: float = PROBE_TIMEOUT,
+    ) -> int:
+        """
+        Stats `paths` and lists `folders` concurrently on a bounded thread pool.
+
+        Results are stored on the calling thread in input order, so the cache
+        ends up the same as after serial probing. Probes not finished within `timeout`
+        seconds of the start are skipped and left to the regular, serial lookup.
+        Returns the number of probes that were cached.
+        """
+        todo_stats = [p for p in dict.fromkeys(paths) if p and not self.isCached(p)]
+        todo_lists = [f for f in dict.fromkeys(folders) if f and self._key(f) not in self._listings]
+        if not todo_stats and not todo_lists:
+            return 0
+
+        pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="farm_probe")
+        stat_futures: List[Future] = []
+        list_futures: List[Future] = []
+        try:
+            stat_futures = [pool.submit(_probeStat, path) for path in todo_stats]
+            list_futures = [pool.submit(_probeListing, folder) for folder in todo_lists]
+            # one deadline for the whole batch, not one per probe
+            wait(stat_futures + list_futures, timeout=timeout)
+
+            cached = 0
+            for path, future in zip(todo_stats, stat_futures):
+                if future.done():
+                    self.store(path, future.result())
+                    cached += 1
+                else:
+                    print(f"file probe timed out: {path}")
+            for folder, future in zip(todo_lists, list_futures):
+                if future.done():
+                    self.storeListing(folder, future.result())
+                    cached += 1
+                else:
+                    print(f"folder probe timed out: {folder}")
+            return cached
+        finally:
+            # don't wait for probes that hang on an unreachable share, and drop the queued ones
+            try:
+                pool.shutdown(wait=False, cancel_futures=True)
+            except TypeError:
+                # Python < 3.9
+                for future in stat_futures + list_futures:
+                    future.cancel()
+                pool.shutdown(wait=False)
+
+    def __str__(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses"
+
+
+def _probeStat(path: str) -> Optional[os.stat_result]:
+    try:
+        return os.stat(path)
+    except (OSError, ValueError):
+        return None
+
+
+def _probeListing(folder: str) -> Optional[List[str]]:
+    try:
+        return os.listdir(folder)
+    except OSError:
+        return None
@@ -1,7 +1,7 @@
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from typing import Any
+    from typing import Any, Callable
     from typing_extensions import TypedDict
 
     ResetInfo = TypedDict("ResetInfo", {"obj": Any, "attr": str, "value": str})  # value = file
@@ -13,3 +13,6 @@ if TYPE_CHECKING:
     FileInfo = TypedDict(
         "FileInfo", {"obj": Any, "mod": Any, "pc": Any, "path": str, "name": str,},
     )
+
+    # points a datablock to its files on the farm once the files were found, see ValTexture.save_assets
+    Remap = Callable[[Any], None]
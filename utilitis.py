@@ -2,24 +2,23 @@ from __future__ import annotations
 import os
 import bpy
 import shutil
-import hashlib
 import itertools
 import json
 from contextlib import suppress
 
 from typing import List, Tuple, cast
 
+from .remoteInventory import RemoteInventory
+from .assetChecks import checkFilename
+from .assetSources import BlobPath
+from .driverBake import bakeScriptedDrivers
+
 
 def debuglog(text: str) -> None:
     if True:
         print(text)
 
 
-def checkFilename(filename: str) -> bool:
-    allowed = "abcdefghijklmnopqrstuvwxyz0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_-. "
-    return all(ch in allowed for ch in filename)
-
-
 def changeFilename(filename: str) -> str:
     allowed = "abcdefghijklmnopqrstuvwxyz0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_-. "
 
@@ -44,14 +43,6 @@ def getChangedBlenderFilename() -> str:
     return fn or "untitled.blend"
 
 
-def calcMd5(filepath: str) -> str:
-    try:
-        data = open(filepath, "rb").read()
-        return hashlib.md5(data).hexdigest()
-    except OSError:
-        return "0"
-
-
 def isPictureFormat(fmt: str) -> bool:
     fmt = fmt.upper()
     formats = [
@@ -131,17 +122,11 @@ def manager_version(manager_path: str) -> str:
         return ""
 
 
-def readFtpFileContents(filePath: str) -> Tuple[List[str], List[int]]:
-    contsFiles = []
-    contsSizes = []
-    with open(filePath, "r", encoding="utf-8-sig") as file_:
-        for f in file_:
-            with suppress(Exception):
-                # FIXME: not all filesystems are case insensitive
-                filename, filesize = f.split(":")
-                contsFiles.append(filename.lower())
-                contsSizes.append(int(filesize))
-    return contsFiles, contsSizes
+def readFtpFileContents(filePath: str, case_sensitive: bool = False) -> Tuple[List[str], List[int]]:
+    """Prefer RemoteInventory, which answers lookups without scanning these lists."""
+    inventory = RemoteInventory(filePath, case_sensitive)
+    inventory.refresh()
+    return list(inventory.entries), [entry.size for entry in inventory.entries.values()]
 
 
 def is_gpu_render() -> bool:
@@ -174,26 +159,15 @@ def farmProps():
     props = bpy.context.window_manager.sky
     return props
 
-def bake_scripted_drivers(ob: bpy_types.Object, scene: bpy.types.Scene):
+def getRenderScenes() -> List[bpy.types.Scene]:
+    """the scenes the job renders: the checked upload scenes for batch renders, else the current scene"""
+    if farmProps().batch_render:
+        return [scene for scene in bpy.data.scenes if scene.upload_scene]
+    return [bpy.context.scene]
+
+def bake_scripted_drivers(ob: bpy_types.Object, scene: bpy.types.Scene, reduce: bool = False):
     """Bake and remove all scripted expression drivers in an object"""
-    current_frame = scene.frame_current
-    frame_step = 1
-
-    if ob.animation_data:
-        if ob.animation_data.drivers:
-            f = scene.frame_start
-            while f <= scene.frame_end:
-                # bake all object drivers
-                scene.frame_set(f)
-                for d in ob.animation_data.drivers:
-                    if d.driver.type == 'SCRIPTED':
-                        ob.keyframe_insert(d.data_path)
-                f += frame_step
-
-            # remove all drivers
-            for d in ob.animation_data.drivers:
-                if d.driver.type == 'SCRIPTED':
-                    ob.animation_data.drivers.remove(d)
+    return bakeScriptedDrivers(scene, [ob], reduce)
 
 def getPrioritiesArray(self, context):
     cpuPrice = 1.2
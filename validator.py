@@ -1,10 +1,13 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import List, TYPE_CHECKING, Callable, Tuple, Optional
+from typing import List, TYPE_CHECKING, Callable, Tuple, Optional, Any
 
 if TYPE_CHECKING:
     from .renderConfiguration import Config
+    from .assetManifest import AssetManifest
+    from .statCache import StatCache
+    from .cacheIndex import CacheIndexRegistry
     from .renderfarm import FarmRenderDlg
     from bpy.types import Operator  # pylint: disable = no-name-in-module, import-error
 
@@ -13,6 +16,21 @@ class Validator(ABC):
     def __init__(self, main: FarmRenderDlg) -> None:
         self.mainDialog = main
 
+    @property
+    def statCache(self) -> StatCache:
+        """Filesystem probes shared by all validators during one check and export"""
+        return self.mainDialog.statCache
+
+    @property
+    def cacheIndex(self) -> CacheIndexRegistry:
+        """Cache folder scans shared by all validators during one check and export"""
+        return self.mainDialog.cacheIndex
+
+    def isUsed(self, id_: Any) -> bool:
+        """False for datablocks the rendered scenes don't use, when unused data is skipped"""
+        reachable = self.mainDialog.getReachable()
+        return reachable is None or id_ in reachable
+
     @abstractmethod
     def getName(self) -> str:
         pass
@@ -22,7 +40,7 @@ class Validator(ABC):
         pass
 
     @abstractmethod
-    def prepareSave(self, export_folder: str, assets: List[str], scene_settings: "Config") -> None:
+    def prepareSave(self, export_folder: str, assets: AssetManifest, scene_settings: "Config") -> None:
         pass
 
     @abstractmethod